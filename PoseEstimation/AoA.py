@@ -1,5 +1,6 @@
 import numpy as np
 import matplotlib.pyplot as plt
+from triangulation import triangulate
 
 # Define UAV trajectory parameters
 time = np.linspace(0, 18, 300)  # Time points
@@ -20,17 +21,7 @@ def generate_aoa(uav_positions, target_location, noise_std):
 
 # Triangulation method to estimate the target location
 def triangulation_algorithm(uav_positions, noisy_aoa):
-    A = np.zeros((len(noisy_aoa) - 1, 2))
-    b = np.zeros(len(noisy_aoa) - 1)
-    for i in range(len(noisy_aoa) - 1):
-        dx = uav_positions[i + 1, 0] - uav_positions[i, 0]
-        dy = uav_positions[i + 1, 1] - uav_positions[i, 1]
-        angle_diff = noisy_aoa[i + 1] - noisy_aoa[i]
-        A[i, 0] = -dy
-        A[i, 1] = dx
-        b[i] = dx * np.tan(noisy_aoa[i]) - dy
-    estimated_location, _, _, _ = np.linalg.lstsq(A, b, rcond=None)
-    return estimated_location
+    return triangulate(uav_positions, noisy_aoa)
 
 # Generate true and noisy AOAs
 true_aoa, noisy_aoa = generate_aoa(uav_trajectory, true_target_location, noise_std)
@@ -1,5 +1,6 @@
 import numpy as np
 import matplotlib.pyplot as plt
+from triangulation import triangulate
 from scipy.signal import savgol_filter
 from scipy.optimize import curve_fit
 
@@ -56,17 +57,7 @@ def corrected_angle_rate_algorithm(uav_positions, smoothed_aoa, uav_velocity):
 
 # Triangulation method to estimate the target location
 def triangulation_algorithm(uav_positions, smoothed_aoa):
-    A = np.zeros((len(smoothed_aoa) - 1, 2))
-    b = np.zeros(len(smoothed_aoa) - 1)
-    for i in range(len(smoothed_aoa) - 1):
-        dx = uav_positions[i + 1, 0] - uav_positions[i, 0]
-        dy = uav_positions[i + 1, 1] - uav_positions[i, 1]
-        angle_diff = smoothed_aoa[i + 1] - smoothed_aoa[i]
-        A[i, 0] = -dy
-        A[i, 1] = dx
-        b[i] = dx * np.tan(smoothed_aoa[i]) - dy
-    estimated_location, _, _, _ = np.linalg.lstsq(A, b, rcond=None)
-    return estimated_location
+    return triangulate(uav_positions, smoothed_aoa)
 
 # Compute estimates
 estimated_target_angle_rate, avg_aoa, avg_rate = corrected_angle_rate_algorithm(uav_trajectory, smoothed_aoa, uav_velocity)
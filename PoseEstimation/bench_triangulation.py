@@ -0,0 +1,102 @@
+"""
+Benchmark for triangulation.triangulate: thousands of simulated runs solved in one batched call
+against a Python loop that fills A and b element by element for every run, like the original
+triangulation_algorithm. Also times reading the runs from a temporary drone_measurements table.
+
+    python ./bench_triangulation.py
+    python ./bench_triangulation.py --runs 2000 --samples 1000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from triangulation import load_measurements, triangulate
+
+
+def simulate_runs(runs, samples, noise_std, rng):
+    """Circular flights around random transmitters, with noisy bearings from receiver to transmitter."""
+    targets = rng.uniform(-100, 100, (runs, 2))
+    angle = np.linspace(0, 1.8, samples)[None, :] + rng.uniform(0, 2 * np.pi, (runs, 1))
+    radius = rng.uniform(30, 80, (runs, 1))
+    positions = targets[:, None, :] + np.stack([radius * np.cos(angle), radius * np.sin(angle)], axis=-1)
+    relative = targets[:, None, :] - positions
+    bearings = np.arctan2(relative[..., 1], relative[..., 0]) + rng.normal(0, noise_std, (runs, samples))
+    return positions, bearings, targets
+
+
+def triangulate_loop(positions, bearings):
+    A = np.zeros((len(bearings), 2))
+    b = np.zeros(len(bearings))
+    for i in range(len(bearings)):
+        A[i, 0] = np.sin(bearings[i])
+        A[i, 1] = -np.cos(bearings[i])
+        b[i] = A[i, 0] * positions[i, 0] + A[i, 1] * positions[i, 1]
+    estimate, _, _, _ = np.linalg.lstsq(A, b, rcond=None)
+    return estimate
+
+
+def write_database(path, positions, bearings):
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE drone_measurements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, simulation_id INTEGER, timestamp REAL,
+            x REAL, y REAL, z REAL, pitch REAL, yaw REAL, roll REAL, signal_strength REAL, signal_direction REAL)
+    """)
+    conn.execute("CREATE INDEX idx_drone_measurements_simulation_time ON drone_measurements(simulation_id, timestamp)")
+    runs, samples = bearings.shape
+    rows = ((run + 1, sample * 0.05, float(positions[run, sample, 0]), float(positions[run, sample, 1]), 0.0, 0.0, 0.0, 0.0,
+             1.0, float(bearings[run, sample])) for run in range(runs) for sample in range(samples))
+    conn.executemany("""
+        INSERT INTO drone_measurements (simulation_id, timestamp, x, y, z, pitch, yaw, roll, signal_strength, signal_direction)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5000, help="Number of simulated runs.")
+    parser.add_argument("--samples", type=int, default=300, help="Bearings per run.")
+    parser.add_argument("--noise", type=float, default=0.05, help="Bearing noise standard deviation in radians.")
+    parser.add_argument("--loop-runs", type=int, default=500, help="Runs timed with the loop, extrapolated to --runs.")
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    positions, bearings, targets = simulate_runs(args.runs, args.samples, args.noise, rng)
+
+    start = time.perf_counter()
+    loop_estimates = np.array([triangulate_loop(positions[i], bearings[i]) for i in range(args.loop_runs)])
+    loop_time = (time.perf_counter() - start) * args.runs / args.loop_runs
+
+    start = time.perf_counter()
+    estimates = triangulate(positions, bearings)
+    batched_time = time.perf_counter() - start
+    start = time.perf_counter()
+    reweighted = triangulate(positions, bearings, iterations=2)
+    reweighted_time = time.perf_counter() - start
+
+    print(f"{args.runs} runs x {args.samples} bearings, noise {args.noise} rad")
+    print(f"loop:                 {loop_time:8.3f} s (extrapolated from {args.loop_runs} runs)")
+    print(f"batched:              {batched_time:8.3f} s ({loop_time / batched_time:.0f}x), "
+          f"max difference to loop {np.abs(estimates[:args.loop_runs] - loop_estimates).max():.2e}")
+    print(f"batched, 2 reweights: {reweighted_time:8.3f} s")
+    for name, result in (("unweighted", estimates), ("reweighted", reweighted)):
+        error = np.linalg.norm(result - targets, axis=1)
+        print(f"{name} error: median {np.median(error):.2f} m, 95th percentile {np.percentile(error, 95):.2f} m")
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_file = os.path.join(directory, "bench.db")
+        write_database(database_file, positions, bearings)
+        start = time.perf_counter()
+        db_positions, db_bearings, _, _ = load_measurements(database_file)
+        db_estimates = triangulate(db_positions, db_bearings)
+        print(f"from drone_measurements: {time.perf_counter() - start:.3f} s for load and triangulate, "
+              f"max difference {np.abs(db_estimates - estimates).max():.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Vectorized weighted least-squares triangulation of a transmitter from bearing measurements.
+
+A bearing theta measured at (px, py) puts the transmitter on the line
+    sin(theta) * x - cos(theta) * y = sin(theta) * px - cos(theta) * py
+Stacking one such equation per sample gives an overdetermined system A @ [x, y] = b. Each run is
+solved through its 2x2 normal equations, built for all runs at once and solved in a
+single batched np.linalg.solve call, so thousands of runs cost about as much as one large array
+operation. The line equation does not change when theta is turned by pi, so it does not matter
+whether a bearing points from the receiver to the transmitter or the other way round.
+
+    from triangulation import triangulate, load_measurements
+    positions, bearings, _, simulation_ids = load_measurements("simulation.db")
+    estimates = triangulate(positions, bearings)
+"""
+import sqlite3
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Estimates of runs whose lines are (close to) parallel are NaN instead of arbitrary
+MIN_DETERMINANT = 1e-12
+
+
+def triangulate(positions: np.ndarray, bearings: np.ndarray, weights: Optional[np.ndarray] = None,
+                iterations: int = 0) -> np.ndarray:
+    """
+    Weighted least-squares intersection of bearing lines, for one run or a stack of runs.
+    :param positions: Receiver positions, shape (samples, 2) or (runs, samples, 2).
+    :param bearings: Bearings in radians, shape (samples,) or (runs, samples). NaN marks missing
+        samples, e.g. the padding of stack_runs, and is ignored.
+    :param weights: Optional weight per sample, same shape as bearings. Use 1 / sigma^2 of the
+        bearing noise, the default weights every sample equally.
+    :param iterations: Reweighting passes. The distance error of a bearing line grows with the
+        range to the transmitter, so each pass divides the weights by the squared distance to the
+        previous estimate, which reduces the pull of far-away samples.
+    :return: Estimated transmitter positions, shape (2,) or (runs, 2). NaN for runs without two
+        usable non-parallel bearings.
+    """
+    positions = np.asarray(positions, dtype=float)
+    bearings = np.asarray(bearings, dtype=float)
+    single = bearings.ndim == 1
+    if single:
+        positions, bearings = positions[None], bearings[None]
+        weights = None if weights is None else np.asarray(weights, dtype=float)[None]
+
+    valid = ~np.isnan(bearings) & np.all(~np.isnan(positions), axis=-1)
+    base_weights = valid.astype(float) if weights is None else np.where(valid, np.asarray(weights, dtype=float), 0.0)
+    positions = np.where(valid[..., None], positions, 0.0)
+    bearings = np.where(valid, bearings, 0.0)
+
+    # Rows of A are (sin, -cos), b is A @ position
+    a = np.stack([np.sin(bearings), -np.cos(bearings)], axis=-1)
+    b = np.einsum("rsk,rsk->rs", a, positions)
+
+    w = base_weights
+    for i in range(iterations + 1):
+        weighted = a * w[..., None]
+        normal = np.matmul(weighted.transpose(0, 2, 1), a)
+        rhs = np.einsum("rsi,rs->ri", weighted, b)
+        determinant = normal[:, 0, 0] * normal[:, 1, 1] - normal[:, 0, 1] * normal[:, 1, 0]
+        solvable = np.abs(determinant) > MIN_DETERMINANT
+        # Replace singular systems with the identity so one bad run cannot fail the whole batch
+        normal[~solvable] = np.eye(2)
+        estimates = np.linalg.solve(normal, rhs[..., None])[..., 0]
+        estimates[~solvable] = np.nan
+        if i < iterations:
+            distance2 = np.sum((positions - estimates[:, None, :]) ** 2, axis=-1)
+            w = np.where(solvable[:, None], base_weights / np.maximum(distance2, 1.0), base_weights)
+    return estimates[0] if single else estimates
+
+
+def stack_runs(runs: Sequence[np.ndarray], fill: float = np.nan) -> np.ndarray:
+    """
+    Pad arrays of different lengths along their first axis into one array of shape
+    (len(runs), max_length, ...), for triangulating runs with different sample counts together.
+    """
+    length = max((len(run) for run in runs), default=0)
+    first = np.asarray(runs[0]) if len(runs) else np.empty(0)
+    stacked = np.full((len(runs), length) + first.shape[1:], fill, dtype=float)
+    for i, run in enumerate(runs):
+        stacked[i, :len(run)] = run
+    return stacked
+
+
+def load_measurements(database_file: str, simulation_ids: Optional[Sequence[int]] = None,
+                      columns: Tuple[str, str] = ("x", "y")) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[int]]:
+    """
+    Read the drone_measurements table of a simulation database as stacked runs, one per simulation.
+    :param database_file: Path to the SQLite database written by drone_sim/backend.
+    :param simulation_ids: Simulations to read, all of them by default.
+    :param columns: Receiver coordinates the bearings are measured in. The simulator reports
+        signal_direction as atan2(dy, dx), the angle in the x-y plane.
+    :return: Tuple (positions, bearings, signal_strength, simulation_ids) with shapes
+        (runs, samples, 2), (runs, samples) and (runs, samples), padded with NaN.
+    """
+    query = f"""
+        SELECT simulation_id, {columns[0]}, {columns[1]}, signal_direction, signal_strength
+        FROM drone_measurements
+    """
+    params = ()
+    if simulation_ids is not None:
+        query += f" WHERE simulation_id IN ({', '.join('?' * len(simulation_ids))})"
+        params = tuple(simulation_ids)
+    query += " ORDER BY simulation_id, timestamp"
+
+    conn = sqlite3.connect(database_file)
+    try:
+        rows = np.array(conn.execute(query, params).fetchall(), dtype=float).reshape(-1, 5)
+    finally:
+        conn.close()
+
+    # Rows are sorted by simulation, so each run is one contiguous block
+    ids, starts = np.unique(rows[:, 0], return_index=True)
+    blocks = np.split(rows[:, 1:], starts[1:])
+    stacked = stack_runs(blocks) if blocks and len(rows) else np.empty((0, 0, 4))
+    return stacked[..., 0:2], stacked[..., 2], stacked[..., 3], ids.astype(int).tolist()
@@ -1,86 +1,453 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, make_response, stream_with_context
 from flask_cors import CORS
-from flask_sqlalchemy import SQLAlchemy
 from db import *
+from fieldCache import AXES, MAX_POINTS, FieldGridSpec, FieldVolumeCache, volume_key
+from jobQueue import JobQueue, QueueFull
+from metrics import PROFILERS, REGISTRY, REQUEST_SECONDS, configure_logging, profile, render_prometheus, timed
+from position import Position
+from responseCache import CachedResponse, ResponseCache
+from sampleBuffer import COLUMNS, SIGNAL_STRENGTH
+from sweep import DEFAULTS, build_scenario, check_parameters, check_path, check_steps, path_waypoints
+from transmittAntenna import TransmittAntenna
+import ast
+import functools
+import json
+import numpy as np
+import time
+from typing import Optional
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=["X-Rows", "X-Columns", "X-Dtype", "X-Cache", "ETag", "X-Shape", "X-Origin", "X-Resolution"])
 
-# Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///simulation.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Serialized responses of the read endpoints, dropped whenever db.py writes or deletes the simulation
+response_cache = ResponseCache()
+add_simulation_listener(response_cache.invalidate)
 
-# Initialize the database
-db = SQLAlchemy(app)
+# Field-magnitude volumes of /api/field, memory-mapped from disk
+field_cache = FieldVolumeCache()
+
+# Simulations submitted through /api/simulate run here, off the request threads
+simulation_jobs = JobQueue(workers=2, max_pending=100)
+# Most transmitters one /api/field request may sum the field of
+MAX_FIELD_ANTENNAS = 32
+# Longest flight /api/simulate accepts, in time steps. The default scenario takes about 2000.
+MAX_SIMULATION_STEPS = 1_000_000
+
+REGISTRY.gauge("drone_sim_jobs", "Simulation jobs by status.",
+               lambda: {(status,): count for status, count in simulation_jobs.stats().items()
+                        if status not in ("workers", "max_pending")}, ("status",))
+REGISTRY.gauge("drone_sim_response_cache", "Response cache entries, bytes and counters.",
+               lambda: {(name,): value for name, value in response_cache.stats().items()}, ("stat",))
+REGISTRY.gauge("drone_sim_field_cache", "Field volume cache entries, bytes and counters.",
+               lambda: {(name,): value for name, value in field_cache.stats().items()}, ("stat",))
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def observe_request_latency(response):
+    start = g.pop("request_start", None)
+    if start is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method, endpoint=endpoint,
+                                status=response.status_code)
+    return response
+
+def timed_jsonify(payload):
+    """jsonify, timed as the json_serialize phase."""
+    with timed(phase="json_serialize"):
+        return jsonify(payload)
+
+def cached_response(view):
+    """
+    Serve a GET endpoint from response_cache. Only 200 responses are cached. Every response gets
+    a strong ETag, and a request whose If-None-Match matches it gets an empty 304. Entries are
+    stamped with db.database_version, so a simulation written by another process, e.g. main.py
+    or sweep.py, is never hidden by a cached listing.
+    """
+    @functools.wraps(view)
+    def wrapper(**kwargs):
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        version = database_version()
+        entry = response_cache.get(key, version)
+        cache_status = "HIT"
+        if entry is None:
+            cache_status = "MISS"
+            generation = response_cache.generation
+            response = make_response(view(**kwargs))
+            if response.status_code != 200:
+                return response
+            headers = {name: value for name, value in response.headers.items()
+                       if name not in ("Content-Type", "Content-Length")}
+            entry = response_cache.put(key, CachedResponse(response.get_data(), response.mimetype, headers,
+                                                           kwargs.get("simulation_id"), version), generation)
+
+        response = Response(entry.body, mimetype=entry.mimetype, headers=entry.headers)
+        response.set_etag(entry.etag)
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["X-Cache"] = cache_status
+        return response.make_conditional(request)
+    return wrapper
 
 @app.route('/api/simulations', methods=['GET'])
+@cached_response
 def get_simulations():
     """
     Fetch all simulation metadata (ID and description).
     """
     try:
-        conn = db.engine.connect()
-        simulations = conn.execute("SELECT id, description FROM simulations").fetchall()
-        return jsonify([{"id": sim[0], "description": sim[1]} for sim in simulations]), 200
+        return timed_jsonify(list_simulations()), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/simulations/<int:simulation_id>', methods=['GET'])
+@cached_response
 def get_simulation_details(simulation_id):
     """
     Fetch full details of a specific simulation, including slope, antenna, path, and measurements.
+    Optional query parameters max_points and tolerance return a decimated path and measurement
+    series instead of every sample, see db.get_simulation_lod. drone_id limits a swarm simulation
+    to one of its drones, listed in drone_ids.
     """
     try:
-        simulation_data = get_simulation_full_details(simulation_id)
+        max_points = request.args.get('max_points', type=int)
+        tolerance = request.args.get('tolerance', type=float)
+        drone_id = request.args.get('drone_id', type=int)
+        simulation_data = get_simulation_full_details(simulation_id, max_points=max_points, tolerance=tolerance,
+                                                      drone_id=drone_id)
         if "error" in simulation_data:
             return jsonify(simulation_data), 404
-        return jsonify(simulation_data), 200
+        return timed_jsonify(simulation_data), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/simulations/<int:simulation_id>', methods=['DELETE'])
+def remove_simulation(simulation_id):
+    """
+    Delete a simulation and everything stored for it.
+    """
+    try:
+        if not delete_simulation(simulation_id):
+            return jsonify({"error": "Simulation not found"}), 404
+        return jsonify({"message": "Simulation deleted", "simulation_id": simulation_id}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/simulations/<int:simulation_id>/stream', methods=['GET'])
+def stream_simulation_details(simulation_id):
+    """
+    Stream a simulation as NDJSON, one JSON object per line, so the client can start before the
+    whole trajectory has been read. The first line is the summary ("type": "simulation", with
+    slope, antenna and result), followed by "path" and "measurement" rows in timestamp order, each
+    with its drone_id.
+    Query parameters:
+        from_t, to_t: Only rows inside this time window.
+        drone_id: Only the rows of this drone of a swarm.
+        after_t, after_drone_id, after_id, limit: Keyset pagination, up to `limit` path rows after
+            the cursor (after_t, after_drone_id, after_id), see iter_simulation_rows. When the page
+            is full, the last line is {"type": "page", "next_after_t": ..., "next_after_drone_id": ...,
+            "next_after_id": ...}, the cursor of the next page.
+    """
+    try:
+        from_t = request.args.get('from_t', type=float)
+        to_t = request.args.get('to_t', type=float)
+        after_t = request.args.get('after_t', type=float)
+        after_drone_id = request.args.get('after_drone_id', type=int)
+        after_id = request.args.get('after_id', type=int)
+        limit = request.args.get('limit', type=int)
+        drone_id = request.args.get('drone_id', type=int)
+        if (after_drone_id is None) != (after_id is None) or (after_id is not None and after_t is None):
+            return jsonify({"error": "The cursor is after_t, after_drone_id and after_id together, or after_t alone"}), 400
+        summary = get_simulation_summary(simulation_id)
+        if summary is None:
+            return jsonify({"error": "Simulation not found"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+    def generate():
+        yield json.dumps(dict(summary, type="simulation")) + "\n"
+        path_rows = 0
+        last = None
+        for kind, row in iter_simulation_rows(simulation_id, from_t=from_t, to_t=to_t, after_t=after_t, limit=limit,
+                                              after_drone_id=after_drone_id, after_id=after_id, drone_id=drone_id):
+            if kind == "path":
+                path_rows += 1
+                last = row
+            yield json.dumps(dict(row, type=kind)) + "\n"
+        if limit is not None and path_rows == limit:
+            yield json.dumps({"type": "page", "next_after_t": last["timestamp"], "next_after_drone_id": last["drone_id"],
+                              "next_after_id": last["id"]}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/simulations/<int:simulation_id>/binary', methods=['GET'])
+@cached_response
+def get_simulation_binary(simulation_id):
+    """
+    Fetch the path (?kind=path, default) or measurements (?kind=measurements) of a simulation as
+    raw little-endian float32, column-major, so the frontend can wrap it in a Float32Array without
+    parsing JSON. Column k is data[k * rows:(k + 1) * rows]. The X-Rows and X-Columns headers give
+    the row count and the comma-separated column names. Accepts max_points, tolerance and
+    drone_id like the JSON endpoint.
+    """
+    try:
+        kind = request.args.get('kind', 'path')
+        max_points = request.args.get('max_points', type=int)
+        tolerance = request.args.get('tolerance', type=float)
+        drone_id = request.args.get('drone_id', type=int)
+        if kind not in ('path', 'measurements'):
+            return jsonify({"error": "kind must be 'path' or 'measurements'"}), 400
+        if get_simulation_summary(simulation_id) is None:
+            return jsonify({"error": "Simulation not found"}), 404
+        if max_points is None and tolerance is None:
+            array = get_simulation_array(simulation_id, kind, drone_id)
+        else:
+            array = get_simulation_lod(simulation_id, max_points, tolerance, drone_id)[0 if kind == 'path' else 1]
+        columns = COLUMNS[:SIGNAL_STRENGTH] if kind == 'path' else COLUMNS
+        with timed(phase="binary_serialize"):
+            data = np.ascontiguousarray(array.T, dtype='<f4').tobytes()
+        return Response(data, mimetype='application/octet-stream', headers={
+            "X-Rows": str(len(array)),
+            "X-Columns": ",".join(columns),
+            "X-Dtype": "float32",
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def _pose(value, prefix: str) -> dict:
+    """
+    Scenario parameters for a pose given as {"x": .., "y": .., "z": .., "pitch": .., ...}, a list
+    [x, y, z, pitch, yaw, roll] or the string of such a list or tuple. Missing angles are 0.
+    """
+    if isinstance(value, str):
+        value = ast.literal_eval(value)
+    if isinstance(value, dict):
+        value = [value.get(name, 0.0) for name in ("x", "y", "z", "pitch", "yaw", "roll")]
+    values = [float(v) for v in value] + [0.0] * (6 - len(value))
+    names = ("x", "y", "z", "pitch", "yaw", "roll")[:6 if prefix == "antenna" else 3]
+    return {f"{prefix}_{name}": v for name, v in zip(names, values)}
+
+def run_simulation_job(job, params: dict, description: str, profiler: Optional[str] = None):
+    """
+    Run simulate_and_store, under the profiler if one is given. The profile report is returned
+    in the result, a cancelled run returns None as usual.
+    :param profiler: None, or "cprofile" or "pyinstrument" to profile this run.
+    """
+    if profiler is None:
+        return simulate_and_store(job, params, description)
+    with profile(profiler) as captured:
+        result = simulate_and_store(job, params, description)
+    if result is None:
+        return None
+    return dict(result, profile=captured.to_dict())
+
+def simulate_and_store(job, params: dict, description: str):
+    """
+    Fly the scenario of sweep.build_scenario, reporting waypoints done through the job, and store it.
+    Nothing is stored when the job is cancelled, and with min_clearance set the job fails before
+    flying a path that comes too close to the ground.
+    :return: Dictionary with the ID of the stored simulation, or None when cancelled.
+    """
+    transmittAntenna, slope, drone = build_scenario(params)
+    check_path(params, drone)
+    start_position = drone.position
+    job.update_progress(0, len(drone.path.path))
+    if not drone.followPath(d_time=params["time_step"], progress=job.update_progress):
+        return None
+
+    antenna_ids = [add_transmitt_antenna(antenna) for antenna in slope.transmittAntennas]
+    slope_id = add_slope(slope, antenna_ids[0])
+    simulation_id = create_simulation(description, slope_id, antenna_ids[0])
+    link_simulation_antennas(simulation_id, antenna_ids)
+    with SimulationRecorder(simulation_id) as recorder:
+        recorder.log_samples(drone.samples)
+        recorder.log_simulation_result(start_position, transmittAntenna.position, drone.position, len(drone.samples))
+    return {"simulation_id": simulation_id}
+
+def _field_antennas(value, moment: float) -> list:
+    """
+    Transmitters for /api/field from a list of poses, each a list or dict like _pose accepts, or
+    the JSON of one. At most MAX_FIELD_ANTENNAS are allowed, the field costs points times antennas.
+    """
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except RecursionError:
+            raise ValueError("antennas is nested too deeply")
+    if not isinstance(value, list) or not all(isinstance(pose, (list, dict)) for pose in value):
+        raise ValueError("antennas must be a list of poses")
+    if len(value) > MAX_FIELD_ANTENNAS:
+        raise ValueError(f"At most {MAX_FIELD_ANTENNAS} antennas are allowed, got {len(value)}")
+    antennas = []
+    for i, pose in enumerate(value):
+        params = _pose(pose, "antenna")
+        position = Position(*(params[f"antenna_{name}"] for name in ("x", "y", "z", "pitch", "yaw", "roll")))
+        antennas.append(TransmittAntenna(i + 1, position, f"Transmitter {i + 1}", "Omni", 10, 2.4, 5, 0, 360,
+                                         "Vertical", "Pattern", signal_model="dipole", moment=moment))
+    return antennas
+
+@app.route('/api/field', methods=['GET'])
+def get_field():
+    """
+    Dipole field magnitude |H| of a set of transmitters on a cubic grid, as raw little-endian
+    float32 in C order, for the MagneticField view. The X-Shape header gives the array shape,
+    X-Origin the x, y, z of element [0, 0, 0] and X-Resolution the grid spacing. Volumes, and
+    planes asked for on their own, are cached on disk by fieldCache, X-Cache tells whether this
+    one was. The ETag names the volume and plane, so a matching If-None-Match gets a 304 without
+    the field being loaded.
+    Query parameters, all optional:
+        antennas    JSON list of up to MAX_FIELD_ANTENNAS poses [x, y, z, pitch, yaw, roll],
+                    defaults to the scenario antenna
+        moment      magnetic moment of every transmitter, default 1
+        center      x,y,z of the grid center, defaults to the first antenna
+        extent      half the side of the grid in meters, default 50
+        resolution  grid spacing in meters, default 1
+        axis, at    return only the plane closest to `at` along axis x, y or z, e.g. axis=y&at=0
+    """
+    try:
+        moment = request.args.get('moment', 1.0, type=float)
+        poses = request.args.get('antennas')
+        if poses is None:
+            poses = [[DEFAULTS[f"antenna_{name}"] for name in ("x", "y", "z", "pitch", "yaw", "roll")]]
+        antennas = _field_antennas(poses, moment)
+        if not antennas:
+            return jsonify({"error": "antennas must not be empty"}), 400
+        center = request.args.get('center')
+        if center is None:
+            center = (antennas[0].position.x, antennas[0].position.y, antennas[0].position.z)
+        else:
+            center = tuple(float(v) for v in center.split(","))
+        if len(center) != 3:
+            return jsonify({"error": "center must be x,y,z"}), 400
+        spec = FieldGridSpec.around(center, request.args.get('extent', 50.0, type=float),
+                                    request.args.get('resolution', 1.0, type=float))
+        axis = request.args.get('axis')
+        at = request.args.get('at', type=float)
+        if axis is not None:
+            if axis not in AXES or at is None:
+                return jsonify({"error": f"axis must be one of {', '.join(AXES)} and needs at"}), 400
+            plane = spec.index(AXES.index(axis), at)
+        # Only the plane is computed when one is asked for, unless the volume is already cached
+        points = spec.points if axis is None else spec.plane(AXES.index(axis), plane).points
+        if points > MAX_POINTS:
+            return jsonify({"error": f"The grid has {points} points, at most {MAX_POINTS} are allowed"}), 400
+    except (ValueError, TypeError, SyntaxError) as e:
+        return jsonify({"error": f"Invalid request: {e}"}), 400
+
+    etag = volume_key(antennas, spec) if axis is None else f"{volume_key(antennas, spec)}-{axis}{plane}"
+    if request.if_none_match.contains(etag):
+        response = make_response("", 304)
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    try:
+        origin = list(spec.origin)
+        if axis is None:
+            array, hit = field_cache.volume(antennas, spec)
+        else:
+            array, hit = field_cache.plane(antennas, spec, AXES.index(axis), plane)
+            origin = list(spec.plane(AXES.index(axis), plane).origin)
+        with timed(phase="binary_serialize"):
+            data = np.ascontiguousarray(array, dtype='<f4').tobytes()
+        response = Response(data, mimetype='application/octet-stream', headers={
+            "X-Shape": ",".join(str(n) for n in array.shape),
+            "X-Origin": ",".join(repr(v) for v in origin),
+            "X-Resolution": repr(spec.resolution),
+            "X-Dtype": "float32",
+            "X-Cache": "HIT" if hit else "MISS",
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
 @app.route('/api/simulate', methods=['POST'])
 def simulate():
     """
-    Simulate a drone and store the results.
+    Queue a drone simulation and return its job ID at once. Poll /api/jobs/<job_id> for progress
+    and the resulting simulation ID.
     Expects:
     {
         "description": "Simulation description",
-        "start_position": {...},
-        "antenna_center": {...},
-        "steps": 10
+        "start_position": {"x": .., "y": .., "z": ..},
+        "antenna_center": {"x": .., "y": .., "z": .., "pitch": .., "yaw": .., "roll": ..},
+        "parameters": {...},
+        "profile": "cprofile"
     }
+    Every field is optional. parameters overrides any of the scenario parameters in sweep.DEFAULTS,
+    checked by sweep.check_parameters, and the flight may take at most MAX_SIMULATION_STEPS time steps.
+    profile ("cprofile", "pyinstrument" or true for cProfile) profiles the run, and the report is
+    returned in the job result.
     """
     try:
-        data = request.json
-        description = data.get('description')
-        start_position = data.get('start_position')
-        antenna_center = data.get('antenna_center')
-        steps = data.get('steps', 10)
-
-        if not description or not start_position or not antenna_center:
-            return jsonify({"error": "Missing required fields"}), 400
-
-        conn = db.engine.connect()
-        conn.execute("""
-            INSERT INTO simulations (description) VALUES (?)
-        """, (description,))
-        simulation_id = conn.execute("SELECT last_insert_rowid()").scalar()
-
-        conn.execute("""
-            INSERT INTO simulation_results (simulation_id, start_position, antenna_center, final_position, steps)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
-            simulation_id,
-            str(start_position),
-            str(antenna_center),
-            str(antenna_center),  # Simplistic final position placeholder
-            steps
-        ))
-        conn.close()
-
-        return jsonify({"message": "Simulation created", "simulation_id": simulation_id}), 201
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        data = request.get_json(silent=True) or {}
+        description = data.get('description') or "API simulation"
+        params = dict(DEFAULTS)
+        if data.get('start_position') is not None:
+            params.update(_pose(data['start_position'], "start"))
+        if data.get('antenna_center') is not None:
+            params.update(_pose(data['antenna_center'], "antenna"))
+        overrides = data.get('parameters') or {}
+        if not isinstance(overrides, dict):
+            return jsonify({"error": "parameters must be an object"}), 400
+        params.update(overrides)
+        check_parameters(params)
+        # Every waypoint takes at least one step, so count them before planning the path
+        if path_waypoints(params) > MAX_SIMULATION_STEPS:
+            return jsonify({"error": f"The path has more than {MAX_SIMULATION_STEPS} waypoints"}), 400
+        check_steps(params, build_scenario(params)[2], MAX_SIMULATION_STEPS)
+        profiler = data.get('profile') or None
+        if profiler is True:
+            profiler = "cprofile"
+        if profiler is not None and profiler not in PROFILERS:
+            return jsonify({"error": f"profile must be one of {', '.join(PROFILERS)}"}), 400
+    except (ValueError, TypeError, SyntaxError) as e:
+        return jsonify({"error": f"Invalid request: {e}"}), 400
+
+    try:
+        job = simulation_jobs.submit(lambda job: run_simulation_job(job, params, description, profiler),
+                                     client=request.remote_addr, description=description)
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 503
+    return jsonify({"message": "Simulation queued", "job_id": job.id, "status_url": f"/api/jobs/{job.id}"}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Status of a simulation job: status, steps_done / total_steps waypoints, and when done, the
+    simulation ID in result.
+    """
+    job = simulation_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict()), 200
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """
+    Cancel a simulation job. A running job stops at its next waypoint and stores nothing.
+    """
+    job = simulation_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict()), 200
+
+@app.route('/api/cache', methods=['GET'])
+def get_cache_stats():
+    """
+    Hit, miss and eviction counters of the response cache.
+    """
+    return jsonify(response_cache.stats()), 200
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Timers and counters of the simulation, storage and request hot paths in the Prometheus text format.
+    """
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4; charset=utf-8")
 
 @app.route('/api/test', methods=['GET'])
 def test():
@@ -97,7 +464,7 @@ def get_scene_config():
     return jsonify({
         "camera": {
             "position": [200, 100, 300],
-            "lookAt": [0, 50, 100]
+            "lookAt": [0, 0, 0]
         },
         "slope": {
             "width": 100,
@@ -112,7 +479,8 @@ def get_scene_config():
         },
         "ground": {
             "size": 500,
-            "color": 0x808080
+            "color": 0x808080,
+            "y": -100 * np.sin(np.radians(35))  # Lower edge of the slope, which is centered on the origin
         },
         "drone": {
             "startPosition": [40, 10, 175],
@@ -123,18 +491,19 @@ def get_scene_config():
     }), 200
 
 @app.route('/api/simulation-ids', methods=['GET'])
+@cached_response
 def get_simulation_ids():
     """
     API endpoint to fetch all available simulation IDs and descriptions.
     """
     try:
         simulations = fetch_simulation_ids_and_descriptions()
-        return jsonify(simulations), 200
+        return timed_jsonify(simulations), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 if __name__ == '__main__':
-    with app.app_context():
-        initialize_database()  # Ensures tables are created
+    configure_logging()
+    initialize_database()  # Ensures tables are created
     app.run(debug=True)
@@ -0,0 +1,114 @@
+import math
+import numpy as np
+from typing import Optional, Tuple
+
+# Column layout of BeaconEstimator.history
+ESTIMATE_COLUMNS = ("t", "x", "y", "var_x", "cov_xy", "var_y")
+
+
+class BeaconEstimator:
+    """
+    Online bearing-only estimate of the transmitter position, updated in O(1) per measurement.
+
+    Bearings are signal_direction as reported by TransmittAntenna.read_signal: the angle
+    atan2(dy, dx) in the x-y plane of the vector from the transmitter to the receiver. Each bearing
+    puts the transmitter on a line, and the estimate is the least-squares intersection of all lines
+    so far, the same solution PoseEstimation/triangulation.py computes in batch. Recursive least
+    squares keeps only the 2x2 normal equations and a few sums, so an update never revisits old
+    measurements.
+
+    An EKF on the bearing angles was tried first, but it has to be started from the first few
+    bearings. Those are measured close together, so their intersection can land near the receiver
+    instead of the transmitter, and the filter did not recover from that. Least squares has no
+    such starting point to get wrong.
+    """
+    def __init__(self, bearing_std: float = 0.05, min_spread: float = 5.0, capacity: int = 1024):
+        """
+        :param bearing_std: Standard deviation of the bearing noise in radians, scales the covariance.
+        :param min_spread: Angle in degrees the bearings must spread over before there is an
+            estimate. Nearly parallel lines intersect anywhere along them.
+        :param capacity: Initial number of history rows, the history doubles when full.
+        """
+        self.bearing_std = bearing_std
+        self.min_spread = min_spread
+        self._min_information = math.sin(math.radians(min_spread)) ** 2
+        # Normal equations of the lines, and sums of the receiver positions for the mean squared range
+        self._information = np.zeros((2, 2))
+        self._information_vector = np.zeros(2)
+        self._position_sum = np.zeros(2)
+        self._position_square_sum = 0.0
+        self.updates = 0
+        self._estimate = None
+        self._covariance = None
+        self._history = np.empty((max(capacity, 1), len(ESTIMATE_COLUMNS)))
+        self._size = 0
+
+    def spawn(self) -> "BeaconEstimator":
+        """A new estimator with the same settings and no measurements, e.g. for another transmitter."""
+        return BeaconEstimator(self.bearing_std, self.min_spread)
+
+    @property
+    def initialized(self) -> bool:
+        return self._estimate is not None
+
+    @property
+    def estimate(self) -> Optional[Tuple[float, float]]:
+        """Current (x, y) estimate of the transmitter, None until the bearings spread over min_spread."""
+        return None if self._estimate is None else (float(self._estimate[0]), float(self._estimate[1]))
+
+    @property
+    def covariance(self) -> Optional[np.ndarray]:
+        """2x2 covariance of the estimate, None while there is no estimate."""
+        return None if self._covariance is None else self._covariance.copy()
+
+    @property
+    def history(self) -> np.ndarray:
+        """View (no copy) of one row of ESTIMATE_COLUMNS per update since the first estimate."""
+        return self._history[:self._size]
+
+    def update(self, x: float, y: float, bearing: float, timestamp: float = 0.0) -> bool:
+        """
+        Incorporate one bearing measured at receiver position (x, y).
+        :return: True if an estimate is available after the update.
+        """
+        if bearing is None or math.isnan(bearing):
+            return self.initialized
+        # Line through the receiver along the bearing: sin(t) * bx - cos(t) * by = sin(t) * x - cos(t) * y
+        s, c = math.sin(bearing), math.cos(bearing)
+        self._information[0, 0] += s * s
+        self._information[0, 1] -= s * c
+        self._information[1, 1] += c * c
+        self._information[1, 0] = self._information[0, 1]
+        rhs = s * x - c * y
+        self._information_vector[0] += s * rhs
+        self._information_vector[1] -= c * rhs
+        self._position_sum[0] += x
+        self._position_sum[1] += y
+        self._position_square_sum += x * x + y * y
+        self.updates += 1
+
+        # For unit line normals the determinant is the sum of sin^2 of the angles between all pairs
+        information = self._information
+        determinant = information[0, 0] * information[1, 1] - information[0, 1] * information[1, 0]
+        if determinant <= self._min_information:
+            return self.initialized
+
+        inverse = np.array([[information[1, 1], -information[0, 1]], [-information[1, 0], information[0, 0]]]) / determinant
+        self._estimate = inverse @ self._information_vector
+        # A bearing error of d radians moves its line by about range * d, so the line residuals
+        # have variance range^2 * bearing_std^2. The mean squared range to the current estimate
+        # follows from the position sums without revisiting the measurements.
+        b = self._estimate
+        mean_range2 = (self._position_square_sum - 2 * (b @ self._position_sum)) / self.updates + b @ b
+        self._covariance = inverse * self.bearing_std ** 2 * max(mean_range2, 1.0)
+        self._record(timestamp)
+        return True
+
+    def _record(self, timestamp: float):
+        if self._size == self._history.shape[0]:
+            history = np.empty((2 * self._size, len(ESTIMATE_COLUMNS)))
+            history[:self._size] = self._history
+            self._history = history
+        p = self._covariance
+        self._history[self._size] = (timestamp, self._estimate[0], self._estimate[1], p[0, 0], p[0, 1], p[1, 1])
+        self._size += 1
@@ -0,0 +1,134 @@
+import numpy as np
+from scipy.spatial import cKDTree
+from transmittAntenna import TransmittAntenna
+from typing import List, Optional, Sequence, Tuple
+
+
+class BeaconIndex:
+    """
+    Spatial index over the buried transmitters of a slope.
+
+    The transmitter positions are kept in a KD-tree, so finding the beacons near a sample costs
+    O(log K) instead of a distance to every one of K beacons. Each sample reads the nearest beacon
+    within the receiver range, the one a receiver locks on to, and only that beacon's signal
+    model is evaluated. Beacons are identified by their index in `antennas`.
+    """
+    def __init__(self, antennas: Sequence[TransmittAntenna]):
+        self._antennas = list(antennas)
+        self._positions = np.array([[a.position.x, a.position.y, a.position.z] for a in self._antennas],
+                                   dtype=float).reshape(-1, 3)
+        # A single beacon needs no tree, its distance is computed directly
+        self._tree = cKDTree(self._positions) if len(self._antennas) > 1 else None
+
+    def __len__(self) -> int:
+        return len(self._antennas)
+
+    def __getitem__(self, index: int) -> TransmittAntenna:
+        return self._antennas[index]
+
+    @property
+    def antennas(self) -> List[TransmittAntenna]:
+        return list(self._antennas)
+
+    @property
+    def positions(self) -> np.ndarray:
+        """Beacon positions, shape (K, 3) with x, y, z."""
+        return self._positions
+
+    def nearest(self, positions: np.ndarray, range: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Nearest beacon of every position.
+        :param positions: Array of shape (N, 3) with x, y, z, or (N, 6+) whose first three columns are x, y, z.
+        :param range: Optional receiver range, beacons farther away than this are not considered.
+        :return: Tuple (beacon_ids, distances) of shape (N,), with -1 and inf where no beacon is in range.
+        """
+        positions = np.atleast_2d(np.asarray(positions, dtype=float))[:, :3]
+        if not len(self._antennas):
+            return np.full(len(positions), -1, dtype=np.int64), np.full(len(positions), np.inf)
+        if self._tree is None:
+            delta = positions - self._positions[0]
+            distances = np.sqrt(np.einsum("ij,ij->i", delta, delta))
+            beacon_ids = np.zeros(len(positions), dtype=np.int64)
+        else:
+            distances, beacon_ids = self._tree.query(positions, k=1, distance_upper_bound=np.inf if range is None else range)
+            beacon_ids = beacon_ids.astype(np.int64)
+        if range is not None:
+            out_of_range = distances > range
+            beacon_ids[out_of_range] = -1
+            distances[out_of_range] = np.inf
+        return beacon_ids, distances
+
+    def within_range(self, position: np.ndarray, range: float) -> List[int]:
+        """Indices of the beacons within range of one (x, y, z) position, in index order."""
+        position = np.asarray(position, dtype=float)[:3]
+        if self._tree is None:
+            return np.flatnonzero(np.linalg.norm(self._positions - position, axis=1) <= range).tolist()
+        return sorted(self._tree.query_ball_point(position, range))
+
+    def segment_candidates(self, origins: np.ndarray, targets: np.ndarray, range: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Beacons that may come within range of straight segments, as (segment, beacon) pairs.
+        A beacon within range of any point of a segment is within range + half its length of
+        the segment's midpoint, so a ball query around every midpoint finds all of them.
+        :param origins: Segment starts, shape (S, 3).
+        :param targets: Segment ends, shape (S, 3).
+        :return: Tuple (segments, beacon_ids) of equal length, ordered by segment.
+        """
+        origins, targets = np.asarray(origins, dtype=float), np.asarray(targets, dtype=float)
+        if not len(self._antennas) or not len(origins):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        midpoints = (origins + targets) / 2
+        radii = range + np.linalg.norm(targets - origins, axis=1) / 2
+        if self._tree is None:
+            delta = midpoints - self._positions[0]
+            segments = np.flatnonzero(np.einsum("ij,ij->i", delta, delta) <= radii ** 2)
+            return segments, np.zeros(len(segments), dtype=np.int64)
+        hits = self._tree.query_ball_point(midpoints, radii)
+        counts = np.fromiter((len(hit) for hit in hits), dtype=np.int64, count=len(hits))
+        segments = np.repeat(np.arange(len(hits)), counts)
+        beacon_ids = np.fromiter((beacon for hit in hits for beacon in sorted(hit)), dtype=np.int64, count=counts.sum())
+        return segments, beacon_ids
+
+    def read_signal(self, position, range: Optional[float] = None) -> Tuple[Optional[float], Optional[float], int]:
+        """
+        Signal of the nearest beacon at one position.
+        :param position: Position of the receiver.
+        :param range: Optional receiver range, see nearest.
+        :return: Tuple (signal_strength, signal_direction, beacon_id), (None, None, -1) when no beacon is in range.
+        """
+        if self._tree is None and range is None and self._antennas:
+            signal_strength, signal_direction = self._antennas[0].read_signal(position)
+            return signal_strength, signal_direction, 0
+        beacon_ids, _ = self.nearest(np.array([[position.x, position.y, position.z]]), range)
+        beacon_id = int(beacon_ids[0])
+        if beacon_id < 0:
+            return None, None, -1
+        signal_strength, signal_direction = self._antennas[beacon_id].read_signal(position)
+        return signal_strength, signal_direction, beacon_id
+
+    def read_signal_batch(self, positions: np.ndarray, range: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Signal of the nearest beacon at many positions. The positions are grouped by beacon, so
+        every beacon's read_signal_batch runs once on just the positions it is read from.
+        :param positions: Array of shape (N, 3) with x, y, z, or (N, 6+) whose first three columns are x, y, z.
+        :param range: Optional receiver range, see nearest.
+        :return: Tuple (signal_strength, signal_direction, beacon_ids) of shape (N,), NaN and -1 where no beacon is in range.
+        """
+        positions = np.asarray(positions, dtype=float)
+        if self._tree is None and range is None and self._antennas:
+            signal_strength, signal_direction = self._antennas[0].read_signal_batch(positions)
+            return signal_strength, signal_direction, np.zeros(len(positions), dtype=np.int64)
+
+        beacon_ids, _ = self.nearest(positions, range)
+        signal_strength = np.full(len(positions), np.nan)
+        signal_direction = np.full(len(positions), np.nan)
+        order = np.argsort(beacon_ids, kind="stable")
+        sorted_ids = beacon_ids[order]
+        first = np.searchsorted(sorted_ids, 0)
+        splits = np.flatnonzero(np.diff(sorted_ids[first:])) + 1
+        for rows in np.split(order[first:], splits):
+            if len(rows):
+                strength, direction = self._antennas[beacon_ids[rows[0]]].read_signal_batch(positions[rows])
+                signal_strength[rows] = strength
+                signal_direction[rows] = direction
+        return signal_strength, signal_direction, beacon_ids
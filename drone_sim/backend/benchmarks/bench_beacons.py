@@ -0,0 +1,75 @@
+"""
+Benchmark for beaconIndex.BeaconIndex: reading the nearest transmitter within receiver range at
+many sample positions on a slope with K buried transmitters, through the KD-tree against the
+brute-force distance to every transmitter. Also checks that both pick the same transmitters.
+
+    python ./benchmarks/bench_beacons.py
+    python ./benchmarks/bench_beacons.py --beacons 1 10 100 1000 10000 --samples 100000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from beaconIndex import BeaconIndex
+from position import Position
+from transmittAntenna import TransmittAntenna
+
+
+def make_antennas(count, rng, size):
+    positions = rng.uniform(-size / 2, size / 2, (count, 3))
+    positions[:, 1] = 0
+    return [TransmittAntenna(i + 1, Position(x, y, z, 0, 0, 0), f"Transmitter {i + 1}", "Omni", 10, 2.4, 5, 0, 360,
+                             "Vertical", "Pattern") for i, (x, y, z) in enumerate(positions.tolist())]
+
+
+def brute_force(antennas, positions, antenna_range):
+    centers = np.array([[a.position.x, a.position.y, a.position.z] for a in antennas])
+    beacon_ids = np.full(len(positions), -1, dtype=np.int64)
+    best = np.full(len(positions), np.inf)
+    for k, center in enumerate(centers):
+        delta = positions - center
+        distance = np.sqrt(np.einsum("ij,ij->i", delta, delta))
+        closer = (distance < best) & (distance <= antenna_range)
+        beacon_ids[closer] = k
+        best[closer] = distance[closer]
+    return beacon_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--beacons", type=int, nargs="+", default=[1, 10, 100, 1000, 10000], help="Numbers of transmitters.")
+    parser.add_argument("--samples", type=int, default=100000, help="Sample positions per read.")
+    parser.add_argument("--range", type=float, default=40.0, help="Receiver range.")
+    parser.add_argument("--size", type=float, default=2000.0, help="Side of the square area the transmitters are buried in.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    positions = rng.uniform(-args.size / 2, args.size / 2, (args.samples, 3))
+    positions[:, 1] = 10
+    print(f"{'beacons':>8} {'build':>10} {'indexed read':>13} {'brute force':>12} {'in range':>9} {'same':>5}")
+    for count in args.beacons:
+        antennas = make_antennas(count, rng, args.size)
+        start = time.perf_counter()
+        index = BeaconIndex(antennas)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, _, beacon_ids = index.read_signal_batch(positions, args.range)
+        index_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = brute_force(antennas, positions, args.range)
+        brute_time = time.perf_counter() - start
+
+        same = bool(np.array_equal(beacon_ids, expected))
+        print(f"{count:>8} {build_time * 1000:>7.1f} ms {index_time * 1000:>10.1f} ms {brute_time * 1000:>9.1f} ms "
+              f"{np.mean(beacon_ids >= 0):>9.1%} {str(same):>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark for Drone.calculatePath, the boustrophedon coverage planner: planner runtime, flight time
+and coverage of the slope surface, for the main.py scenario against its hand-written zigzag and
+for slopes up to several square kilometers.
+
+    python ./benchmarks/bench_coverage.py
+    python ./benchmarks/bench_coverage.py --range 50 --altitude 15
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from coveragePath import boustrophedon_waypoints, path_length
+from position import Position
+from slope import Slope
+from transmittAntenna import TransmittAntenna
+
+ZIGZAG = [
+    (-40, 10, 170), (-40, 23, 140), (40, 23, 140), (40, 37, 128), (-40, 37, 128), (-40, 50, 110),
+    (40, 50, 110), (40, 63, 90), (-40, 63, 90), (-40, 76, 70), (40, 76, 70), (40, 89, 50),
+    (-40, 89, 50), (-40, 102, 30), (40, 102, 30), (40, 115, 10), (-40, 115, 10),
+]
+START = Position(-40, 10, 170, 0, 0, 0)
+SPEED_LIMIT = 10.0
+
+
+def coverage(slope, waypoints, antenna_range, start, grid=80):
+    """Fraction of a grid of points on the slope surface within antenna_range of the flown polyline."""
+    z_top, z_bottom = slope.z_bounds()
+    x, z = np.meshgrid(np.linspace(-slope.width / 2, slope.width / 2, grid), np.linspace(z_top, z_bottom, grid))
+    points = np.column_stack([x.ravel(), slope.ground_height(z.ravel()), z.ravel()])
+
+    polyline = np.vstack([[start.x, start.y, start.z], waypoints])
+    a, ab = polyline[:-1], np.diff(polyline, axis=0)
+    nearest = np.full(len(points), np.inf)
+    for origin, delta in zip(a, ab):
+        t = np.clip((points - origin) @ delta / max(delta @ delta, 1e-12), 0.0, 1.0)
+        nearest = np.minimum(nearest, np.linalg.norm(points - origin - t[:, None] * delta, axis=1))
+    return float(np.mean(nearest <= antenna_range))
+
+
+def time_planner(slope, antenna_range, altitude, repeat):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        waypoints = boustrophedon_waypoints(slope, antenna_range, altitude, start=START)
+        best = min(best, time.perf_counter() - start)
+    return best, waypoints
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--range", type=float, default=30.0, help="Receiver range in meters.")
+    parser.add_argument("--altitude", type=float, default=10.0, help="Flight height above the slope.")
+    parser.add_argument("--repeat", type=int, default=20, help="Planner runs per slope, the best is reported.")
+    args = parser.parse_args()
+    transmittAntenna = TransmittAntenna(1, Position(0, 0, 0, 0, 0, 0), "Transmitter", "Omni", 10, 2.4, 5, 0, 360, "Vertical", "Pattern")
+
+    slope = Slope(width=100, height=200, angle=35, transmittAntenna=transmittAntenna)
+    zigzag = np.array(ZIGZAG, dtype=float)
+    planner_time, planned = time_planner(slope, args.range, args.altitude, args.repeat)
+    print(f"main.py scenario, range {args.range:g} m, altitude {args.altitude:g} m")
+    print(f"{'path':<12} {'waypoints':>9} {'flight time':>12} {'coverage':>9}")
+    for name, waypoints in (("zigzag", zigzag), ("planned", planned)):
+        print(f"{name:<12} {len(waypoints):9d} {path_length(waypoints, START) / SPEED_LIMIT:10.1f} s "
+              f"{coverage(slope, waypoints, args.range, START):9.1%}")
+    print(f"planner runtime: {planner_time * 1e3:.3f} ms\n")
+
+    print(f"{'slope':<14} {'area':>8} {'strips':>6} {'flight time':>12} {'coverage':>9} {'planner':>10}")
+    for width, height in ((100, 200), (500, 500), (1000, 1000), (1000, 3000), (2000, 2000)):
+        slope = Slope(width=width, height=height, angle=35, transmittAntenna=transmittAntenna)
+        planner_time, waypoints = time_planner(slope, args.range, args.altitude, args.repeat)
+        print(f"{width:>5} x {height:<6} {width * height / 1e6:6.2f} km2 {len(waypoints) // 2:6d} "
+              f"{path_length(waypoints, START) / SPEED_LIMIT / 60:8.1f} min {coverage(slope, waypoints, args.range, START):9.1%} "
+              f"{planner_time * 1e3:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark for the "event" trajectory mode against the fixed-step "vectorized" mode: rows and
+time for the main.py zigzag at shrinking time steps, with the transmitter in the middle of the
+slope and a receiver range that only covers part of the flight. The event mode's cost follows
+the number of events (waypoints, range crossings, in-range samples), not flight time / dt.
+
+    python ./benchmarks/bench_event_clock.py
+    python ./benchmarks/bench_event_clock.py --dt 0.1 0.01 0.001 --sample-period 0.1 --range 40
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from drone import Drone
+from position import Position
+from preDefPath import PreDefPath
+from slope import Slope
+from transmittAntenna import TransmittAntenna
+
+ZIGZAG = [
+    (-40, 10, 170), (-40, 23, 140), (40, 23, 140), (40, 37, 128), (-40, 37, 128), (-40, 50, 110),
+    (40, 50, 110), (40, 63, 90), (-40, 63, 90), (-40, 76, 70), (40, 76, 70), (40, 89, 50),
+    (-40, 89, 50), (-40, 102, 30), (40, 102, 30), (40, 115, 10), (-40, 115, 10),
+]
+TRANSMITTER = (0, 60, 100)
+
+
+def fly(mode, dt, antenna_range, **options):
+    transmittAntenna = TransmittAntenna(1, Position(*TRANSMITTER, 0, 0, 0), "Transmitter", "Omni", 10, 2.4, 5, 0, 360, "Vertical", "Pattern")
+    slope = Slope(width=100, height=200, angle=35, transmittAntenna=transmittAntenna)
+    drone = Drone(Position(*ZIGZAG[0], 0, 0, 0), speed_limit=10.0, rot_speed_limit=30.0, slope=slope,
+                  simulation_id=None, antenna_range=antenna_range, trajectory_mode=mode, **options)
+    drone.addPath(PreDefPath([Position(x, y, z, 0, 0, 0) for x, y, z in ZIGZAG]))
+    start = time.perf_counter()
+    drone.followPath(d_time=dt)
+    return time.perf_counter() - start, drone
+
+
+def best(repeat, *args, **options):
+    runs = [fly(*args, **options) for _ in range(repeat)]
+    return min(elapsed for elapsed, _ in runs), runs[0][1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dt", type=float, nargs="+", default=[0.1, 0.01, 0.001], help="Motion time steps of the vectorized mode.")
+    parser.add_argument("--sample-period", type=float, default=0.1, help="Measurement period of the event mode.")
+    parser.add_argument("--refine-period", type=float, default=0.01, help="Measurement period right after a range entry.")
+    parser.add_argument("--refine-window", type=float, default=1.0, help="Seconds of refined sampling after a range entry.")
+    parser.add_argument("--range", type=float, default=40, help="Receiver range.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per configuration, the best is reported.")
+    args = parser.parse_args()
+
+    event_time, event_drone = best(args.repeat, "event", args.sample_period, args.range, refine_period=args.refine_period,
+                                   refine_window=args.refine_window)
+    event_rows = event_drone.samples.array
+    flight_time = event_rows[-1, 0]
+    # Every event row lies on the straight legs, and every measurement is within range
+    distance = np.linalg.norm(event_rows[event_drone.samples.measured(), 1:4] - np.array(TRANSMITTER), axis=1)
+    if len(distance) and distance.max() > args.range * (1 + 1e-9):
+        raise SystemExit(f"Event mode measured out of range: {distance.max():.3f} > {args.range}")
+
+    print(f"flight time: {flight_time:.2f} s, event rows: {len(event_rows)}, measurements: {len(distance)}")
+    print(f"{'mode':>12} {'dt':>8} {'rows':>9} {'measured':>9} {'time':>11}")
+    print(f"{'event':>12} {'-':>8} {len(event_rows):>9} {len(distance):>9} {event_time * 1000:>8.2f} ms")
+    for dt in args.dt:
+        elapsed, drone = best(args.repeat, "vectorized", dt, args.range)
+        rows = drone.samples.array
+        in_range = np.linalg.norm(rows[:, 1:4] - np.array(TRANSMITTER), axis=1) <= args.range
+        print(f"{'vectorized':>12} {dt:>8g} {len(rows):>9} {int(in_range.sum()):>9} {elapsed * 1000:>8.2f} ms"
+              f"  ({elapsed / event_time:.1f}x event)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark for fieldCache.FieldVolumeCache: the field-magnitude volume of a few transmitters at
+several grid resolutions, computed on a miss, against serving it memory-mapped from the cache
+and cutting a 2D slice out of it. "plane miss" computes only the plane, as /api/field does for
+the MagneticField view while the volume is not cached. Uses a temporary cache directory.
+
+    python ./benchmarks/bench_field_cache.py
+    python ./benchmarks/bench_field_cache.py --resolutions 2 1 0.5 --beacons 3
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fieldCache import FieldGridSpec, FieldVolumeCache
+from position import Position
+from transmittAntenna import TransmittAntenna
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolutions", type=float, nargs="+", default=[2.0, 1.0, 0.5], help="Grid spacings in meters.")
+    parser.add_argument("--extent", type=float, default=50.0, help="Half the side of the grid in meters.")
+    parser.add_argument("--beacons", type=int, default=2, help="Number of transmitters.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    antennas = [TransmittAntenna(i + 1, Position(*rng.uniform(-20, 20, 3), *rng.uniform(0, 90, 3)), f"Transmitter {i + 1}",
+                                 "Omni", 10, 2.4, 5, 0, 360, "Vertical", "Pattern", signal_model="dipole")
+                for i in range(args.beacons)]
+    directory = tempfile.mkdtemp()
+    try:
+        cache = FieldVolumeCache(directory)
+        print(f"{'resolution':>10} {'points':>11} {'MB':>7} {'plane miss':>11} {'miss':>10} {'hit':>10} "
+              f"{'hit + slice':>12} {'speedup':>8}")
+        for resolution in args.resolutions:
+            spec = FieldGridSpec.around((0.0, 0.0, 0.0), args.extent, resolution)
+            start = time.perf_counter()
+            _, hit = cache.plane(antennas, spec, 1, spec.index(1, 0.0))
+            plane_time = time.perf_counter() - start
+            assert not hit
+
+            start = time.perf_counter()
+            _, hit = cache.volume(antennas, spec)
+            miss_time = time.perf_counter() - start
+            assert not hit
+
+            start = time.perf_counter()
+            volume, hit = cache.volume(antennas, spec)
+            hit_time = time.perf_counter() - start
+            assert hit
+
+            start = time.perf_counter()
+            plane, _ = cache.plane(antennas, spec, 1, spec.index(1, 0.0))
+            np.ascontiguousarray(plane)
+            slice_time = time.perf_counter() - start
+            print(f"{resolution:>10} {spec.points:>11} {volume.nbytes / 2 ** 20:>7.1f} {plane_time * 1000:>8.1f} ms "
+                  f"{miss_time * 1000:>7.0f} ms "
+                  f"{hit_time * 1000:>7.2f} ms {slice_time * 1000:>9.2f} ms {miss_time / slice_time:>7.0f}x")
+        print(cache.stats())
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
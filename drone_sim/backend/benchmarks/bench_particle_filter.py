@@ -0,0 +1,83 @@
+"""
+Benchmark for particleFilter.ParticleFilter: measurement updates per second and localization
+error against particle count, on the main.py / sweep.DEFAULTS scenario: the zigzag flown over the
+transmitter buried at the origin. Every run adds fresh noise to the bearings and distances,
+which are fed to the filter in batches. "surface" is the default prior on the slope surface,
+"region" a caller-supplied box around the slope that also leaves the height free.
+
+    python ./benchmarks/bench_particle_filter.py
+    python ./benchmarks/bench_particle_filter.py --particles 10000 100000 1000000 --runs 5
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from particleFilter import ParticleFilter
+from sweep import DEFAULTS, build_scenario
+
+
+def simulate_flight():
+    """Fly the sweep.DEFAULTS scenario once, return (transmitter, slope, noiseless measured samples)."""
+    transmittAntenna, slope, drone = build_scenario(dict(DEFAULTS))
+    drone.followPath(d_time=DEFAULTS["time_step"])
+    transmitter = np.array([transmittAntenna.position.x, transmittAntenna.position.y, transmittAntenna.position.z])
+    return transmitter, slope, drone.samples.array[drone.samples.measured()]
+
+
+def search_region(slope, margin):
+    """The slope footprint widened by margin, over the heights of the slope surface widened by margin."""
+    x_min, x_max, z_top, z_bottom = slope.footprint()
+    heights = slope.surface_height(np.array([x_min, x_max]), np.array([z_top, z_bottom]))
+    return (x_min - margin, x_max + margin, heights.min() - margin, heights.max() + margin,
+            min(z_top, z_bottom) - margin, max(z_top, z_bottom) + margin)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--particles", type=int, nargs="+", default=[10000, 100000, 1000000], help="Particle counts to compare.")
+    parser.add_argument("--runs", type=int, default=3, help="Runs with fresh measurement noise per particle count.")
+    parser.add_argument("--batch", type=int, default=10, help="Measurements per weight update.")
+    parser.add_argument("--stride", type=int, default=10, help="Use every stride-th measurement of the flight.")
+    parser.add_argument("--bearing-std", type=float, default=0.05, help="Bearing noise in radians.")
+    parser.add_argument("--distance-std", type=float, default=5.0, help="Distance noise in meters.")
+    parser.add_argument("--margin", type=float, default=20.0, help="Margin of the region prior around the slope.")
+    args = parser.parse_args()
+
+    transmitter, slope, flight = simulate_flight()
+    priors = {"surface": None, "region": search_region(slope, args.margin)}
+    print(f"Transmitter at {transmitter.tolist()}, {len(flight[::args.stride])} measurements per run")
+    print(f"{'prior':>8} {'particles':>10} {'measurements/s':>15} {'updates/s':>10} {'error after 10%':>16} "
+          f"{'final error':>12} {'resamples':>10}")
+    for prior, region in priors.items():
+        for count in args.particles:
+            rng = np.random.default_rng(0)
+            elapsed, measurements, updates, early_errors, errors, resamples = 0.0, 0, 0, [], [], 0
+            for _ in range(args.runs):
+                samples = flight[::args.stride].copy()
+                samples[:, 7] += rng.normal(0, args.distance_std, len(samples))
+                samples[:, 8] += rng.normal(0, args.bearing_std, len(samples))
+                pf = ParticleFilter(slope, particles=count, bearing_std=args.bearing_std, distance_std=args.distance_std,
+                                    seed=1, region=region)
+                early = max(1, len(samples) // 10)
+                for start in range(0, len(samples), args.batch):
+                    batch = samples[start:start + args.batch]
+                    tic = time.perf_counter()
+                    pf.update_arrays(batch[:, 1:4], batch[:, 7], batch[:, 8])
+                    elapsed += time.perf_counter() - tic
+                    measurements += len(batch)
+                    updates += 1
+                    if start < early <= start + args.batch:
+                        early_errors.append(np.linalg.norm(pf.estimate()[0] - transmitter))
+                errors.append(np.linalg.norm(pf.estimate()[0] - transmitter))
+                resamples += pf.resamples
+            print(f"{prior:>8} {count:>10} {measurements / elapsed:>15.0f} {updates / elapsed:>10.1f} "
+                  f"{np.median(early_errors):>14.2f} m {np.median(errors):>10.2f} m {resamples / args.runs:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
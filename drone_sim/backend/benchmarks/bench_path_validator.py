@@ -0,0 +1,92 @@
+"""
+Benchmark for pathValidator.validate_path: checking coverage paths over a large memory-mapped DEM
+against the ground, against sampling every segment at the same spacing. "following" is the
+terrain-following path of short legs, "straight" has one straight leg per strip, and "too low"
+is the straight path with its last quarter pushed into the ground. Both must find the same first
+violating segment. The BVH is built once per slope, its build time is reported separately.
+
+    python ./benchmarks/bench_path_validator.py
+    python ./benchmarks/bench_path_validator.py --cells 8192 --clearance 5
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_terrain import make_dem
+from coveragePath import boustrophedon_waypoints
+from pathValidator import terrain_bvh, validate_path
+from position import Position
+from terrainSlope import TerrainSlope
+from transmittAntenna import TransmittAntenna
+
+
+def dense_validation(slope, points, clearance):
+    """
+    First violating segment and lowest clearance, sampling every segment at half a cell like
+    validate_path does inside the BVH leaves.
+    """
+    origins, deltas = points[:-1], np.diff(points, axis=0)
+    counts = np.ceil(np.linalg.norm(deltas[:, [0, 2]], axis=1) / (slope.cell_size / 2)).astype(np.int64) + 1
+    segments = np.repeat(np.arange(len(origins)), counts)
+    t = (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)) / (counts[segments] - 1)
+    heights = slope.clearance(origins[segments] + deltas[segments] * t[:, None])
+    violating = segments[heights < clearance]
+    return (int(violating[0]) if len(violating) else None), float(heights.min()), len(heights)
+
+
+def best_time(function, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cells", type=int, default=4096, help="Cells per side of the DEM (float32).")
+    parser.add_argument("--cell-size", type=float, default=1.0, help="Cell size in meters.")
+    parser.add_argument("--range", type=float, default=100.0, help="Receiver range, sets the strip spacing.")
+    parser.add_argument("--altitude", type=float, default=10.0, help="Planned height above the ground.")
+    parser.add_argument("--clearance", type=float, default=5.0, help="Required clearance.")
+    args = parser.parse_args()
+
+    antenna = TransmittAntenna(1, Position(0, 0, 0, 0, 0, 0), "Transmitter", "Omni", 10, 2.4, 5, 0, 360, "Vertical", "Pattern")
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "dem.npy")
+        make_dem(path, args.cells, args.cell_size)
+        slope = TerrainSlope.from_file(path, args.cell_size, antenna)
+        start = time.perf_counter()
+        bvh = terrain_bvh(slope)
+        build_time = time.perf_counter() - start
+        print(f"DEM {args.cells} x {args.cells}, BVH {len(bvh.levels)} levels built in {build_time * 1000:.0f} ms")
+
+        print(f"{'path':>10} {'segments':>9} {'validate':>10} {'samples':>9} {'dense':>10} {'samples':>9} "
+              f"{'first violation':>16} {'min clearance':>14} {'same':>5}")
+        for name in ("following", "straight", "too low"):
+            points = boustrophedon_waypoints(slope, args.range, args.altitude,
+                                             follow_spacing=None if name == "following" else np.inf)
+            if name == "too low":
+                points[len(points) * 3 // 4:, 1] -= args.altitude + 20
+            validate_time, validation = best_time(lambda: validate_path(slope, points, clearance=args.clearance))
+            dense_time, (expected, lowest, dense_samples) = best_time(lambda: dense_validation(slope, points, args.clearance))
+            same = validation.first_violation == expected
+            print(f"{name:>10} {len(points) - 1:>9} {validate_time * 1000:>7.1f} ms {validation.samples:>9} "
+                  f"{dense_time * 1000:>7.1f} ms {dense_samples:>9} {str(validation.first_violation):>16} "
+                  f"{lowest:>14.2f} {str(same):>5}")
+        del slope, bvh
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark for persisting simulation rows: the per-row db.log_position/db.log_measurement path
+against the batched db.SimulationRecorder.
+
+Runs against a temporary SQLite file, never the shipped simulation.db.
+
+    python ./benchmarks/bench_recorder.py
+    python ./benchmarks/bench_recorder.py --sizes 10000 100000 1000000 --per-row-limit 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from position import Position, Measurement
+
+
+def make_rows(n):
+    positions = [(Position(i * 0.1, 10.0, 170.0 - i * 0.01, 0, 0, 0), i * 0.05) for i in range(n)]
+    measurements = [Measurement(position, 50.0, 0.5, timestamp) for position, timestamp in positions]
+    return positions, measurements
+
+
+def bench_per_row(simulation_id, positions, measurements):
+    start = time.perf_counter()
+    for position, timestamp in positions:
+        db.log_position(simulation_id, timestamp, position)
+    for measurement in measurements:
+        db.log_measurement(simulation_id, measurement)
+    return time.perf_counter() - start
+
+
+def bench_recorder(simulation_id, positions, measurements):
+    start = time.perf_counter()
+    with db.SimulationRecorder(simulation_id) as recorder:
+        recorder.log_positions(positions)
+        recorder.log_measurements(measurements)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000],
+                        help="Number of positions (and measurements) per run.")
+    parser.add_argument("--per-row-limit", type=int, default=10000,
+                        help="Largest size the per-row path is actually run for. Larger sizes are extrapolated linearly.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DATABASE_FILE = os.path.join(tmp, "bench.db")
+        db.initialize_database()
+
+        print(f"{'rows':>10} {'per-row [s]':>14} {'recorder [s]':>14} {'speedup':>10}")
+        per_row_rate = None
+        for n in args.sizes:
+            positions, measurements = make_rows(n)
+            simulation_id = db.create_simulation(f"bench {n}")
+
+            if n <= args.per_row_limit:
+                per_row = bench_per_row(simulation_id, positions, measurements)
+                per_row_rate = per_row / n
+                per_row_label = f"{per_row:14.3f}"
+            elif per_row_rate is not None:
+                per_row = per_row_rate * n
+                per_row_label = f"{per_row:13.3f}*"
+            else:
+                per_row = None
+                per_row_label = f"{'-':>14}"
+
+            recorder = bench_recorder(simulation_id, positions, measurements)
+            speedup = f"{per_row / recorder:9.1f}x" if per_row is not None else f"{'-':>10}"
+            print(f"{2 * n:>10} {per_row_label} {recorder:14.3f} {speedup}")
+
+        print("* extrapolated from the largest measured per-row run")
+
+
+if __name__ == "__main__":
+    main()
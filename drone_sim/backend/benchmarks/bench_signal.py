@@ -0,0 +1,61 @@
+"""
+Benchmark for TransmittAntenna signal evaluation: read_signal once per Position against
+read_signal_batch on an (N, 3) array.
+
+    python ./benchmarks/bench_signal.py
+    python ./benchmarks/bench_signal.py --sizes 1000 1000000 --range 100
+    python ./benchmarks/bench_signal.py --model dipole_grid
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from position import Position
+from transmittAntenna import SIGNAL_MODELS, TransmittAntenna
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000], help="Number of sample points.")
+    parser.add_argument("--model", choices=SIGNAL_MODELS, default="distance", help="Signal model of the antenna.")
+    parser.add_argument("--range", type=float, default=None, help="Optional receiver range cutoff of both calls.")
+    parser.add_argument("--per-sample-limit", type=int, default=100000,
+                        help="Largest size read_signal is called for one sample at a time.")
+    args = parser.parse_args()
+
+    antenna = TransmittAntenna(1, Position(0, 0, 0, 0, 0, 0), "Transmitter", "Omni", 10, 2.4, 5, 0, 360, "Vertical", "Pattern",
+                               signal_model=args.model)
+    # Build any cached field grid up front, so it is not part of the timings
+    antenna.read_signal_batch(np.zeros((1, 3)))
+    rng = np.random.default_rng(0)
+
+    print(f"{'samples':>10} {'read_signal [samples/s]':>24} {'batch [samples/s]':>20} {'max error':>10}")
+    for n in args.sizes:
+        points = rng.uniform(-200, 200, size=(n, 3))
+
+        start = time.perf_counter()
+        strength, direction = antenna.read_signal_batch(points, range=args.range)
+        batch_rate = n / (time.perf_counter() - start)
+
+        if n <= args.per_sample_limit:
+            positions = [Position(x, y, z, 0, 0, 0) for x, y, z in points.tolist()]
+            start = time.perf_counter()
+            single = [antenna.read_signal(position, args.range) for position in positions]
+            single_rate = f"{n / (time.perf_counter() - start):24,.0f}"
+            single_strength = np.array([np.nan if s is None else s for s, _ in single])
+            assert np.array_equal(np.isnan(single_strength), np.isnan(strength))
+            mask = ~np.isnan(strength)
+            error = f"{np.abs(single_strength[mask] - strength[mask]).max() if mask.any() else 0.0:10.1e}"
+        else:
+            single_rate, error = f"{'-':>24}", f"{'-':>10}"
+
+        print(f"{n:>10} {single_rate} {batch_rate:20,.0f} {error}")
+
+
+if __name__ == "__main__":
+    main()
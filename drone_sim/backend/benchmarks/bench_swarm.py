@@ -0,0 +1,68 @@
+"""
+Benchmark for swarm.Swarm: one batched flight of N drones over a partitioned slope against
+flying the same N paths with one Drone each, in the "vectorized" and (for small N) "step" modes.
+Also checks that every swarm drone flies exactly the poses of its single-drone flight.
+
+    python ./benchmarks/bench_swarm.py
+    python ./benchmarks/bench_swarm.py --drones 1 10 100 1000 --step-limit 5
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from drone import Drone
+from position import Position
+from preDefPath import PreDefPath
+from slope import Slope
+from swarm import Swarm
+from transmittAntenna import TransmittAntenna
+
+
+def make_slope():
+    transmittAntenna = TransmittAntenna(1, Position(0, 0, 0, 0, 0, 0), "Transmitter", "Omni", 10, 2.4, 5, 0, 360, "Vertical", "Pattern")
+    return Slope(width=1000, height=200, angle=35, transmittAntenna=transmittAntenna)
+
+
+def fly_single(slope, swarm, mode, dt):
+    drones = []
+    start = time.perf_counter()
+    for path in swarm.paths:
+        drone = Drone(path.path[0], speed_limit=10.0, rot_speed_limit=30.0, slope=slope, simulation_id=None,
+                      antenna_range=100, trajectory_mode=mode)
+        drone.addPath(PreDefPath(list(path.path)))
+        drone.followPath(d_time=dt)
+        drones.append(drone)
+    return time.perf_counter() - start, drones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drones", type=int, nargs="+", default=[1, 5, 20, 100], help="Swarm sizes.")
+    parser.add_argument("--dt", type=float, default=0.05, help="Simulation time step.")
+    parser.add_argument("--step-limit", type=int, default=5, help="Largest swarm also flown drone by drone in step mode.")
+    args = parser.parse_args()
+
+    slope = make_slope()
+    print(f"{'drones':>7} {'rows':>9} {'swarm':>11} {'vectorized':>11} {'step':>11} {'max pose error':>15}")
+    for count in args.drones:
+        swarm = Swarm.partition(slope, count, speed_limit=10.0, rot_speed_limit=30.0, antenna_range=100)
+        start = time.perf_counter()
+        swarm.followPaths(d_time=args.dt)
+        swarm_time = time.perf_counter() - start
+
+        vec_time, drones = fly_single(slope, Swarm.partition(slope, count, 10.0, 30.0, 100), "vectorized", args.dt)
+        error = max(np.abs(swarm.drone_samples(i)[:, :7] - drone.samples.array[:, :7]).max() for i, drone in enumerate(drones))
+        step = "-"
+        if count <= args.step_limit:
+            step_time, _ = fly_single(slope, Swarm.partition(slope, count, 10.0, 30.0, 100), "step", args.dt)
+            step = f"{step_time * 1000:.1f} ms"
+        print(f"{count:>7} {len(swarm.samples):>9} {swarm_time * 1000:>8.1f} ms {vec_time * 1000:>8.1f} ms {step:>11} {error:>15.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark for terrainSlope.TerrainSlope: bilinear height lookups on a large DEM, memory-mapped as
+one .npy file and as a tile directory, against loading the whole DEM into RAM first. Reports how
+much of the DEM each approach holds in memory (the resident pages of the mapped files, from
+/proc/self/smaps), and checks that all three give the same heights.
+
+    python ./benchmarks/bench_terrain.py
+    python ./benchmarks/bench_terrain.py --cells 8192 --points 1000000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from position import Position
+from slope import CENTER_Z
+from terrainSlope import ElevationGrid, TerrainSlope, write_tiles
+from transmittAntenna import TransmittAntenna
+
+
+def mapped_resident_mb(directory: str):
+    """Resident MB of the memory-mapped files under directory, None where /proc/self/smaps is missing."""
+    try:
+        with open("/proc/self/smaps") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    total, inside = 0, False
+    for line in lines:
+        fields = line.split()
+        if "-" in fields[0] and len(fields) >= 5:
+            inside = len(fields) >= 6 and fields[5].startswith(directory)
+        elif inside and fields[0] == "Rss:":
+            total += int(fields[1])
+    return total / 1024
+
+
+def make_dem(path: str, cells: int, cell_size: float):
+    """A rough 35 degree slope written row block by row block, so it is never whole in memory."""
+    heights = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(cells, cells))
+    x = np.arange(cells) * cell_size
+    for start in range(0, cells, 1024):
+        z = np.arange(start, min(start + 1024, cells))[:, None] * cell_size
+        heights[start:start + len(z)] = ((cells * cell_size - z) * np.tan(np.radians(35))
+                                         + 5 * np.sin(x / 40) * np.cos(z / 55))
+    heights.flush()
+    del heights
+
+
+def timed_lookup(slope, points, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        heights = slope.surface_height(points[:, 0], points[:, 1])
+        best = min(best, time.perf_counter() - start)
+    return best, heights
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cells", type=int, default=4096, help="Cells per side of the DEM (float32).")
+    parser.add_argument("--cell-size", type=float, default=1.0, help="Cell size in meters.")
+    parser.add_argument("--points", type=int, default=1000000, help="Height lookups per run.")
+    parser.add_argument("--window", type=float, default=0.1, help="Fraction of the DEM side the lookups fall in, like one flight.")
+    parser.add_argument("--tile-size", type=int, default=512, help="Cells per tile side.")
+    args = parser.parse_args()
+
+    antenna = TransmittAntenna(1, Position(0, 0, 0, 0, 0, 0), "Transmitter", "Omni", 10, 2.4, 5, 0, 360, "Vertical", "Pattern")
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "dem.npy")
+        make_dem(path, args.cells, args.cell_size)
+        write_tiles(np.load(path, mmap_mode="r"), os.path.join(directory, "tiles"), args.tile_size)
+        print(f"DEM {args.cells} x {args.cells} float32, {os.path.getsize(path) / 2 ** 20:.0f} MB, "
+              f"{args.points} lookups in {args.window:.0%} of each side")
+
+        rng = np.random.default_rng(0)
+        side = (args.cells - 1) * args.cell_size
+        points = rng.uniform(-side / 2, -side / 2 + args.window * side, (args.points, 2))
+        points[:, 1] += side / 2 + CENTER_Z  # the grid is centered on z = CENTER_Z
+
+        print(f"{'grid':>12} {'open':>10} {'lookup':>10} {'DEM in RAM':>11} {'max error':>10}")
+        reference = None
+        for name in ("mmap npy", "tiles", "in memory"):
+            start = time.perf_counter()
+            if name == "mmap npy":
+                slope = TerrainSlope.from_file(path, args.cell_size, antenna)
+            elif name == "tiles":
+                slope = TerrainSlope.from_tiles(os.path.join(directory, "tiles"), args.cell_size, antenna)
+            else:
+                slope = TerrainSlope(ElevationGrid(np.load(path)), args.cell_size, antenna)
+            open_time = time.perf_counter() - start
+            lookup_time, heights = timed_lookup(slope, points)
+            if name == "in memory":
+                resident = os.path.getsize(path) / 2 ** 20
+            else:
+                resident = mapped_resident_mb(directory)
+            reference = heights if reference is None else reference
+            error = np.abs(heights - reference).max()
+            print(f"{name:>12} {open_time * 1000:>7.1f} ms {lookup_time * 1000:>7.1f} ms "
+                  f"{'-' if resident is None else f'{resident:.1f} MB':>11} {error:>10.2e}")
+            del slope
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark for Drone.followPath on the main.py zigzag scenario: the "step" loop against the
+"vectorized" closed-form trajectory mode. Also checks that both modes give the same poses.
+
+    python ./benchmarks/bench_trajectory.py
+    python ./benchmarks/bench_trajectory.py --dt 0.01 --repeat 5
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from drone import Drone
+from position import Position
+from preDefPath import PreDefPath
+from slope import Slope
+from transmittAntenna import TransmittAntenna
+
+ZIGZAG = [
+    (-40, 10, 170), (-40, 23, 140), (40, 23, 140), (40, 37, 128), (-40, 37, 128), (-40, 50, 110),
+    (40, 50, 110), (40, 63, 90), (-40, 63, 90), (-40, 76, 70), (40, 76, 70), (40, 89, 50),
+    (-40, 89, 50), (-40, 102, 30), (40, 102, 30), (40, 115, 10), (-40, 115, 10),
+]
+
+
+def fly(mode, dt):
+    transmittAntenna = TransmittAntenna(1, Position(0, 0, 0, 0, 0, 0), "Transmitter", "Omni", 10, 2.4, 5, 0, 360, "Vertical", "Pattern")
+    slope = Slope(width=100, height=200, angle=35, transmittAntenna=transmittAntenna)
+    drone = Drone(Position(-40, 10, 170, 0, 0, 0), speed_limit=10.0, rot_speed_limit=30.0, slope=slope,
+                  simulation_id=None, antenna_range=100, trajectory_mode=mode)
+    drone.addPath(PreDefPath([Position(x, y, z, 0, 0, 0) for x, y, z in ZIGZAG]))
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        drone.followPath(d_time=dt)
+    return time.perf_counter() - start, drone
+
+
+def as_array(drone):
+    return drone.samples.array[:, :7]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dt", type=float, default=0.05, help="Simulation time step.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per mode, the best is reported.")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in ("step", "vectorized"):
+        runs = [fly(mode, args.dt) for _ in range(args.repeat)]
+        results[mode] = (min(elapsed for elapsed, _ in runs), runs[0][1])
+
+    step_time, step_drone = results["step"]
+    vec_time, vec_drone = results["vectorized"]
+    step_poses, vec_poses = as_array(step_drone), as_array(vec_drone)
+    if step_poses.shape != vec_poses.shape:
+        raise SystemExit(f"Pose count differs: step {step_poses.shape[0]}, vectorized {vec_poses.shape[0]}")
+
+    print(f"poses:           {step_poses.shape[0]}")
+    print(f"max pose error:  {np.abs(step_poses - vec_poses).max():.3e}")
+    step_signal, vec_signal = step_drone.samples.array[:, 7:], vec_drone.samples.array[:, 7:]
+    if not np.array_equal(np.isnan(step_signal), np.isnan(vec_signal)):
+        raise SystemExit("Measured samples differ between step and vectorized mode")
+    print(f"max signal error: {np.nanmax(np.abs(step_signal - vec_signal)):.3e}")
+    print(f"step:            {step_time * 1000:10.2f} ms")
+    print(f"vectorized:      {vec_time * 1000:10.2f} ms")
+    print(f"speedup:         {step_time / vec_time:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
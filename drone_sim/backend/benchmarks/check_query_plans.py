@@ -0,0 +1,49 @@
+"""
+Query-plan regression check: migrates a temporary database to the current schema, fills it with
+a few simulations, single drones and swarms, and exits with status 1 if any query in
+db.HOT_QUERIES scans a whole table or sorts in a temp b-tree. Run it after changing a query or a
+migration in db.py.
+
+    python ./benchmarks/check_query_plans.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import db
+from sampleBuffer import COLUMNS
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DATABASE_FILE = os.path.join(tmp, "plans.db")
+        db.initialize_database()
+        for i in range(20):
+            simulation_id = db.create_simulation(f"plan check {i}")
+            # Every other simulation is a swarm of 4 drones sharing timestamps
+            drones = 4 if i % 2 else 1
+            rows = np.zeros((200 * drones, len(COLUMNS)))
+            rows[:, 0] = np.repeat(np.arange(200) * 0.05, drones)
+            rows[:, 1] = np.arange(len(rows))
+            rows[::3, 7:] = np.nan
+            with db.SimulationRecorder(simulation_id) as recorder:
+                recorder.log_samples_array(rows, drone_ids=np.tile(np.arange(drones), 200))
+        # Refresh the planner statistics now that the tables hold data
+        with db.connection() as conn:
+            conn.execute("ANALYZE")
+
+        print(f"schema version {db.get_schema_version()} of {db.SCHEMA_VERSION}")
+        problems = db.check_query_plans()
+        for name in db.HOT_QUERIES:
+            print(f"{'FAIL' if name in problems else 'ok':>4}  {name}" + (f": {problems[name]}" if name in problems else ""))
+        db.get_pool().close()
+
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
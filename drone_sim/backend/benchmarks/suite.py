@@ -0,0 +1,340 @@
+"""
+Regression benchmark suite for the simulation, estimation, storage and API hot paths.
+
+Every case runs over a grid of scenario sizes (path length, number of measurements, number of
+stored simulations) against a temporary SQLite file, never the shipped simulation.db. Results
+are written as JSON, and compared against a stored baseline: a case whose best time is more
+than --threshold slower than its baseline is a regression, and the run exits with status 1.
+Without a baseline file the run stops at once with status 2, so store one first.
+
+    python ./benchmarks/suite.py                        # run and compare with the baseline
+    python ./benchmarks/suite.py --save-baseline        # run and store the baseline
+    python ./benchmarks/suite.py --filter follow_path --threshold 0.1
+    python ./benchmarks/suite.py --quick                # smallest size of every parameter only
+
+Baselines are machine specific, store one per machine (or CI runner) with --baseline PATH.
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from beaconEstimator import BeaconEstimator
+from drone import Drone
+from position import Position
+from preDefPath import PreDefPath
+from slope import Slope
+from transmittAntenna import TransmittAntenna
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "baseline.json")
+
+# name -> (params, setup). setup(**params) returns the function to time.
+CASES = {}
+
+
+def benchmark(**params):
+    """Register a case, run once for every combination of the parameter values."""
+    def register(setup):
+        CASES[setup.__name__] = (params, setup)
+        return setup
+    return register
+
+
+def zigzag(waypoints):
+    """A zigzag over the slope with the given number of waypoints, as in main.py."""
+    points = []
+    for i in range(waypoints):
+        row, side = divmod(i, 2)
+        x = -40 if (row + side) % 2 == 0 else 40
+        z = 170 - (row % 12) * 13
+        points.append(Position(x, 10 + (row % 12) * 9, z, 0, 0, 0))
+    return points
+
+
+def make_scenario(antenna_range=100):
+    transmittAntenna = TransmittAntenna(1, Position(0, 60, 100, 0, 0, 0), "Transmitter", "Omni", 10, 2.4, 5, 0, 360, "Vertical", "Pattern")
+    slope = Slope(width=100, height=200, angle=35, transmittAntenna=transmittAntenna)
+    return transmittAntenna, slope
+
+
+def make_samples(n):
+    """Sample rows of a flight with n poses, every pose measured."""
+    rows = np.empty((n, 9))
+    rows[:, 0] = np.arange(n) * 0.05
+    rows[:, 1] = np.linspace(-40, 40, n)
+    rows[:, 2] = 10.0
+    rows[:, 3] = np.linspace(170, 10, n)
+    rows[:, 4:7] = 0.0
+    rows[:, 7] = 50.0
+    rows[:, 8] = 0.5
+    return rows
+
+
+def fresh_database(tmp):
+    db.DATABASE_FILE = os.path.join(tmp, f"bench-{len(os.listdir(tmp))}.db")
+    db.initialize_database()
+
+
+def store_simulations(count, samples):
+    """Store count simulations with the given sample rows, return their IDs."""
+    transmittAntenna, slope = make_scenario()
+    antenna_id = db.add_transmitt_antenna(transmittAntenna)
+    slope_id = db.add_slope(slope, antenna_id)
+    ids = []
+    for i in range(count):
+        simulation_id = db.create_simulation(f"Benchmark {i}", slope_id, antenna_id)
+        with db.SimulationRecorder(simulation_id) as recorder:
+            recorder.log_samples_array(samples)
+            recorder.log_simulation_result(Position(*samples[0, 1:7]), transmittAntenna.position,
+                                           Position(*samples[-1, 1:7]), len(samples))
+        ids.append(simulation_id)
+    return ids
+
+
+# Simulation
+
+@benchmark(waypoints=[17, 170], mode=["step", "vectorized", "event"])
+def follow_path(tmp, waypoints, mode):
+    _, slope = make_scenario()
+    path = zigzag(waypoints)
+
+    def run():
+        drone = Drone(path[0], speed_limit=10.0, rot_speed_limit=30.0, slope=slope, simulation_id=None,
+                      antenna_range=100, trajectory_mode=mode)
+        drone.addPath(PreDefPath(path))
+        drone.followPath(d_time=0.05)
+    return run
+
+
+@benchmark(measurements=[1000, 100000], api=["scalar", "batch"])
+def read_signal(tmp, measurements, api):
+    transmittAntenna, _ = make_scenario()
+    rows = make_samples(measurements)
+    if api == "batch":
+        return lambda: transmittAntenna.read_signal_batch(rows[:, 1:4])
+    positions = [Position(*row) for row in rows[:, 1:7].tolist()]
+    return lambda: [transmittAntenna.read_signal(position, 100) for position in positions]
+
+
+# Estimation
+
+@benchmark(measurements=[1000, 100000])
+def beacon_estimator(tmp, measurements):
+    rows = make_samples(measurements)
+    bearings = np.arctan2(rows[:, 2] - 60, rows[:, 1]).tolist()
+    xs, ys = rows[:, 1].tolist(), rows[:, 2].tolist()
+
+    def run():
+        estimator = BeaconEstimator()
+        for x, y, bearing in zip(xs, ys, bearings):
+            estimator.update(x, y, bearing)
+    return run
+
+
+# Storage
+
+@benchmark(rows=[100, 1000])
+def db_log_position(tmp, rows):
+    fresh_database(tmp)
+    positions = [(Position(*row[1:7]), row[0]) for row in make_samples(rows).tolist()]
+
+    def run():
+        # A new simulation per call, like a real run, instead of piling rows onto one
+        simulation_id = db.create_simulation("Benchmark")
+        for position, timestamp in positions:
+            db.log_position(simulation_id, timestamp, position)
+    return run
+
+
+@benchmark(rows=[1000, 100000], storage=["rows", "blob"])
+def db_recorder(tmp, rows, storage):
+    fresh_database(tmp)
+    samples = make_samples(rows)
+
+    def run():
+        simulation_id = db.create_simulation("Benchmark")
+        with db.SimulationRecorder(simulation_id, storage=storage) as recorder:
+            recorder.log_samples_array(samples)
+    return run
+
+
+@benchmark(measurements=[1000, 100000], stored_simulations=[1, 20])
+def get_simulation_full_details(tmp, measurements, stored_simulations):
+    fresh_database(tmp)
+    ids = store_simulations(stored_simulations, make_samples(measurements))
+    return lambda: db.get_simulation_full_details(ids[-1])
+
+
+# API
+
+@benchmark(route=["list", "details", "details_cached", "binary"], measurements=[1000, 100000], stored_simulations=[1, 20])
+def flask_route(tmp, route, measurements, stored_simulations):
+    fresh_database(tmp)
+    ids = store_simulations(stored_simulations, make_samples(measurements))
+    import app as app_module
+    client = app_module.app.test_client()
+    url = {
+        "list": "/api/simulations",
+        "details": f"/api/simulations/{ids[-1]}",
+        "details_cached": f"/api/simulations/{ids[-1]}",
+        "binary": f"/api/simulations/{ids[-1]}/binary",
+    }[route]
+
+    def run():
+        if route != "details_cached":
+            app_module.response_cache.invalidate()
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {url} returned {response.status_code}")
+    return run
+
+
+def time_case(function, repeat, min_time):
+    """
+    Time a function like timeit: pick a loop count so one repeat takes at least min_time,
+    then return per-call times of each repeat.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    times = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number)
+    return times, number
+
+
+def case_key(name, params):
+    return f"{name}[{','.join(f'{key}={value}' for key, value in sorted(params.items()))}]"
+
+
+def run_suite(pattern=None, quick=False, repeat=5, min_time=0.2):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, (params, setup) in CASES.items():
+            names = sorted(params)
+            grids = [params[key][:1] if quick else params[key] for key in names]
+            for values in itertools.product(*grids):
+                case_params = dict(zip(names, values))
+                key = case_key(name, case_params)
+                if pattern and not re.search(pattern, key):
+                    continue
+                # Keep stray output and log warnings of the code under test out of the report
+                with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                    function = setup(tmp, **case_params)
+                    times, number = time_case(function, repeat, min_time)
+                results[key] = {"min": min(times), "median": statistics.median(times), "repeat": repeat, "number": number}
+                print(f"{key:<80} {format_seconds(min(times)):>12}", flush=True)
+    return results
+
+
+def format_seconds(seconds):
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3f} {unit}"
+    return f"{seconds / 1e-9:.1f} ns"
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "system": platform.platform(),
+        "cpus": os.cpu_count(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare best times with the baseline.
+    :return: List of (key, baseline, current, ratio) for the regressions.
+    """
+    regressions = []
+    print(f"\n{'case':<80} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for key, result in results.items():
+        reference = baseline.get("results", {}).get(key)
+        if reference is None:
+            print(f"{key:<80} {'-':>12} {format_seconds(result['min']):>12} {'new':>7}")
+            continue
+        ratio = result["min"] / reference["min"]
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append((key, reference["min"], result["min"], ratio))
+            flag = "  REGRESSION"
+        print(f"{key:<80} {format_seconds(reference['min']):>12} {format_seconds(result['min']):>12} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", help="Only run cases whose key matches this regular expression.")
+    parser.add_argument("--quick", action="store_true", help="Only the smallest value of every parameter.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repeats per case, the best is compared.")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per repeat, fast cases loop.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the baseline instead of comparing.")
+    parser.add_argument("--output", help="Also write the results of this run to a JSON file.")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown before a case counts as a regression, 0.2 = 20%%.")
+    args = parser.parse_args()
+    # Checked before running, a comparison without a baseline would pass whatever the timings
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        parser.error(f"no baseline at {args.baseline}, run with --save-baseline to create one")
+
+    results = run_suite(args.filter, args.quick, args.repeat, args.min_time)
+    report = {"environment": environment(), "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {"environment": report["environment"], "results": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        # Merge, so a filtered run only replaces its own cases
+        baseline["environment"] = report["environment"]
+        baseline["results"].update(results)
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nBaseline with {len(baseline['results'])} cases written to {args.baseline}")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) slower than {args.threshold:.0%} over the baseline:")
+        for key, before, after, ratio in regressions:
+            print(f"  {key}: {format_seconds(before)} -> {format_seconds(after)} ({ratio:.2f}x)")
+        sys.exit(1)
+    print(f"\nNo regressions over {args.threshold:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
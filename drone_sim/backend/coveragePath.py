@@ -0,0 +1,122 @@
+import numpy as np
+from position import Position
+from preDefPath import PreDefPath
+from slope import Slope
+
+# Strip orientations: "contour" strips run across the slope along x at a constant z,
+# "fall_line" strips run up and down the incline at a constant x
+DIRECTIONS = ("auto", "contour", "fall_line")
+
+
+def strip_spacing(antenna_range: float, altitude: float, overlap: float = 0.1, angle: float = 0.0) -> float:
+    """
+    Distance between neighbouring strips on the slope surface. Flying `altitude` above ground
+    inclined by `angle` degrees, the drone is altitude * cos(angle) from the surface, so the
+    receiver hears the transmitter within a swath of half width sqrt(range^2 - (altitude * cos(angle))^2).
+    Neighbouring swaths overlap by the given fraction.
+    """
+    clearance = altitude * np.cos(np.radians(angle))
+    if clearance >= antenna_range:
+        raise ValueError(f"Altitude {altitude} must be below the antenna range {antenna_range}")
+    return 2 * np.sqrt(antenna_range ** 2 - clearance ** 2) * (1 - overlap)
+
+
+def follow_terrain(waypoints: np.ndarray, slope: Slope, altitude: float, spacing: float) -> np.ndarray:
+    """
+    Split every leg into equal pieces no longer than `spacing` horizontally, and put every
+    waypoint `altitude` above the ground, so the path keeps its altitude over uneven terrain.
+    :param waypoints: Array of shape (N, 3) with x, y, z.
+    :return: Array of shape (M, 3) with x, y, z, through the same x, z as the waypoints.
+    """
+    waypoints = np.asarray(waypoints, dtype=float)
+    if len(waypoints) < 2:
+        points = waypoints[:, [0, 2]]
+    else:
+        legs = np.diff(waypoints[:, [0, 2]], axis=0)
+        pieces = np.maximum(1, np.ceil(np.linalg.norm(legs, axis=1) / spacing - 1e-9)).astype(np.int64)
+        leg = np.repeat(np.arange(len(legs)), pieces)
+        fraction = (np.arange(pieces.sum()) - np.repeat(np.cumsum(pieces) - pieces, pieces)) / pieces[leg]
+        points = np.vstack([waypoints[leg][:, [0, 2]] + legs[leg] * fraction[:, None], waypoints[-1, [0, 2]]])
+    return np.column_stack([points[:, 0], slope.surface_height(points[:, 0], points[:, 1]) + altitude, points[:, 1]])
+
+
+def boustrophedon_waypoints(slope: Slope, antenna_range: float, altitude: float = 10.0, overlap: float = 0.1,
+                            direction: str = "auto", start: Position = None,
+                            follow_spacing: float = None) -> np.ndarray:
+    """
+    Waypoints of a boustrophedon (lawnmower) coverage path over the slope rectangle.
+
+    Strips are spaced by strip_spacing and run along the longer side of the slope, which needs the
+    fewest strips and so the fewest turns. Each strip is a straight line at `altitude` above the
+    inclined ground, so two waypoints per strip are enough. Over terrain (Slope.terrain_spacing)
+    the strips are split by follow_terrain to keep the altitude. Of the four corners the path
+    can start from, the one closest to `start` is used.
+    :param slope: The slope to cover, see Slope.z_bounds for its placement.
+    :param antenna_range: Range of the drone's receiver.
+    :param altitude: Height above the ground, measured along y.
+    :param overlap: Fraction of the swath width shared by neighbouring strips.
+    :param direction: "contour", "fall_line" or "auto" for the one with fewer strips.
+    :param start: Position the drone starts from, defaults to the upper left corner.
+    :param follow_spacing: Longest leg of the terrain-following path, defaults to slope.terrain_spacing.
+    :return: Array of shape (2 * strips, 3) with x, y, z of every waypoint in flight order, more
+        when following terrain.
+    """
+    if direction not in DIRECTIONS:
+        raise ValueError(f"Unknown direction {direction!r}, expected one of {DIRECTIONS}")
+    spacing = strip_spacing(antenna_range, altitude, overlap, slope.angle)
+    x_min, _, z_top, z_bottom = slope.footprint()
+
+    # Extents on the slope surface, across and along the strips of each orientation
+    if direction == "auto":
+        direction = "contour" if slope.width >= slope.height else "fall_line"
+    across = slope.height if direction == "contour" else slope.width
+    strips = max(1, int(np.ceil(across / spacing - 1e-9)))
+    # Swaths are centered in equal bands no wider than the spacing, so every band is inside its swath
+    offsets = (np.arange(strips) + 0.5) / strips
+    if direction == "contour":
+        # The point of the surface closest to the drone lies altitude * sin(angle) uphill of the
+        # point below it, so contour strips are flown that far downhill of their swath center
+        offsets = offsets + altitude * np.sin(np.radians(slope.angle)) / slope.height
+
+    # Each strip goes from (u, 0) to (u, 1) in slope coordinates, u across and v along the strip,
+    # and every second strip is flown backwards
+    v = np.tile([0.0, 1.0], strips)
+    v[2::4], v[3::4] = 1.0, 0.0
+
+    candidates = []
+    for flip_u in (False, True):
+        for flip_v in (False, True):
+            cu, cv = np.repeat(offsets[::-1] if flip_u else offsets, 2), (1 - v if flip_v else v)
+            if direction == "contour":
+                x, z = x_min + cv * slope.width, z_top + cu * (z_bottom - z_top)
+            else:
+                x, z = x_min + cu * slope.width, z_top + cv * (z_bottom - z_top)
+            candidates.append(np.column_stack([x, slope.surface_height(x, z) + altitude, z]))
+    if start is None:
+        waypoints = candidates[0]
+    else:
+        origin = np.array([start.x, start.y, start.z])
+        waypoints = min(candidates, key=lambda waypoints: np.linalg.norm(waypoints[0] - origin))
+    follow_spacing = slope.terrain_spacing if follow_spacing is None else follow_spacing
+    if follow_spacing is not None:
+        waypoints = follow_terrain(waypoints, slope, altitude, follow_spacing)
+    return waypoints
+
+
+def boustrophedon_path(slope: Slope, antenna_range: float, altitude: float = 10.0, overlap: float = 0.1,
+                       direction: str = "auto", start: Position = None) -> PreDefPath:
+    """
+    boustrophedon_waypoints as a PreDefPath with level orientation.
+    """
+    waypoints = boustrophedon_waypoints(slope, antenna_range, altitude, overlap, direction, start)
+    return PreDefPath([Position(x, y, z, 0, 0, 0) for x, y, z in waypoints.tolist()])
+
+
+def path_length(waypoints: np.ndarray, start: Position = None) -> float:
+    """
+    Length of the polyline through the waypoints, from `start` if given.
+    """
+    points = np.asarray(waypoints, dtype=float)[:, :3]
+    if start is not None:
+        points = np.vstack([[start.x, start.y, start.z], points])
+    return float(np.linalg.norm(np.diff(points, axis=0), axis=1).sum())
@@ -1,20 +1,178 @@
-from typing import List, Optional
+from typing import List, Optional, Sequence, Tuple
 from position import Position, Measurement  # Assuming Position and Measurement are properly defined
+from sampleBuffer import COLUMNS, SampleBuffer, SIGNAL_STRENGTH
+from beaconEstimator import ESTIMATE_COLUMNS
+from trajectoryBlob import decode_columns, encode_columns
+from decimation import lttb, rdp_significance, select_by_significance
+from metrics import DB_ROWS, timed
+from collections import OrderedDict
 from slope import Slope
 from transmittAntenna import TransmittAntenna
+from contextlib import contextmanager
+import heapq
+import json
+import numpy as np
 import sqlite3
+import threading
+import time
 import os
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATABASE_FILE = os.path.join(BASE_DIR, "simulation.db")
 
-def initialize_database():
+class ConnectionPool:
+    """
+    Pool of reusable SQLite connections for one database file.
+
+    A connection is checked out by one thread at a time. Nested `connection()` blocks on the same
+    thread get the connection that thread already holds, so helpers can call each other without
+    opening a second connection. Idle connections are kept (up to `max_idle`) together with their
+    prepared statement cache, and every new connection is configured with WAL journaling and the
+    pragmas in `PRAGMAS`.
+    """
+    PRAGMAS = (
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA cache_size = -65536",  # 64 MiB page cache
+        "PRAGMA mmap_size = 268435456",  # 256 MiB memory mapped I/O
+        "PRAGMA temp_store = MEMORY",
+    )
+
+    def __init__(self, database_file: str, max_idle: int = 8, cached_statements: int = 256):
+        """
+        :param database_file: Path to the SQLite file.
+        :param max_idle: Maximum number of idle connections kept open.
+        :param cached_statements: Size of each connection's prepared statement cache.
+        """
+        self.database_file = database_file
+        self.max_idle = max_idle
+        self.cached_statements = cached_statements
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Connection that only reads PRAGMA data_version, see data_version
+        self._watcher = None
+        self._watcher_lock = threading.Lock()
+        self._stats = {"acquired": 0, "opened": 0, "acquire_seconds": 0.0, "max_acquire_seconds": 0.0}
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.database_file, check_same_thread=False, cached_statements=self.cached_statements)
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out a connection for the current thread. An open transaction is rolled back when
+        the outermost block exits, so writers must commit explicitly.
+        """
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+
+        start = time.perf_counter()
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        opened = conn is None
+        if opened:
+            conn = self._open()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._stats["acquired"] += 1
+            self._stats["opened"] += opened
+            self._stats["acquire_seconds"] += elapsed
+            self._stats["max_acquire_seconds"] = max(self._stats["max_acquire_seconds"], elapsed)
+
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction:
+                conn.rollback()
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def data_version(self) -> int:
+        """
+        PRAGMA data_version of a connection of its own that never writes. It changes whenever any
+        other connection, from this process or another one such as main.py or sweep.py, commits
+        to the database file.
+        """
+        with self._watcher_lock:
+            if self._watcher is None:
+                self._watcher = self._open()
+            return self._watcher.execute("PRAGMA data_version").fetchone()[0]
+
+    def stats(self) -> dict:
+        """
+        Return acquire counters: number of checkouts, connections opened, total and worst acquire time.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["idle"] = len(self._idle)
+        stats["mean_acquire_seconds"] = stats["acquire_seconds"] / stats["acquired"] if stats["acquired"] else 0.0
+        return stats
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        with self._watcher_lock:
+            if self._watcher is not None:
+                idle.append(self._watcher)
+                self._watcher = None
+        for conn in idle:
+            conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(database_file: Optional[str] = None) -> ConnectionPool:
     """
-    Initialize the SQLite database with tables for simulations, slopes, and transmitt_antennas.
+    Return the shared ConnectionPool for a database file, creating it on first use.
+    :param database_file: Path to the SQLite file, defaults to DATABASE_FILE.
     """
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
+    database_file = database_file or DATABASE_FILE
+    with _pools_lock:
+        pool = _pools.get(database_file)
+        if pool is None:
+            pool = _pools[database_file] = ConnectionPool(database_file)
+        return pool
 
+def connection(database_file: Optional[str] = None):
+    """
+    Context manager yielding a pooled connection to the simulation database.
+    :param database_file: Path to the SQLite file, defaults to DATABASE_FILE.
+    """
+    return get_pool(database_file).connection()
+
+def database_version(database_file: Optional[str] = None) -> int:
+    """
+    Counter that changes whenever the simulation database is written, by any process, see
+    ConnectionPool.data_version. Caches of data read from it compare the counter to tell whether they are stale.
+    :param database_file: Path to the SQLite file, defaults to DATABASE_FILE.
+    """
+    return get_pool(database_file).data_version()
+
+def connection_stats(database_file: Optional[str] = None) -> dict:
+    """
+    Return the connection acquire statistics of the pool for a database file.
+    """
+    return get_pool(database_file).stats()
+
+def _migration_1_base_schema(cursor: sqlite3.Cursor):
+    """
+    Tables for simulations, slopes, transmitt_antennas, results, paths, measurements and sweeps.
+    Uses IF NOT EXISTS, so databases created before migrations were tracked are adopted as is.
+    """
     # Table for simulation metadata
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS simulations (
@@ -110,26 +268,268 @@ def initialize_database():
         )
     """)
 
-    conn.commit()
-    conn.close()
+    # Per-run metrics of parameter sweeps, see sweep.py
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sweep_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sweep_name TEXT NOT NULL,
+            simulation_id INTEGER NOT NULL,
+            parameters TEXT NOT NULL,
+            steps INTEGER NOT NULL,
+            flight_time REAL NOT NULL,
+            closest_approach REAL NOT NULL,
+            detections INTEGER NOT NULL,
+            runtime REAL NOT NULL,
+            FOREIGN KEY (simulation_id) REFERENCES simulations (id)
+        )
+    """)
+
+def _migration_2_indexes(cursor: sqlite3.Cursor):
+    """
+    Indexes for the hot per-simulation queries, which all filter on simulation_id and order by timestamp.
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_drone_paths_simulation_timestamp ON drone_paths (simulation_id, timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_drone_measurements_simulation_timestamp ON drone_measurements (simulation_id, timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_simulation_results_simulation ON simulation_results (simulation_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sweep_runs_simulation ON sweep_runs (simulation_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sweep_runs_sweep_name ON sweep_runs (sweep_name)")
+    cursor.execute("ANALYZE")
 
-def create_simulation(description: str, slope_id: Optional[int] = None, transmitt_antenna_id: Optional[int] = None) -> int:
+def _migration_3_trajectory_blobs(cursor: sqlite3.Cursor):
     """
-    Create a simulation and return its ID.
+    Optional compact storage of a simulation's path and measurements as one binary blob each,
+    see trajectoryBlob.py. Simulations stored this way have no rows in drone_paths/drone_measurements.
     """
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS trajectory_blobs (
+            simulation_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            rows INTEGER NOT NULL,
+            columns TEXT NOT NULL,
+            dtype TEXT NOT NULL,
+            delta INTEGER NOT NULL,
+            compression TEXT NOT NULL,
+            data BLOB NOT NULL,
+            PRIMARY KEY (simulation_id, kind),
+            FOREIGN KEY (simulation_id) REFERENCES simulations (id)
+        )
+    """)
 
+def _migration_4_beacon_estimates(cursor: sqlite3.Cursor):
+    """
+    Online transmitter position estimates (beaconEstimator.BeaconEstimator) logged next to the
+    measurements they were updated with, one row per measurement, with the estimate covariance.
+    """
     cursor.execute("""
-        INSERT INTO simulations (description, slope_id, transmitt_antenna_id)
-        VALUES (?, ?, ?)
-    """, (description, slope_id, transmitt_antenna_id))
+        CREATE TABLE IF NOT EXISTS beacon_estimates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            simulation_id INTEGER NOT NULL,
+            timestamp REAL NOT NULL,
+            x REAL NOT NULL,
+            y REAL NOT NULL,
+            var_x REAL NOT NULL,
+            cov_xy REAL NOT NULL,
+            var_y REAL NOT NULL,
+            FOREIGN KEY (simulation_id) REFERENCES simulations (id)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_beacon_estimates_simulation_time ON beacon_estimates(simulation_id, timestamp)")
 
-    simulation_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+def _migration_5_drone_ids(cursor: sqlite3.Cursor):
+    """
+    Drone of every path and measurement row, so a swarm (swarm.Swarm) is stored under one
+    simulation. Rows of single-drone simulations are drone 0.
+    """
+    cursor.execute("ALTER TABLE drone_paths ADD COLUMN drone_id INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("ALTER TABLE drone_measurements ADD COLUMN drone_id INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_drone_paths_simulation_drone_timestamp ON drone_paths (simulation_id, drone_id, timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_drone_measurements_simulation_drone_timestamp ON drone_measurements (simulation_id, drone_id, timestamp)")
+    # Without statistics for the new indexes the planner picks them for the per-simulation queries
+    # and sorts by timestamp in a temp b-tree
+    cursor.execute("ANALYZE")
+
+def _migration_6_simulation_antennas(cursor: sqlite3.Cursor):
+    """
+    Several transmitters per simulation. simulation_antennas maps the beacon index of every
+    transmitter of the simulated slope (its position in Slope.transmittAntennas) to its
+    transmitt_antennas row, and every measurement names the transmitter it was read from.
+    Existing simulations get their one transmitter as beacon 0.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS simulation_antennas (
+            simulation_id INTEGER NOT NULL,
+            beacon_index INTEGER NOT NULL,
+            transmitt_antenna_id INTEGER NOT NULL,
+            PRIMARY KEY (simulation_id, beacon_index),
+            FOREIGN KEY (simulation_id) REFERENCES simulations (id),
+            FOREIGN KEY (transmitt_antenna_id) REFERENCES transmitt_antennas (id)
+        )
+    """)
+    cursor.execute("""
+        INSERT OR IGNORE INTO simulation_antennas (simulation_id, beacon_index, transmitt_antenna_id)
+        SELECT id, 0, transmitt_antenna_id FROM simulations WHERE transmitt_antenna_id IS NOT NULL
+    """)
+    cursor.execute("ALTER TABLE drone_measurements ADD COLUMN transmitt_antenna_id INTEGER REFERENCES transmitt_antennas (id)")
+    cursor.execute("""
+        UPDATE drone_measurements
+        SET transmitt_antenna_id = (SELECT transmitt_antenna_id FROM simulations WHERE simulations.id = drone_measurements.simulation_id)
+    """)
+    cursor.execute("ANALYZE")
+
+def _migration_7_stream_indexes(cursor: sqlite3.Cursor):
+    """
+    (simulation_id, timestamp, drone_id) indexes for iter_simulation_rows, which pages on
+    (timestamp, drone_id, id) so the rows of a swarm sharing a timestamp are never split.
+    The id is the rowid, which ends every index entry.
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_drone_paths_simulation_timestamp_drone ON drone_paths (simulation_id, timestamp, drone_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_drone_measurements_simulation_timestamp_drone ON drone_measurements (simulation_id, timestamp, drone_id)")
+    cursor.execute("ANALYZE")
+
+# Schema migrations in order. The database's PRAGMA user_version is the number of migrations applied.
+# Append new migrations at the end; never edit or reorder released ones.
+MIGRATIONS = [
+    _migration_1_base_schema,
+    _migration_2_indexes,
+    _migration_3_trajectory_blobs,
+    _migration_4_beacon_estimates,
+    _migration_5_drone_ids,
+    _migration_6_simulation_antennas,
+    _migration_7_stream_indexes,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def get_schema_version() -> int:
+    """
+    Return the number of migrations applied to the database.
+    """
+    with connection() as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def initialize_database():
+    """
+    Initialize the SQLite database, applying every migration the database has not seen yet.
+    Each migration runs in its own transaction together with the user_version bump.
+    """
+    with connection() as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for target, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            try:
+                migration(cursor)
+                cursor.execute(f"PRAGMA user_version = {target}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+# Queries of iter_simulation_rows, formatted with their WHERE conditions
+STREAM_PATH_SQL = ("SELECT timestamp, x, y, z, pitch, yaw, roll, drone_id, id FROM drone_paths WHERE {where} "
+                   "ORDER BY timestamp ASC, drone_id ASC, id ASC")
+STREAM_MEASUREMENT_SQL = ("SELECT timestamp, x, y, z, pitch, yaw, roll, signal_strength, signal_direction, drone_id "
+                          "FROM drone_measurements WHERE {where} ORDER BY timestamp ASC, drone_id ASC, id ASC")
+
+# Queries on the hot path of the API and the simulation writer. check_query_plans() verifies
+# that none of them needs a full table scan.
+HOT_QUERIES = {
+    "drone_path": ("SELECT timestamp, x, y, z, pitch, yaw, roll FROM drone_paths WHERE simulation_id = ? ORDER BY timestamp ASC", (1,)),
+    "drone_path_window": ("SELECT timestamp, x, y, z, pitch, yaw, roll FROM drone_paths WHERE simulation_id = ? AND timestamp > ? ORDER BY timestamp ASC LIMIT ?", (1, 0.0, 100)),
+    "drone_measurements": ("SELECT timestamp, x, y, z, pitch, yaw, roll, signal_strength, signal_direction FROM drone_measurements WHERE simulation_id = ? ORDER BY timestamp ASC", (1,)),
+    "drone_measurements_window": ("SELECT timestamp, signal_strength FROM drone_measurements WHERE simulation_id = ? AND timestamp >= ? AND timestamp <= ? ORDER BY timestamp ASC", (1, 0.0, 10.0)),
+    "simulation_result": ("SELECT start_position, antenna_center, final_position, steps FROM simulation_results WHERE simulation_id = ?", (1,)),
+    "simulation": ("SELECT description, slope_id, transmitt_antenna_id FROM simulations WHERE id = ?", (1,)),
+    "sweep_runs": ("SELECT * FROM sweep_runs WHERE sweep_name = ?", ("sweep",)),
+    "drone_path_by_drone": ("SELECT timestamp, x, y, z, pitch, yaw, roll FROM drone_paths WHERE simulation_id = ? AND drone_id = ? ORDER BY timestamp ASC", (1, 0)),
+    "drone_ids": ("SELECT DISTINCT drone_id FROM drone_paths WHERE simulation_id = ?", (1,)),
+    "simulation_antennas": ("SELECT beacon_index, transmitt_antenna_id FROM simulation_antennas WHERE simulation_id = ? ORDER BY beacon_index", (1,)),
+    "measurement_antennas": ("SELECT transmitt_antenna_id FROM drone_measurements WHERE simulation_id = ? ORDER BY timestamp ASC, id ASC", (1,)),
+    "beacon_estimate_latest": ("SELECT timestamp, x, y, var_x, cov_xy, var_y FROM beacon_estimates WHERE simulation_id = ? ORDER BY timestamp DESC LIMIT 1", (1,)),
+    "trajectory_blob": ("SELECT rows, columns, dtype, delta, compression, data FROM trajectory_blobs WHERE simulation_id = ? AND kind = ?", (1, "path")),
+    "stream_path": (STREAM_PATH_SQL.format(where="simulation_id = ?"), (1,)),
+    "stream_path_page": (STREAM_PATH_SQL.format(where="simulation_id = ? AND timestamp >= ? AND (timestamp, drone_id, id) > (?, ?, ?)")
+                         + " LIMIT ?", (1, 0.0, 0.0, 0, 0, 100)),
+    "stream_path_page_end": (STREAM_PATH_SQL.format(where="simulation_id = ? AND timestamp >= ? AND (timestamp, drone_id, id) > (?, ?, ?)")
+                             + " LIMIT 1 OFFSET ?", (1, 0.0, 0.0, 0, 0, 99)),
+    "stream_path_by_drone": (STREAM_PATH_SQL.format(where="simulation_id = ? AND drone_id = ?") + " LIMIT ?", (1, 0, 100)),
+    "stream_measurements": (STREAM_MEASUREMENT_SQL.format(where="simulation_id = ?"), (1,)),
+    "stream_measurements_page": (STREAM_MEASUREMENT_SQL.format(
+        where="simulation_id = ? AND timestamp >= ? AND (timestamp, drone_id) > (?, ?) AND timestamp <= ? AND (timestamp, drone_id) <= (?, ?)"),
+        (1, 0.0, 0.0, 0, 5.0, 5.0, 0)),
+}
+
+def check_query_plans() -> dict:
+    """
+    Run EXPLAIN QUERY PLAN on every query in HOT_QUERIES.
+    :return: Dictionary of query name to the plan lines that scan a whole table or sort in a temp b-tree.
+        An empty dictionary means every hot query is served by an index.
+    """
+    problems = {}
+    with connection() as conn:
+        for name, (sql, params) in HOT_QUERIES.items():
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+            bad = [line for line in plan
+                   if (line.startswith("SCAN") and "USING" not in line) or "TEMP B-TREE" in line]
+            if bad:
+                problems[name] = bad
+    return problems
+
+# Callbacks run with the simulation ID after a simulation is written or deleted, so caches of
+# derived data (levels of detail, HTTP responses) can drop their entries for it.
+_simulation_listeners = []
+
+def add_simulation_listener(callback):
+    """
+    Register callback(simulation_id) to run after a simulation is written or deleted through this module.
+    """
+    _simulation_listeners.append(callback)
+
+def notify_simulation_changed(simulation_id: int):
+    """
+    Run the simulation listeners. Call after writing to a simulation outside of this module.
+    """
+    for callback in _simulation_listeners:
+        callback(simulation_id)
+
+def create_simulation(description: str, slope_id: Optional[int] = None, transmitt_antenna_id: Optional[int] = None) -> int:
+    """
+    Create a simulation and return its ID. The transmitter becomes beacon 0 of the simulation,
+    link further ones with link_simulation_antennas.
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            INSERT INTO simulations (description, slope_id, transmitt_antenna_id)
+            VALUES (?, ?, ?)
+        """, (description, slope_id, transmitt_antenna_id))
+
+        simulation_id = cursor.lastrowid
+        if transmitt_antenna_id is not None:
+            cursor.execute("""
+                INSERT INTO simulation_antennas (simulation_id, beacon_index, transmitt_antenna_id)
+                VALUES (?, 0, ?)
+            """, (simulation_id, transmitt_antenna_id))
+        conn.commit()
+    notify_simulation_changed(simulation_id)
     return simulation_id
 
+def link_simulation_antennas(simulation_id: int, transmitt_antenna_ids: Sequence[int]):
+    """
+    Link the transmitters of a simulation's slope, in the order of Slope.transmittAntennas, so
+    that the beacon index of every measurement maps to its transmitt_antennas row.
+    Call before recording the samples.
+    :param simulation_id: ID of the simulation.
+    :param transmitt_antenna_ids: transmitt_antennas ID of every beacon index, see add_transmitt_antenna.
+    """
+    with connection() as conn:
+        conn.executemany("""
+            INSERT OR REPLACE INTO simulation_antennas (simulation_id, beacon_index, transmitt_antenna_id)
+            VALUES (?, ?, ?)
+        """, [(simulation_id, beacon_index, antenna_id) for beacon_index, antenna_id in enumerate(transmitt_antenna_ids)])
+        conn.commit()
+    notify_simulation_changed(simulation_id)
+
 
 def log_position(simulation_id: int, timestamp: float, position: Position):
     """
@@ -138,17 +538,17 @@ def log_position(simulation_id: int, timestamp: float, position: Position):
     :param timestamp: The simulated time when the position was recorded.
     :param position: The Position object representing the drone's position and rotation.
     """
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
+    with connection() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute("""
-        INSERT INTO drone_paths (simulation_id, timestamp, x, y, z, pitch, yaw, roll)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (simulation_id, timestamp, position.x, position.y, position.z,
-          position.pitch, position.yaw, position.roll))
+        cursor.execute("""
+            INSERT INTO drone_paths (simulation_id, timestamp, x, y, z, pitch, yaw, roll)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (simulation_id, timestamp, position.x, position.y, position.z,
+              position.pitch, position.yaw, position.roll))
 
-    conn.commit()
-    conn.close()
+        conn.commit()
+    notify_simulation_changed(simulation_id)
 
 def log_measurement(simulation_id: int, measurement: Measurement):
     """
@@ -160,17 +560,17 @@ def log_measurement(simulation_id: int, measurement: Measurement):
 
     position = measurement.position
     timestamp = measurement.timestamp
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
+    with connection() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute("""
-        INSERT INTO drone_measurements (simulation_id, timestamp, x, y, z, pitch, yaw, roll, signal_strength, signal_direction)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (simulation_id, timestamp, position.x, position.y, position.z,
-          position.pitch, position.yaw, position.roll, measurement.signal_strength, measurement.signal_direction))
+        cursor.execute("""
+            INSERT INTO drone_measurements (simulation_id, timestamp, x, y, z, pitch, yaw, roll, signal_strength, signal_direction)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (simulation_id, timestamp, position.x, position.y, position.z,
+              position.pitch, position.yaw, position.roll, measurement.signal_strength, measurement.signal_direction))
 
-    conn.commit()
-    conn.close()
+        conn.commit()
+    notify_simulation_changed(simulation_id)
 
 def log_simulation_result(simulation_id: int, start_position: Position, antenna_center: Position, final_position: Position, steps: int):
     """
@@ -181,17 +581,465 @@ def log_simulation_result(simulation_id: int, start_position: Position, antenna_
     :param final_position: Final Position object of the drone.
     :param steps: Total steps taken in the simulation.
     """
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
+    with connection() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute("""
-        INSERT INTO simulation_results (simulation_id, start_position, antenna_center, final_position, steps)
-        VALUES (?, ?, ?, ?, ?)
-    """, (simulation_id, str(start_position.getStep()), str(antenna_center.getStep()), 
-          str(final_position.getStep()), steps))
+        cursor.execute("""
+            INSERT INTO simulation_results (simulation_id, start_position, antenna_center, final_position, steps)
+            VALUES (?, ?, ?, ?, ?)
+        """, (simulation_id, str(start_position.getStep()), str(antenna_center.getStep()), 
+              str(final_position.getStep()), steps))
+
+        conn.commit()
+    notify_simulation_changed(simulation_id)
+
+def log_sweep_run(sweep_name: str, simulation_id: int, parameters: dict, metrics: dict):
+    """
+    Log the parameters and metrics of one parameter sweep run.
+    :param sweep_name: Name shared by all runs of the sweep.
+    :param simulation_id: ID of the simulation created for the run.
+    :param parameters: The scenario parameters, stored as JSON.
+    :param metrics: Dictionary with steps, flight_time, closest_approach, detections and runtime.
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            INSERT INTO sweep_runs (sweep_name, simulation_id, parameters, steps, flight_time, closest_approach, detections, runtime)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (sweep_name, simulation_id, json.dumps(parameters), metrics["steps"], metrics["flight_time"],
+              metrics["closest_approach"], metrics["detections"], metrics["runtime"]))
+
+        conn.commit()
+    notify_simulation_changed(simulation_id)
+
+def delete_simulation(simulation_id: int) -> bool:
+    """
+    Delete a simulation with its path, measurements, trajectory blobs, result and sweep run.
+    The slope and antenna rows are kept, other simulations may share them.
+    :return: True if the simulation existed.
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        for table in ("drone_paths", "drone_measurements", "beacon_estimates", "trajectory_blobs", "simulation_results",
+                      "sweep_runs", "simulation_antennas"):
+            cursor.execute(f"DELETE FROM {table} WHERE simulation_id = ?", (simulation_id,))
+        cursor.execute("DELETE FROM simulations WHERE id = ?", (simulation_id,))
+        deleted = cursor.rowcount > 0
+        conn.commit()
+    notify_simulation_changed(simulation_id)
+    return deleted
+
+class SimulationRecorder:
+    """
+    Collects the positions, measurements and final result of one simulation run and writes
+    them over a single connection with executemany, instead of one connection and commit per row.
+
+    Usage:
+        with SimulationRecorder(simulation_id) as recorder:
+            recorder.log_position(timestamp, position)
+            recorder.log_measurement(measurement)
+            recorder.log_simulation_result(start_position, antenna_center, final_position, steps)
+
+    With storage="blob", positions and measurements given through log_samples are stored as two
+    compressed column blobs in trajectory_blobs instead of one row per sample.
+
+    Rows are flushed in chunks of `chunk_size` while recording, and everything is committed as
+    one transaction when the context exits. If the block raises, the transaction is rolled back.
+    The recorder holds the calling thread's pooled connection, so other db functions called
+    inside the block share (and commit) the same transaction.
+    """
+    def __init__(self, simulation_id: int, chunk_size: int = 10000, database_file: Optional[str] = None,
+                 storage: str = "rows", blob_options: Optional[dict] = None):
+        """
+        :param simulation_id: ID of the simulation the recorded rows belong to.
+        :param chunk_size: Number of buffered rows that triggers a flush to the open transaction.
+        :param database_file: Path to the SQLite file, defaults to DATABASE_FILE at the time the context is entered.
+        :param storage: "rows" or "blob", how log_samples stores the samples.
+        :param blob_options: dtype, delta and compression passed to trajectoryBlob.encode_columns.
+        """
+        if storage not in ("rows", "blob"):
+            raise ValueError(f"Unknown storage {storage!r}, expected 'rows' or 'blob'")
+        self.simulation_id = simulation_id
+        self.chunk_size = chunk_size
+        self.database_file = database_file
+        self.storage = storage
+        self.blob_options = blob_options or {}
+        self._conn = None
+        self._conn_context = None
+        self._positions = []
+        self._measurements = []
+        self._estimates = []
+        self._result = None
+        self._blobs = []
+        self._beacon_antennas = None
 
-    conn.commit()
-    conn.close()
+    def __enter__(self):
+        self._conn_context = connection(self.database_file)
+        self._conn = self._conn_context.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.flush()
+                with timed(phase="db_commit"):
+                    self._conn.commit()
+                notify_simulation_changed(self.simulation_id)
+            else:
+                self._conn.rollback()
+        finally:
+            self._conn = None
+            self._conn_context.__exit__(exc_type, exc, tb)
+            self._conn_context = None
+        return False
+
+    def log_position(self, timestamp: float, position: Position, drone_id: int = 0):
+        """
+        Buffer a drone position at a given timestamp.
+        :param timestamp: The simulated time when the position was recorded.
+        :param position: The Position object representing the drone's position and rotation.
+        :param drone_id: Drone of a swarm the position belongs to.
+        """
+        self._positions.append((self.simulation_id, timestamp, position.x, position.y, position.z,
+                                position.pitch, position.yaw, position.roll, drone_id))
+        if len(self._positions) >= self.chunk_size:
+            self._flush_positions()
+
+    def log_positions(self, position_hist: List[Tuple[Position, float]]):
+        """
+        Buffer a whole position history, as stored in Drone.positionHist.
+        :param position_hist: List of (Position, timestamp) tuples.
+        """
+        for position, timestamp in position_hist:
+            self.log_position(timestamp, position)
+
+    def log_measurement(self, measurement: Measurement, drone_id: int = 0, beacon_id: int = 0):
+        """
+        Buffer a drone measurement.
+        :param measurement: The Measurement object to store.
+        :param drone_id: Drone of a swarm that measured it.
+        :param beacon_id: Index of the slope transmitter it was read from, see link_simulation_antennas.
+        """
+        position = measurement.position
+        antenna_id = self._transmitt_antenna_ids(np.array([beacon_id]))[0]
+        self._measurements.append((self.simulation_id, measurement.timestamp, position.x, position.y, position.z,
+                                   position.pitch, position.yaw, position.roll,
+                                   measurement.signal_strength, measurement.signal_direction, drone_id, antenna_id))
+        if len(self._measurements) >= self.chunk_size:
+            self._flush_measurements()
+
+    def log_measurements(self, measurements: List[Measurement]):
+        """
+        Buffer a list of measurements, as stored in Drone.measurements.
+        :param measurements: List of Measurement objects.
+        """
+        for measurement in measurements:
+            self.log_measurement(measurement)
+
+    def log_samples(self, samples: SampleBuffer):
+        """
+        Buffer every pose of a SampleBuffer (Drone.samples) as a position, and every pose that
+        carries a measurement as a measurement, straight from its array.
+        :param samples: The SampleBuffer to store.
+        """
+        self.log_samples_array(samples.array, beacon_ids=samples.beacon_ids)
+
+    def log_samples_array(self, rows: np.ndarray, drone_ids: Optional[np.ndarray] = None,
+                          beacon_ids: Optional[np.ndarray] = None):
+        """
+        Same as log_samples, for a bare array with the columns of sampleBuffer.COLUMNS.
+        :param rows: Array of shape (N, len(COLUMNS)).
+        :param drone_ids: Optional drone of every row, for the samples of a swarm (swarm.Swarm).
+            Blob storage has no drone column and only takes the samples of drone 0.
+        :param beacon_ids: Optional index of the slope transmitter every measurement was read
+            from (SampleBuffer.beacon_ids), beacon 0 by default. Stored as the measurement's
+            transmitt_antenna_id through simulation_antennas. Blob storage has no transmitter
+            column and only takes measurements of beacon 0.
+        """
+        drone_ids = np.zeros(len(rows), dtype=np.int64) if drone_ids is None else np.asarray(drone_ids, dtype=np.int64)
+        is_measured = ~np.isnan(rows[:, SIGNAL_STRENGTH])
+        measured = rows[is_measured]
+        beacon_ids = np.zeros(len(measured), dtype=np.int64) if beacon_ids is None else np.asarray(beacon_ids, dtype=np.int64)[is_measured]
+        if self.storage == "blob":
+            if drone_ids.any():
+                raise ValueError("Blob storage holds a single drone, store swarm samples with storage='rows'")
+            if beacon_ids.any():
+                raise ValueError("Blob storage holds the measurements of beacon 0 only, store them with storage='rows'")
+            self._blobs = [
+                ("path",) + encode_columns(rows[:, :SIGNAL_STRENGTH], COLUMNS[:SIGNAL_STRENGTH], **self.blob_options),
+                ("measurements",) + encode_columns(measured, COLUMNS, **self.blob_options),
+            ]
+            return
+
+        self._flush_positions()
+        self._flush_measurements()
+        # Rows are turned into tuples one chunk_size slice at a time, so only one chunk of them exists at once
+        for start in range(0, len(rows), self.chunk_size):
+            stop = start + self.chunk_size
+            self._positions = [(self.simulation_id, *row, drone_id)
+                               for row, drone_id in zip(rows[start:stop, :SIGNAL_STRENGTH].tolist(), drone_ids[start:stop].tolist())]
+            self._flush_positions()
+        measured_drone_ids = drone_ids[is_measured]
+        for start in range(0, len(measured), self.chunk_size):
+            stop = start + self.chunk_size
+            antenna_ids = self._transmitt_antenna_ids(beacon_ids[start:stop])
+            self._measurements = [(self.simulation_id, *row, drone_id, antenna_id)
+                                  for row, drone_id, antenna_id in zip(measured[start:stop].tolist(),
+                                                                       measured_drone_ids[start:stop].tolist(), antenna_ids)]
+            self._flush_measurements()
+
+    def log_beacon_estimates(self, history: np.ndarray):
+        """
+        Buffer the estimate history of a BeaconEstimator (Drone.beacon_estimator.history).
+        :param history: Array of shape (N, len(beaconEstimator.ESTIMATE_COLUMNS)).
+        """
+        self._estimates.extend((self.simulation_id, *row) for row in np.asarray(history, dtype=float).tolist())
+        if len(self._estimates) >= self.chunk_size:
+            self._flush_estimates()
+
+    def log_simulation_result(self, start_position: Position, antenna_center: Position, final_position: Position, steps: int):
+        """
+        Store the final result of the simulation. It is written together with the buffered rows.
+        :param start_position: Starting Position object of the drone.
+        :param antenna_center: Antenna center Position object.
+        :param final_position: Final Position object of the drone.
+        :param steps: Total steps taken in the simulation.
+        """
+        self._result = (self.simulation_id, str(start_position.getStep()), str(antenna_center.getStep()),
+                        str(final_position.getStep()), steps)
+
+    def flush(self):
+        """
+        Write all buffered rows to the open transaction. The transaction is committed when the context exits.
+        """
+        self._check_open()
+        self._flush_positions()
+        self._flush_measurements()
+        self._flush_estimates()
+        if self._blobs:
+            with timed(phase="db_flush"):
+                for kind, metadata, data in self._blobs:
+                    self._conn.execute("""
+                        INSERT OR REPLACE INTO trajectory_blobs (simulation_id, kind, rows, columns, dtype, delta, compression, data)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """, (self.simulation_id, kind, metadata["rows"], json.dumps(metadata["columns"]), metadata["dtype"],
+                          int(metadata["delta"]), metadata["compression"], data))
+            DB_ROWS.inc(len(self._blobs), table="trajectory_blobs")
+        self._blobs = []
+        if self._result is not None:
+            self._conn.execute("""
+                INSERT INTO simulation_results (simulation_id, start_position, antenna_center, final_position, steps)
+                VALUES (?, ?, ?, ?, ?)
+            """, self._result)
+            self._result = None
+
+    def _check_open(self):
+        if self._conn is None:
+            raise RuntimeError("SimulationRecorder must be used as a context manager.")
+
+    def _transmitt_antenna_ids(self, beacon_ids: np.ndarray) -> list:
+        """transmitt_antennas ID of every beacon index, None for beacons the simulation has not linked."""
+        self._check_open()
+        if self._beacon_antennas is None:
+            self._beacon_antennas = dict(self._conn.execute(
+                "SELECT beacon_index, transmitt_antenna_id FROM simulation_antennas WHERE simulation_id = ?",
+                (self.simulation_id,)).fetchall())
+        return [self._beacon_antennas.get(beacon_id) for beacon_id in beacon_ids.tolist()]
+
+    def _flush_estimates(self):
+        self._check_open()
+        if self._estimates:
+            with timed(phase="db_flush"):
+                self._conn.executemany("""
+                    INSERT INTO beacon_estimates (simulation_id, timestamp, x, y, var_x, cov_xy, var_y)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, self._estimates)
+            DB_ROWS.inc(len(self._estimates), table="beacon_estimates")
+            self._estimates = []
+
+    def _flush_positions(self):
+        self._check_open()
+        if self._positions:
+            with timed(phase="db_flush"):
+                self._conn.executemany("""
+                    INSERT INTO drone_paths (simulation_id, timestamp, x, y, z, pitch, yaw, roll, drone_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, self._positions)
+            DB_ROWS.inc(len(self._positions), table="drone_paths")
+            self._positions = []
+
+    def _flush_measurements(self):
+        self._check_open()
+        if self._measurements:
+            with timed(phase="db_flush"):
+                self._conn.executemany("""
+                    INSERT INTO drone_measurements (simulation_id, timestamp, x, y, z, pitch, yaw, roll, signal_strength, signal_direction,
+                                                    drone_id, transmitt_antenna_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, self._measurements)
+            DB_ROWS.inc(len(self._measurements), table="drone_measurements")
+            self._measurements = []
+
+def _load_trajectory_blob(conn: sqlite3.Connection, simulation_id: int, kind: str) -> Optional[np.ndarray]:
+    """
+    Decode the trajectory blob of a simulation, or return None if it is stored as rows.
+    """
+    row = conn.execute("""
+        SELECT rows, columns, dtype, delta, compression, data
+        FROM trajectory_blobs
+        WHERE simulation_id = ? AND kind = ?
+    """, (simulation_id, kind)).fetchone()
+    if row is None:
+        return None
+    metadata = {"rows": row[0], "columns": json.loads(row[1]), "dtype": row[2], "delta": bool(row[3]), "compression": row[4]}
+    return decode_columns(metadata, row[5])
+
+def get_simulation_array(simulation_id: int, kind: str = "path", drone_id: Optional[int] = None) -> np.ndarray:
+    """
+    Retrieve the path or measurements of a simulation as one array, from either storage format.
+    :param simulation_id: ID of the simulation.
+    :param kind: "path" for columns t, x, y, z, pitch, yaw, roll, or "measurements" for those
+        followed by signal_strength, signal_direction (see sampleBuffer.COLUMNS).
+    :param drone_id: Only the rows of this drone of a swarm, all drones if None.
+    :return: Array of shape (rows, columns) in timestamp order.
+    """
+    if kind not in ("path", "measurements"):
+        raise ValueError(f"Unknown kind {kind!r}, expected 'path' or 'measurements'")
+    columns = COLUMNS[:SIGNAL_STRENGTH] if kind == "path" else COLUMNS
+    with connection() as conn:
+        array = _load_trajectory_blob(conn, simulation_id, kind)
+        if array is not None:
+            # Blobs hold a single drone
+            return array if drone_id in (None, 0) else array[:0]
+
+        table = "drone_paths" if kind == "path" else "drone_measurements"
+        drone_filter, params = ("", (simulation_id,)) if drone_id is None else ("AND drone_id = ?", (simulation_id, drone_id))
+        rows = conn.execute(f"""
+            SELECT timestamp, {", ".join(columns[1:])}
+            FROM {table}
+            WHERE simulation_id = ? {drone_filter}
+            ORDER BY timestamp ASC, id ASC
+        """, params).fetchall()
+    return np.array(rows, dtype=float).reshape(-1, len(columns))
+
+def get_measurement_antenna_ids(simulation_id: int, drone_id: Optional[int] = None) -> np.ndarray:
+    """
+    Retrieve the transmitt_antennas ID every measurement of a simulation was read from.
+    :param simulation_id: ID of the simulation.
+    :param drone_id: Only the measurements of this drone of a swarm, all drones if None.
+    :return: Integer array aligned with get_simulation_array(simulation_id, "measurements", drone_id),
+        -1 where the transmitter is unknown. Blob storage only holds beacon 0.
+    """
+    with connection() as conn:
+        blob = _load_trajectory_blob(conn, simulation_id, "measurements")
+        if blob is not None:
+            row = conn.execute("SELECT transmitt_antenna_id FROM simulation_antennas WHERE simulation_id = ? AND beacon_index = 0",
+                               (simulation_id,)).fetchone()
+            count = len(blob) if drone_id in (None, 0) else 0
+            return np.full(count, -1 if row is None else row[0], dtype=np.int64)
+
+        drone_filter, params = ("", (simulation_id,)) if drone_id is None else ("AND drone_id = ?", (simulation_id, drone_id))
+        rows = conn.execute(f"""
+            SELECT transmitt_antenna_id
+            FROM drone_measurements
+            WHERE simulation_id = ? {drone_filter}
+            ORDER BY timestamp ASC, id ASC
+        """, params).fetchall()
+    return np.array([-1 if row[0] is None else row[0] for row in rows], dtype=np.int64)
+
+def get_simulation_drone_ids(simulation_id: int) -> List[int]:
+    """
+    Retrieve the drones of a simulation, [0] for a single drone and for blob storage.
+    """
+    with connection() as conn:
+        rows = conn.execute("SELECT DISTINCT drone_id FROM drone_paths WHERE simulation_id = ?", (simulation_id,)).fetchall()
+    return sorted(row[0] for row in rows) or [0]
+
+# Per-simulation level-of-detail data: the full arrays, the RDP significance of every path point
+# and the indices of every decimation level asked for so far. Entries are dropped through the
+# simulation listeners whenever the simulation is written or deleted.
+LOD_CACHE_SIZE = 32
+_lod_cache = OrderedDict()
+_lod_lock = threading.Lock()
+
+def invalidate_simulation_lod(simulation_id: Optional[int] = None):
+    """
+    Drop the cached levels of detail of one simulation, or of all simulations.
+    """
+    with _lod_lock:
+        if simulation_id is None:
+            _lod_cache.clear()
+        else:
+            for key in [key for key in _lod_cache if key[:2] == (DATABASE_FILE, simulation_id)]:
+                del _lod_cache[key]
+
+add_simulation_listener(invalidate_simulation_lod)
+
+def _simulation_lod_entry(simulation_id: int, drone_id: Optional[int] = None) -> dict:
+    key = (DATABASE_FILE, simulation_id, drone_id)
+    with _lod_lock:
+        entry = _lod_cache.get(key)
+        if entry is not None:
+            _lod_cache.move_to_end(key)
+            return entry
+
+    path = get_simulation_array(simulation_id, "path", drone_id)
+    entry = {
+        "path": path,
+        "measurements": get_simulation_array(simulation_id, "measurements", drone_id),
+        "antenna_ids": get_measurement_antenna_ids(simulation_id, drone_id),
+        "significance": rdp_significance(path[:, 1:4]),
+        "levels": {},
+    }
+    with _lod_lock:
+        _lod_cache[key] = entry
+        while len(_lod_cache) > LOD_CACHE_SIZE:
+            _lod_cache.popitem(last=False)
+    return entry
+
+def get_simulation_lod(simulation_id: int, max_points: Optional[int] = None, tolerance: Optional[float] = None,
+                       drone_id: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Retrieve a decimated path and measurement series of a simulation.
+    The path is simplified with Ramer-Douglas-Peucker on x, y, z and the measurements are
+    downsampled with LTTB on signal_strength over time. Levels are cached per simulation.
+    :param simulation_id: ID of the simulation.
+    :param max_points: Keep at most this many path points and measurements.
+    :param tolerance: Maximum distance of a dropped path point to the simplified path. Without
+        max_points, the measurements are downsampled to as many samples as path points remain.
+    :param drone_id: Only the rows of this drone of a swarm, all drones if None.
+    :return: Tuple (path, measurements) of arrays with the columns of get_simulation_array.
+    """
+    entry, path_index, measurement_index = _simulation_lod_level(simulation_id, max_points, tolerance, drone_id)
+    return entry["path"][path_index], entry["measurements"][measurement_index]
+
+def _simulation_lod_level(simulation_id: int, max_points: Optional[int], tolerance: Optional[float],
+                          drone_id: Optional[int]) -> Tuple[dict, np.ndarray, np.ndarray]:
+    """The cached entry of a simulation with the path and measurement indices of one level of detail."""
+    entry = _simulation_lod_entry(simulation_id, drone_id)
+    level = (max_points, tolerance)
+    indices = entry["levels"].get(level)
+    if indices is None:
+        path_index = select_by_significance(entry["significance"], max_points=max_points, tolerance=tolerance)
+        measurements = entry["measurements"]
+        measurement_index = lttb(measurements[:, 0], measurements[:, SIGNAL_STRENGTH], max_points or len(path_index))
+        indices = entry["levels"][level] = (path_index, measurement_index)
+    return (entry,) + indices
+
+def get_beacon_estimates(simulation_id: int) -> np.ndarray:
+    """
+    Retrieve the logged transmitter estimates of a simulation.
+    :return: Array of shape (rows, len(beaconEstimator.ESTIMATE_COLUMNS)) in timestamp order.
+    """
+    with connection() as conn:
+        rows = conn.execute("""
+            SELECT timestamp, x, y, var_x, cov_xy, var_y
+            FROM beacon_estimates
+            WHERE simulation_id = ?
+            ORDER BY timestamp ASC
+        """, (simulation_id,)).fetchall()
+    return np.array(rows, dtype=float).reshape(-1, len(ESTIMATE_COLUMNS))
 
 def get_simulation_path(simulation_id: int) -> List[Position]:
     """
@@ -199,21 +1047,11 @@ def get_simulation_path(simulation_id: int) -> List[Position]:
     :param simulation_id: ID of the simulation.
     :return: List of Position objects in chronological order.
     """
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT timestamp, x, y, z, pitch, yaw, roll
-        FROM drone_paths
-        WHERE simulation_id = ?
-        ORDER BY timestamp ASC
-    """, (simulation_id,))
     path = [
         Position(x=row[1], y=row[2], z=row[3], pitch=row[4], yaw=row[5], roll=row[6])
-        for row in cursor.fetchall()
+        for row in get_simulation_array(simulation_id, "path").tolist()
     ]
 
-    conn.close()
     return path
 
 def get_simulation_result(simulation_id: int) -> Optional[dict]:
@@ -222,17 +1060,16 @@ def get_simulation_result(simulation_id: int) -> Optional[dict]:
     :param simulation_id: ID of the simulation.
     :return: A dictionary with simulation results or None if not found.
     """
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
+    with connection() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute("""
-        SELECT start_position, antenna_center, final_position, steps
-        FROM simulation_results
-        WHERE simulation_id = ?
-    """, (simulation_id,))
-    result = cursor.fetchone()
+        cursor.execute("""
+            SELECT start_position, antenna_center, final_position, steps
+            FROM simulation_results
+            WHERE simulation_id = ?
+        """, (simulation_id,))
+        result = cursor.fetchone()
 
-    conn.close()
     if result:
         return {
             "start_position": eval(result[0]),  # Safely convert the string back to Position object
@@ -247,19 +1084,16 @@ def list_simulations() -> List[dict]:
     List all simulations with their IDs and descriptions.
     :return: A list of dictionaries with simulation metadata.
     """
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
+    with connection() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute("""
-        SELECT id, description FROM simulations
-    """)
-    simulations = [{"id": row[0], "description": row[1]} for row in cursor.fetchall()]
+        cursor.execute("""
+            SELECT id, description FROM simulations
+        """)
+        simulations = [{"id": row[0], "description": row[1]} for row in cursor.fetchall()]
 
-    conn.close()
     return simulations
 
-import numpy as np
-
 def add_slope(slope: Slope, transmitt_antenna_id: Optional[int] = None) -> int:
     """
     Add a slope to the database and return its ID.
@@ -268,17 +1102,16 @@ def add_slope(slope: Slope, transmitt_antenna_id: Optional[int] = None) -> int:
     width = slope.width
     height = slope.height
     normal_vector = np.array([np.sin(np.radians(angle)), 0, np.cos(np.radians(angle))])
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
+    with connection() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute("""
-        INSERT INTO slopes (width, height, angle, normal_vector_x, normal_vector_y, normal_vector_z, transmitt_antenna_id)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (width, height, angle, normal_vector[0], normal_vector[1], normal_vector[2], transmitt_antenna_id))
+        cursor.execute("""
+            INSERT INTO slopes (width, height, angle, normal_vector_x, normal_vector_y, normal_vector_z, transmitt_antenna_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (width, height, angle, normal_vector[0], normal_vector[1], normal_vector[2], transmitt_antenna_id))
 
-    slope_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+        slope_id = cursor.lastrowid
+        conn.commit()
     return slope_id
 
 def add_transmitt_antenna(antenna: TransmittAntenna) -> int:
@@ -296,160 +1129,168 @@ def add_transmitt_antenna(antenna: TransmittAntenna) -> int:
     polarization = antenna.polarization
     pattern = antenna.pattern
 
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
+    with connection() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute("""
-        INSERT INTO transmitt_antennas (position_x, position_y, position_z, position_pitch, position_yaw, position_roll,
-                                        name, type, power, frequency, gain, azimuth, beamwidth, polarization, pattern)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (position.x, position.y, position.z, position.pitch, position.yaw, position.roll, name, type_,
-          power, frequency, gain, azimuth, beamwidth, polarization, pattern))
-
-    antenna_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+        cursor.execute("""
+            INSERT INTO transmitt_antennas (position_x, position_y, position_z, position_pitch, position_yaw, position_roll,
+                                            name, type, power, frequency, gain, azimuth, beamwidth, polarization, pattern)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (position.x, position.y, position.z, position.pitch, position.yaw, position.roll, name, type_,
+              power, frequency, gain, azimuth, beamwidth, polarization, pattern))
+
+        antenna_id = cursor.lastrowid
+        conn.commit()
     return antenna_id
 
 
 
 
-def get_simulation_full_details(simulation_id: int) -> dict:
+def _antenna_row(row) -> dict:
+    return {
+        "position": {
+            "x": row[0],
+            "y": row[1],
+            "z": row[2],
+            "pitch": row[3],
+            "yaw": row[4],
+            "roll": row[5],
+        },
+        "name": row[6],
+        "type": row[7],
+        "power": row[8],
+        "frequency": row[9],
+        "gain": row[10],
+        "azimuth": row[11],
+        "beamwidth": row[12],
+        "polarization": row[13],
+        "pattern": row[14]
+    }
+
+def get_simulation_antennas(simulation_id: int) -> List[dict]:
     """
-    Retrieve all details of a simulation to recreate it in the frontend.
+    Retrieve the transmitters of a simulation in beacon index order, see link_simulation_antennas.
+    :return: List of antenna dictionaries as in get_simulation_summary, with their "id" and "beacon_index".
+    """
+    with connection() as conn:
+        rows = conn.execute("""
+            SELECT a.position_x, a.position_y, a.position_z, a.position_pitch, a.position_yaw, a.position_roll,
+                   a.name, a.type, a.power, a.frequency, a.gain, a.azimuth, a.beamwidth, a.polarization, a.pattern,
+                   a.id, s.beacon_index
+            FROM simulation_antennas s
+            JOIN transmitt_antennas a ON a.id = s.transmitt_antenna_id
+            WHERE s.simulation_id = ?
+            ORDER BY s.beacon_index
+        """, (simulation_id,)).fetchall()
+    return [dict(_antenna_row(row), id=row[15], beacon_index=row[16]) for row in rows]
+
+def _path_row(row) -> dict:
+    return {
+        "timestamp": row[0],
+        "position": {
+            "x": row[1],
+            "y": row[2],
+            "z": row[3],
+            "pitch": row[4],
+            "yaw": row[5],
+            "roll": row[6]
+        }
+    }
+
+def _measurement_row(row) -> dict:
+    return {
+        "timestamp": row[0],
+        "position": {
+            "x": row[1],
+            "y": row[2],
+            "z": row[3],
+            "pitch": row[4],
+            "yaw": row[5],
+            "roll": row[6]
+        },
+        "signal_strength": row[7],
+        "signal_direction": row[8]
+    }
+
+def get_simulation_summary(simulation_id: int) -> Optional[dict]:
+    """
+    Retrieve a simulation's metadata, slope, antenna and result, without its path and measurements.
     :param simulation_id: ID of the simulation.
-    :return: A dictionary containing slope, antenna, path, measurements, and results.
+    :return: A dictionary with simulation, slope, antenna and result, or None if not found.
     """
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
+    with connection() as conn:
+        cursor = conn.cursor()
 
-    # Get simulation metadata
-    cursor.execute("""
-        SELECT description, slope_id, transmitt_antenna_id
-        FROM simulations
-        WHERE id = ?
-    """, (simulation_id,))
-    simulation = cursor.fetchone()
-    if not simulation:
-        conn.close()
-        return {"error": "Simulation not found"}
-
-    description, slope_id, antenna_id = simulation
-
-    # Get slope details
-    slope = None
-    if slope_id:
+        # Get simulation metadata
         cursor.execute("""
-            SELECT width, height, angle, normal_vector_x, normal_vector_y, normal_vector_z, transmitt_antenna_id
-            FROM slopes
+            SELECT description, slope_id, transmitt_antenna_id
+            FROM simulations
             WHERE id = ?
-        """, (slope_id,))
-        slope_row = cursor.fetchone()
-        if slope_row:
-            slope = {
-                "width": slope_row[0],
-                "height": slope_row[1],
-                "angle": slope_row[2],
-                "normal_vector": (slope_row[3], slope_row[4], slope_row[5]),
-                "transmitt_antenna_id": slope_row[6]
-            }
+        """, (simulation_id,))
+        simulation = cursor.fetchone()
+        if not simulation:
+            return None
 
-    # Get antenna details
-    antenna = None
-    if antenna_id:
-        cursor.execute("""
-            SELECT position_x, position_y, position_z, position_pitch, position_yaw, position_roll,
-                   name, type, power, frequency, gain, azimuth, beamwidth, polarization, pattern
-            FROM transmitt_antennas
-            WHERE id = ?
-        """, (antenna_id,))
-        antenna_row = cursor.fetchone()
-        if antenna_row:
-            antenna = {
-                "position": {
-                    "x": antenna_row[0],
-                    "y": antenna_row[1],
-                    "z": antenna_row[2],
-                    "pitch": antenna_row[3],
-                    "yaw": antenna_row[4],
-                    "roll": antenna_row[5],
-                },
-                "name": antenna_row[6],
-                "type": antenna_row[7],
-                "power": antenna_row[8],
-                "frequency": antenna_row[9],
-                "gain": antenna_row[10],
-                "azimuth": antenna_row[11],
-                "beamwidth": antenna_row[12],
-                "polarization": antenna_row[13],
-                "pattern": antenna_row[14]
-            }
+        description, slope_id, antenna_id = simulation
 
-    # Get drone path
-    cursor.execute("""
-        SELECT timestamp, x, y, z, pitch, yaw, roll
-        FROM drone_paths
-        WHERE simulation_id = ?
-        ORDER BY timestamp ASC
-    """, (simulation_id,))
-    drone_path = [
-        {
-            "timestamp": row[0],
-            "position": {
-                "x": row[1],
-                "y": row[2],
-                "z": row[3],
-                "pitch": row[4],
-                "yaw": row[5],
-                "roll": row[6]
-            }
-        }
-        for row in cursor.fetchall()
-    ]
+        # Get slope details
+        slope = None
+        if slope_id:
+            cursor.execute("""
+                SELECT width, height, angle, normal_vector_x, normal_vector_y, normal_vector_z, transmitt_antenna_id
+                FROM slopes
+                WHERE id = ?
+            """, (slope_id,))
+            slope_row = cursor.fetchone()
+            if slope_row:
+                slope = {
+                    "width": slope_row[0],
+                    "height": slope_row[1],
+                    "angle": slope_row[2],
+                    "normal_vector": (slope_row[3], slope_row[4], slope_row[5]),
+                    "transmitt_antenna_id": slope_row[6]
+                }
 
-    # Get drone measurements
-    cursor.execute("""
-        SELECT timestamp, x, y, z, pitch, yaw, roll, signal_strength, signal_direction
-        FROM drone_measurements
-        WHERE simulation_id = ?
-        ORDER BY timestamp ASC
-    """, (simulation_id,))
-    drone_measurements = [
-        {
-            "timestamp": row[0],
-            "position": {
-                "x": row[1],
-                "y": row[2],
-                "z": row[3],
-                "pitch": row[4],
-                "yaw": row[5],
-                "roll": row[6]
-            },
-            "signal_strength": row[7],
-            "signal_direction": row[8]
-        }
-        for row in cursor.fetchall()
-    ]
+        # Get antenna details
+        antenna = None
+        if antenna_id:
+            cursor.execute("""
+                SELECT position_x, position_y, position_z, position_pitch, position_yaw, position_roll,
+                       name, type, power, frequency, gain, azimuth, beamwidth, polarization, pattern
+                FROM transmitt_antennas
+                WHERE id = ?
+            """, (antenna_id,))
+            antenna_row = cursor.fetchone()
+            if antenna_row:
+                antenna = _antenna_row(antenna_row)
 
-    # Get simulation results
-    cursor.execute("""
-        SELECT start_position, antenna_center, final_position, steps
-        FROM simulation_results
-        WHERE simulation_id = ?
-    """, (simulation_id,))
-    simulation_result = cursor.fetchone()
-    result = None
-    if simulation_result:
-        result = {
-            "start_position": eval(simulation_result[0]),
-            "antenna_center": eval(simulation_result[1]),
-            "final_position": eval(simulation_result[2]),
-            "steps": simulation_result[3]
-        }
+        # Get simulation results
+        cursor.execute("""
+            SELECT start_position, antenna_center, final_position, steps
+            FROM simulation_results
+            WHERE simulation_id = ?
+        """, (simulation_id,))
+        simulation_result = cursor.fetchone()
+        result = None
+        if simulation_result:
+            result = {
+                "start_position": eval(simulation_result[0]),
+                "antenna_center": eval(simulation_result[1]),
+                "final_position": eval(simulation_result[2]),
+                "steps": simulation_result[3]
+            }
 
-    conn.close()
+        # Get the last online transmitter estimate
+        cursor.execute("""
+            SELECT timestamp, x, y, var_x, cov_xy, var_y
+            FROM beacon_estimates
+            WHERE simulation_id = ?
+            ORDER BY timestamp DESC
+            LIMIT 1
+        """, (simulation_id,))
+        estimate_row = cursor.fetchone()
+        beacon_estimate = dict(zip(("timestamp",) + ESTIMATE_COLUMNS[1:], estimate_row)) if estimate_row else None
 
-    # Construct full simulation details
     return {
         "simulation": {
             "id": simulation_id,
@@ -457,9 +1298,172 @@ def get_simulation_full_details(simulation_id: int) -> dict:
         },
         "slope": slope,
         "antenna": antenna,
+        "result": result,
+        "beacon_estimate": beacon_estimate
+    }
+
+def iter_simulation_rows(simulation_id: int, from_t: Optional[float] = None, to_t: Optional[float] = None,
+                         after_t: Optional[float] = None, limit: Optional[int] = None, batch_size: int = 1000,
+                         after_drone_id: Optional[int] = None, after_id: Optional[int] = None,
+                         drone_id: Optional[int] = None):
+    """
+    Stream the path and measurement rows of a simulation in (timestamp, drone_id) order, without loading them all.
+    Uses keyset pagination on the (timestamp, drone_id, id) of the path rows, as the drones of a swarm
+    share timestamps: a page holds up to `limit` path rows after the cursor (after_t, after_drone_id,
+    after_id), together with the measurements up to the (timestamp, drone_id) of its last path row,
+    so the next page starts with the cursor set to the last path row of this one.
+    :param simulation_id: ID of the simulation.
+    :param from_t: Only rows with timestamp >= from_t.
+    :param to_t: Only rows with timestamp <= to_t.
+    :param after_t: Only rows after the cursor, or with timestamp > after_t without after_drone_id and after_id.
+    :param limit: Maximum number of path rows.
+    :param batch_size: Rows fetched from SQLite at a time.
+    :param after_drone_id: drone_id of the last path row of the previous page.
+    :param after_id: id of the last path row of the previous page.
+    :param drone_id: Only the rows of this drone of a swarm, all drones if None.
+    :return: Generator of ("path", dict) and ("measurement", dict) tuples, ordered by timestamp and drone.
+        Every row has its drone_id, and path rows their id for the cursor.
+    """
+    if (after_drone_id is None) != (after_id is None) or (after_id is not None and after_t is None):
+        raise ValueError("The cursor is after_t, after_drone_id and after_id together, or after_t alone")
+
+    with connection() as conn:
+        path_blob = _load_trajectory_blob(conn, simulation_id, "path")
+        if path_blob is not None:
+            measurement_blob = _load_trajectory_blob(conn, simulation_id, "measurements")
+    if path_blob is not None:
+        if drone_id not in (None, 0):
+            return
+        yield from _iter_blob_rows(path_blob, measurement_blob, from_t, to_t, after_t, limit, after_drone_id, after_id)
+        return
+
+    conditions = ["simulation_id = ?"]
+    params = [simulation_id]
+    for condition, value in (("timestamp >= ?", from_t), ("timestamp <= ?", to_t), ("drone_id = ?", drone_id)):
+        if value is not None:
+            conditions.append(condition)
+            params.append(value)
+    path_conditions, path_params = list(conditions), list(params)
+    if after_t is not None and after_drone_id is None:
+        conditions.append("timestamp > ?")
+        params.append(after_t)
+        path_conditions.append("timestamp > ?")
+        path_params.append(after_t)
+    elif after_t is not None:
+        # The timestamp bound lets SQLite seek the (simulation_id, timestamp, drone_id) index to the cursor
+        conditions += ["timestamp >= ?", "(timestamp, drone_id) > (?, ?)"]
+        params += [after_t, after_t, after_drone_id]
+        path_conditions += ["timestamp >= ?", "(timestamp, drone_id, id) > (?, ?, ?)"]
+        path_params += [after_t, after_t, after_drone_id, after_id]
+
+    with connection() as conn:
+        path_sql = STREAM_PATH_SQL.format(where=" AND ".join(path_conditions))
+        if limit is not None:
+            if limit < 1:
+                return
+            # Restrict the measurements to the rows up to the last path row of a full page
+            last = conn.execute(f"{path_sql} LIMIT 1 OFFSET ?", path_params + [limit - 1]).fetchone()
+            if last is not None:
+                conditions += ["timestamp <= ?", "(timestamp, drone_id) <= (?, ?)"]
+                params += [last[0], last[0], last[7]]
+            path_sql += " LIMIT ?"
+            path_params.append(limit)
+
+        path_cursor = conn.execute(path_sql, path_params)
+        measurement_cursor = conn.cursor()
+        measurement_cursor.execute(STREAM_MEASUREMENT_SQL.format(where=" AND ".join(conditions)), params)
+
+        paths = (("path", dict(_path_row(row), drone_id=row[7], id=row[8]))
+                 for batch in iter(lambda: path_cursor.fetchmany(batch_size), []) for row in batch)
+        measurements = (("measurement", dict(_measurement_row(row), drone_id=row[9]))
+                        for batch in iter(lambda: measurement_cursor.fetchmany(batch_size), []) for row in batch)
+        yield from heapq.merge(paths, measurements, key=lambda item: (item[1]["timestamp"], item[1]["drone_id"]))
+
+def _iter_blob_rows(path: np.ndarray, measurements: Optional[np.ndarray], from_t: Optional[float], to_t: Optional[float],
+                    after_t: Optional[float], limit: Optional[int], after_drone_id: Optional[int] = None,
+                    after_id: Optional[int] = None):
+    """
+    iter_simulation_rows for simulations stored as trajectory blobs. They hold the rows of drone 0
+    only, the id of a path row is its index in the blob.
+    """
+    if measurements is None:
+        measurements = np.empty((0, len(COLUMNS)))
+
+    def window(array, ids=None):
+        mask = np.ones(len(array), dtype=bool)
+        if from_t is not None:
+            mask &= array[:, 0] >= from_t
+        if to_t is not None:
+            mask &= array[:, 0] <= to_t
+        if after_t is not None:
+            # Rows of drone 0 after the cursor, path rows are ordered by (timestamp, drone_id, id)
+            after = array[:, 0] > after_t
+            if after_drone_id is not None and after_drone_id <= 0:
+                at_cursor = array[:, 0] == after_t
+                if after_drone_id == 0:
+                    at_cursor &= (ids > after_id) if ids is not None else False
+                after |= at_cursor
+            mask &= after
+        return mask
+
+    ids = np.arange(len(path))
+    path_mask = window(path, ids)
+    path, ids = path[path_mask], ids[path_mask]
+    measurements = measurements[window(measurements)]
+    if limit is not None:
+        path, ids = path[:limit], ids[:limit]
+        if not len(path):
+            return
+        measurements = measurements[measurements[:, 0] <= path[-1, 0]]
+
+    paths = (("path", dict(_path_row(row), drone_id=0, id=int(i))) for row, i in zip(path.tolist(), ids.tolist()))
+    rows = (("measurement", dict(_measurement_row(row), drone_id=0)) for row in measurements.tolist())
+    yield from heapq.merge(paths, rows, key=lambda item: item[1]["timestamp"])
+
+def get_simulation_full_details(simulation_id: int, max_points: Optional[int] = None, tolerance: Optional[float] = None,
+                                drone_id: Optional[int] = None) -> dict:
+    """
+    Retrieve all details of a simulation to recreate it in the frontend.
+    :param simulation_id: ID of the simulation.
+    :param max_points: Optional level of detail, see get_simulation_lod.
+    :param tolerance: Optional level of detail, see get_simulation_lod.
+    :param drone_id: Only the path and measurements of this drone of a swarm, all drones if None.
+    :return: A dictionary containing slope, antenna, path, measurements, results, the drone IDs and
+        all transmitters of the simulation. Every measurement names its transmitt_antenna_id.
+    """
+    # Hold one pooled connection for all the queries below
+    with connection():
+        summary = get_simulation_summary(simulation_id)
+        if summary is None:
+            return {"error": "Simulation not found"}
+
+        # Get drone path and measurements, stored either as rows or as trajectory blobs
+        if max_points is None and tolerance is None:
+            path = get_simulation_array(simulation_id, "path", drone_id)
+            measurements = get_simulation_array(simulation_id, "measurements", drone_id)
+            antenna_ids = get_measurement_antenna_ids(simulation_id, drone_id)
+        else:
+            entry, path_index, measurement_index = _simulation_lod_level(simulation_id, max_points, tolerance, drone_id)
+            path = entry["path"][path_index]
+            measurements = entry["measurements"][measurement_index]
+            antenna_ids = entry["antenna_ids"][measurement_index]
+        drone_path = [_path_row(row) for row in path.tolist()]
+        drone_measurements = [dict(_measurement_row(row), transmitt_antenna_id=None if antenna_id < 0 else antenna_id)
+                              for row, antenna_id in zip(measurements.tolist(), antenna_ids.tolist())]
+        drone_ids = get_simulation_drone_ids(simulation_id)
+        antennas = get_simulation_antennas(simulation_id)
+
+    # Construct full simulation details
+    return {
+        "simulation": summary["simulation"],
+        "slope": summary["slope"],
+        "antenna": summary["antenna"],
         "drone_path": drone_path,
         "drone_measurements": drone_measurements,
-        "result": result
+        "result": summary["result"],
+        "beacon_estimate": summary["beacon_estimate"],
+        "drone_ids": drone_ids,
+        "antennas": antennas
     }
 
 
@@ -468,15 +1472,12 @@ def fetch_simulation_ids_and_descriptions():
     Fetch all simulation IDs along with their descriptions.
     :return: List of dictionaries with 'id' and 'description' for each simulation.
     """
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
-
     try:
-        cursor.execute("SELECT id, description FROM simulations")
-        simulations = cursor.fetchall()
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, description FROM simulations")
+            simulations = cursor.fetchall()
         return [{"id": row[0], "description": row[1]} for row in simulations]
     except Exception as e:
         print(f"Error fetching simulation IDs: {e}")
         return []
-    finally:
-        conn.close()
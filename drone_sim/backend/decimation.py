@@ -0,0 +1,135 @@
+import numpy as np
+
+
+def _segment_distances(points: np.ndarray, index: np.ndarray, starts: np.ndarray, ends: np.ndarray, owner: np.ndarray) -> np.ndarray:
+    """
+    Distance of every points[index[i]] to the line segment points[starts[owner[i]]] - points[ends[owner[i]]].
+    """
+    a = points[starts[owner]]
+    ab = points[ends[owner]] - a
+    ap = points[index] - a
+    length2 = np.einsum("ij,ij->i", ab, ab)
+    t = np.clip(np.einsum("ij,ij->i", ap, ab) / np.where(length2 > 0, length2, 1.0), 0.0, 1.0)
+    diff = ap - ab * t[:, None]
+    return np.sqrt(np.einsum("ij,ij->i", diff, diff))
+
+
+def rdp_significance(points: np.ndarray) -> np.ndarray:
+    """
+    Ramer-Douglas-Peucker significance of every point of a polyline.
+
+    A point's significance is the largest tolerance at which RDP still keeps it, so
+    `significance > tolerance` selects exactly the points RDP keeps for that tolerance, and the
+    k most significant points are the best k-point RDP simplification. Computing it once gives
+    every level of detail.
+
+    Instead of recursing one segment at a time, every level splits all open segments at once:
+    the distances of all interior points to their segment are computed in one vectorized pass and
+    the farthest point of each segment is found with np.maximum.reduceat.
+    :param points: Array of shape (N, D).
+    :return: Array of N significances, inf for the first and last point.
+    """
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    significance = np.zeros(n)
+    significance[[0, -1]] = np.inf
+    if n <= 2:
+        return significance
+
+    # Open segments, with the significance of the split that created them as an upper bound:
+    # a point can never be kept at a tolerance its parent segment was not split at
+    starts, ends, bounds = np.array([0]), np.array([n - 1]), np.array([np.inf])
+    while len(starts):
+        counts = ends - starts - 1
+        has_interior = counts > 0
+        starts, ends, bounds, counts = starts[has_interior], ends[has_interior], bounds[has_interior], counts[has_interior]
+        if not len(starts):
+            break
+
+        # Interior points of every open segment, laid out segment after segment
+        owner = np.repeat(np.arange(len(starts)), counts)
+        offsets = np.cumsum(counts) - counts
+        index = starts[owner] + 1 + np.arange(counts.sum()) - offsets[owner]
+        distance = _segment_distances(points, index, starts, ends, owner)
+
+        max_distance = np.maximum.reduceat(distance, offsets)
+        # First point of each segment reaching its maximum
+        candidates = np.flatnonzero(distance == max_distance[owner])[::-1]
+        split_at = np.empty(len(starts), dtype=np.int64)
+        split_at[owner[candidates]] = candidates
+        split = index[split_at]
+
+        refine = max_distance > 0
+        split, level = split[refine], np.minimum(max_distance, bounds)[refine]
+        significance[split] = level
+        starts, ends = np.concatenate([starts[refine], split]), np.concatenate([split, ends[refine]])
+        bounds = np.concatenate([level, level])
+
+    return significance
+
+
+def rdp(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Ramer-Douglas-Peucker simplification of a polyline.
+    :param points: Array of shape (N, D).
+    :param tolerance: Maximum distance of a dropped point to the simplified line.
+    :return: Sorted indices of the points to keep, always including the first and last.
+    """
+    return select_by_significance(rdp_significance(points), tolerance=tolerance)
+
+
+def select_by_significance(significance: np.ndarray, max_points: int = None, tolerance: float = None) -> np.ndarray:
+    """
+    Pick the points of an RDP simplification from precomputed significances.
+    :param significance: Output of rdp_significance.
+    :param max_points: Keep at most this many points, the most significant ones.
+    :param tolerance: Keep the points with a significance above this tolerance.
+    :return: Sorted indices of the points to keep.
+    """
+    keep = np.ones(len(significance), dtype=bool) if tolerance is None else significance > tolerance
+    if max_points is not None and keep.sum() > max_points:
+        ranked = np.argsort(-significance, kind="stable")[:max(max_points, 2)]
+        keep = np.zeros(len(significance), dtype=bool)
+        keep[ranked] = True
+    return np.flatnonzero(keep)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling of a series y(x).
+
+    The first and last sample are kept, the rest is split into n_out - 2 buckets and from each
+    bucket the sample forming the largest triangle with the previously selected sample and the
+    mean of the next bucket is kept. Each bucket depends on the previous choice, so the loop
+    runs once per bucket, with the areas inside a bucket computed vectorized.
+    :param x: Sample positions, e.g. timestamps, increasing.
+    :param y: Sample values.
+    :param n_out: Number of samples to keep.
+    :return: Sorted indices of the samples to keep.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])[:max(n_out, 0)]
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Mean of every bucket, used as the third triangle corner for the bucket before it
+    sizes = np.diff(edges)
+    mean_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / sizes
+    mean_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / sizes
+    mean_x = np.append(mean_x[1:], x[-1])
+    mean_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        ax, ay = x[previous], y[previous]
+        area = np.abs((ax - mean_x[bucket]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (mean_y[bucket] - ay))
+        previous = lo + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
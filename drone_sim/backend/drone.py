@@ -1,26 +1,56 @@
+import logging
 import numpy as np
+from beaconEstimator import BeaconEstimator
+from coveragePath import boustrophedon_path
+from eventClock import WAYPOINT, compute_event_trajectory
+from metrics import POSES, SIGNAL_READS, log_event, timed
+from pathValidator import PathValidation, validate_path
 from preDefPath import PreDefPath
 from slope import Slope
 from position import Measurement, Position
-from typing import List, Tuple
+from sampleBuffer import MeasurementView, PositionHistView, SampleBuffer
+from trajectory import compute_trajectory
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+TRAJECTORY_MODES = ("step", "vectorized", "event")
 
 class Drone:
-    def __init__(self, start_position: Position, speed_limit: float, rot_speed_limit: float, slope: Slope, simulation_id, antenna_range: int):
+    def __init__(self, start_position: Position, speed_limit: float, rot_speed_limit: float, slope: Slope, simulation_id, antenna_range: int, trajectory_mode: str = "step",
+                 beacon_estimator: Optional[BeaconEstimator] = None, sample_period: Optional[float] = None,
+                 refine_period: Optional[float] = None, refine_window: float = 1.0):
         """
         Represents a drone with a position, speed limit, and slope constraints.
         :param start_position: (x, y, z) tuple for the drone's starting position.
         :param speed_limit: Maximum speed (units per timestep).
         :param slope: The Slope object representing the search area.
+        :param trajectory_mode: "step" follows the path one flyTowards call at a time,
+            "vectorized" computes the whole path in closed form with compute_trajectory,
+            "event" jumps from event to event with eventClock, measuring only within antenna_range.
+        :param beacon_estimator: Optional BeaconEstimator updated with every measurement of beacon 0.
+            The bearings of every further beacon of the slope go to an estimator of their own, see beacon_estimators.
+        :param sample_period: Seconds between measurements in "event" mode, defaults to the d_time of followPath.
+        :param refine_period: Seconds between measurements for refine_window seconds after entering
+            the antenna range in "event" mode, None to sample at sample_period throughout.
         """
+        if trajectory_mode not in TRAJECTORY_MODES:
+            raise ValueError(f"Unknown trajectory mode {trajectory_mode!r}, expected one of {TRAJECTORY_MODES}")
         self._position = start_position
         self.speed_limit = speed_limit
         self.rot_speed_limit = rot_speed_limit
         self.slope = slope
         self.simulation_id = simulation_id
-        self._positionHist =  [(self._position, 0)]
-        self._measurements = []
+        self._samples = SampleBuffer()
+        self._samples.append(0, self._position)
         self._antenna_range = antenna_range
         self._path = PreDefPath()
+        self.trajectory_mode = trajectory_mode
+        self.beacon_estimator = beacon_estimator
+        # Beacon index -> BeaconEstimator, so bearings to different transmitters are never intersected
+        self.beacon_estimators = {} if beacon_estimator is None else {0: beacon_estimator}
+        self.sample_period = sample_period
+        self.refine_period = refine_period
+        self.refine_window = refine_window
+        self._in_range = False
 
     def move(self, dx, dy, dz, dpitch, dyaw, droll, dt):
         """
@@ -37,8 +67,8 @@ class Drone:
         displacement = np.array([dx, dy, dz])
         distance = np.linalg.norm(displacement)
         if distance/dt > self.speed_limit:
-            print(f"Speed limit exceeded! Max allowed: {self.speed_limit}, Attempted: {distance}")
-            displacement = displacement / distance * self.speed_limit  # Scale to speed limit
+            log_event("speed_limit_exceeded", logging.WARNING, max_allowed=self.speed_limit, attempted=distance)
+            displacement = displacement / distance * self.speed_limit * dt  # Scale to speed limit
 
         
 
@@ -49,7 +79,7 @@ class Drone:
         # Compute the rotational speed and enforce rotational speed limit
         rotation_speed = np.linalg.norm([dpitch, dyaw, droll])
         if rotation_speed/dt > self.rot_speed_limit:
-            print(f"Rotational speed limit exceeded! Max allowed: {self.rot_speed_limit}, Attempted: {rotation_speed}")
+            log_event("rot_speed_limit_exceeded", logging.WARNING, max_allowed=self.rot_speed_limit, attempted=rotation_speed)
             new_orientation = rot_displacement / rotation_speed * self.rot_speed_limit * dt  # Scale to speed limit
 
         # Update position
@@ -62,8 +92,10 @@ class Drone:
         #     raise ValueError("Invalid move! Drone cannot go beneath or through the slope.")
         # else:
         self._position = new_position
-        print(f"Drone moved t0 ", self._position, " at time ", dt + self._positionHist[-1][1], "values: ", dx, dy, dz, dpitch, dyaw, droll)
-        self._positionHist.append((self._position, dt + self._positionHist[-1][1]))
+        timestamp = dt + self._samples.timestamp(-1)
+        log_event("drone_moved", t=timestamp, position=self._position.getStep(), delta=(dx, dy, dz, dpitch, dyaw, droll))
+        self._samples.append(timestamp, self._position)
+        POSES.inc(mode="step")
 
     @property
     def position(self) -> Position:
@@ -75,13 +107,28 @@ class Drone:
         return self._antenna_range
     
     @property
-    def positionHist(self) -> List[Tuple[Position, float]]:
-        return self._positionHist
+    def positionHist(self) -> Sequence[Tuple[Position, float]]:
+        return PositionHistView(self._samples)
     
     @property
-    def measurements(self) -> List[Measurement]:
-        return self._measurements
+    def measurements(self) -> Sequence[Measurement]:
+        return MeasurementView(self._samples)
+
+    @property
+    def samples(self) -> SampleBuffer:
+        """Columnar history of every pose and measurement, see sampleBuffer.COLUMNS."""
+        return self._samples
     
+    @property
+    def beaconEstimate(self) -> Optional[Tuple[float, float]]:
+        """Current (x, y) estimate of the transmitter, None without an estimator or enough measurements."""
+        return None if self.beacon_estimator is None else self.beacon_estimator.estimate
+
+    @property
+    def beaconEstimates(self) -> Dict[int, Optional[Tuple[float, float]]]:
+        """Current (x, y) estimate of every beacon measured so far, by beacon index, see beaconEstimate."""
+        return {beacon_id: estimator.estimate for beacon_id, estimator in sorted(self.beacon_estimators.items())}
+
     @property
     def path(self) -> PreDefPath:
         return self._path
@@ -92,6 +139,10 @@ class Drone:
 
     def flyTowards(self, position: Position, dt: float):
         """Move the drone towards a target position."""
+        with timed(phase="motion"):
+            self._flyTowards(position, dt)
+
+    def _flyTowards(self, position: Position, dt: float):
         # Calculate the direction vector towards the target position
         direction = np.array([position.x - self._position.x, position.y - self._position.y, position.z - self._position.z])
         distance = np.linalg.norm(direction)
@@ -134,20 +185,47 @@ class Drone:
 
     def measureSignal(self) -> bool:
         """Return True if signal is detected. The detection will be addedd to the measurements list."""
-        transmitter = self.slope.transmittAntenna
-        signal_strength, signal_direction = transmitter.read_signal(self.position, self.antenna_range)
+        with timed(phase="read_signal"):
+            signal_strength, signal_direction, beacon_id = self.slope.read_signal(self.position, self.antenna_range)
+        SIGNAL_READS.inc()
         if signal_strength is not None:
-            measurement = Measurement(self.position, signal_strength, signal_direction, timestamp=self.positionHist[-1][1])
-            self._measurements.append(measurement)
+            self._samples.set_signal(signal_strength, signal_direction, beacon_id=beacon_id)
+            if self.beacon_estimator is not None:
+                self._estimatorFor(beacon_id).update(self.position.x, self.position.y, signal_direction, self._samples.timestamp(-1))
             return True
         return False
     
-    def calculatePath(self):
-        '''Calculate the best searchpath for covering the whole slope. Given the slope and the drone's position'''
-        pass
+    def calculatePath(self, altitude: float = 10.0, overlap: float = 0.1, direction: str = "auto") -> PreDefPath:
+        '''
+        Calculate the best searchpath for covering the whole slope. Given the slope and the drone's position
+        Plans a boustrophedon path with strips spaced by the antenna range, see coveragePath, and adds it to the drone's path.
+        :param altitude: Flight height above the slope surface.
+        :param overlap: Fraction of the receiver swath shared by neighbouring strips.
+        :param direction: "contour", "fall_line" or "auto" for the fewest turns.
+        :return: The planned path.
+        '''
+        path = boustrophedon_path(self.slope, self.antenna_range, altitude, overlap, direction, start=self._position)
+        self.addPath(path)
+        return path
+
+    def validatePath(self, clearance: float = 0.0) -> PathValidation:
+        '''
+        Check the remaining path, from the drone's position, against the slope before flying it,
+        instead of finding a collision partway through followPath.
+        :param clearance: Minimum height above the ground.
+        :return: PathValidation with the first violating segment and clearance statistics.
+        '''
+        return validate_path(self.slope, self.path, start=self._position, clearance=clearance)
 
-    def followPath(self, d_time: float = 0.1):
-        '''Follow the calculated path'''
+    def followPath(self, d_time: float = 0.1, progress: Optional[Callable[[int, int], Optional[bool]]] = None):
+        '''
+        Follow the calculated path
+        :param d_time: Length of one time step.
+        :param progress: Optional progress(steps_done, path_length) called after every completed
+            path step. Returning False stops the flight, and followPath returns False.
+        '''
+        if self.trajectory_mode in ("vectorized", "event"):
+            return self._followPathVectorized(d_time, progress)
         while not self.path.isComplete():
             try:
                 self.flyTowards(self.path.getNext(), d_time)
@@ -156,9 +234,89 @@ class Drone:
                 return False
             if self.position.is_close(self.path.getNext()):
                 self.path.completeStep()
+                if progress is not None and progress(self.path.currentStep, len(self.path.path)) is False:
+                    self.measureSignal()
+                    return False
             self.measureSignal()
                 
         #finish the path
         return True
 
-    
+    def _followPathVectorized(self, d_time: float, progress: Optional[Callable[[int, int], Optional[bool]]] = None) -> bool:
+        '''
+        Follow the remaining path in one pass, giving the same poses and measurements as the step loop.
+        With a progress callback the path is computed one waypoint at a time, so the callback can
+        report and stop the flight between waypoints.
+        '''
+        if self.path.isComplete() or self.path.getNext() is None:
+            return True
+        if progress is not None:
+            while not self.path.isComplete():
+                self._flyWaypointsVectorized(self.path.path[self.path.currentStep:self.path.currentStep + 1], d_time)
+                self.path.completeStep()
+                if progress(self.path.currentStep, len(self.path.path)) is False:
+                    return False
+            return True
+
+        self._flyWaypointsVectorized(self.path.path[self.path.currentStep:], d_time)
+        while not self.path.isComplete():
+            self.path.completeStep()
+        return True
+
+    def _flyWaypointsVectorized(self, waypoints: Sequence[Position], d_time: float):
+        '''Append the poses and measurements of flying through the waypoints, computed in closed form.'''
+        if self.trajectory_mode == "event":
+            return self._flyWaypointsEvents(waypoints, d_time)
+        with timed(phase="motion"):
+            trajectory = compute_trajectory(self._position, waypoints, self.speed_limit, self.rot_speed_limit, d_time)
+            trajectory = trajectory[1:]
+            trajectory[:, 0] += self._samples.timestamp(-1)
+        POSES.inc(len(trajectory), mode="vectorized")
+
+        with timed(phase="read_signal"):
+            signal_strength, signal_direction, beacon_ids = self.slope.read_signal_batch(trajectory[:, 1:4], self.antenna_range)
+        SIGNAL_READS.inc(len(trajectory))
+        self._samples.extend(trajectory, signal_strength, signal_direction, beacon_ids)
+        self._position = self._samples.position(-1)
+        self._updateEstimator(trajectory, signal_direction, beacon_ids)
+
+    def _flyWaypointsEvents(self, waypoints: Sequence[Position], d_time: float):
+        '''Append the waypoint arrivals, range crossings and in-range measurements of flying through the waypoints.'''
+        with timed(phase="motion"):
+            events, kinds, self._in_range = compute_event_trajectory(
+                self._position, waypoints, self.speed_limit, self.rot_speed_limit, self.slope.beacons, self.antenna_range,
+                self.sample_period or d_time, t0=self._samples.timestamp(-1), was_in_range=self._in_range,
+                refine_period=self.refine_period, refine_window=self.refine_window)
+        POSES.inc(len(events), mode="event")
+        # Waypoint arrivals are pose-only rows, every other event is a measurement within range
+        with timed(phase="read_signal"):
+            # Range crossings lie on the range boundary, allow for their rounding
+            signal_strength, signal_direction, beacon_ids = self.slope.read_signal_batch(events[:, 1:4], self.antenna_range * (1 + 1e-9))
+        SIGNAL_READS.inc(len(events))
+        signal_strength[kinds == WAYPOINT] = np.nan
+        signal_direction[kinds == WAYPOINT] = np.nan
+        beacon_ids[kinds == WAYPOINT] = -1
+        self._samples.extend(events, signal_strength, signal_direction, beacon_ids)
+        self._position = self._samples.position(-1)
+        self._updateEstimator(events, signal_direction, beacon_ids)
+
+    def _estimatorFor(self, beacon_id: int) -> BeaconEstimator:
+        '''The estimator of one beacon, a new one with the settings of beacon_estimator on its first bearing.'''
+        estimator = self.beacon_estimators.get(beacon_id)
+        if estimator is None:
+            estimator = self.beacon_estimators[beacon_id] = self.beacon_estimator.spawn()
+        return estimator
+
+    def _updateEstimator(self, poses: np.ndarray, signal_direction: np.ndarray, beacon_ids: np.ndarray):
+        '''Feed every beacon's estimator the bearings measured to that beacon at the poses, in time order.'''
+        if self.beacon_estimator is None:
+            return
+        with timed(phase="estimator"):
+            measured = ~np.isnan(signal_direction)
+            for beacon_id in np.unique(beacon_ids[measured]).tolist():
+                rows = measured & (beacon_ids == beacon_id)
+                # The estimator is sequential, but each update is O(1)
+                update = self._estimatorFor(beacon_id).update
+                for t, x, y, direction in zip(poses[rows, 0].tolist(), poses[rows, 1].tolist(), poses[rows, 2].tolist(),
+                                              signal_direction[rows].tolist()):
+                    update(x, y, direction, t)
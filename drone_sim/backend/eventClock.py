@@ -0,0 +1,170 @@
+import numpy as np
+from beaconIndex import BeaconIndex
+from position import Position
+from typing import List, Optional, Tuple, Union
+
+# Kinds of the events returned by compute_event_trajectory
+WAYPOINT, RANGE_ENTRY, RANGE_EXIT, SAMPLE = 0, 1, 2, 3
+
+# Intervals closer than this (in seconds) are treated as touching
+_TIME_EPS = 1e-9
+
+
+def _range_intervals(origins: np.ndarray, deltas: np.ndarray, move_times: np.ndarray, durations: np.ndarray,
+                     starts: np.ndarray, center: np.ndarray, radius: float,
+                     segments: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Time intervals in which the drone is within `radius` of `center`, one per segment at most.
+    Along a segment the position is origin + delta * min(tau / move_time, 1), so the squared
+    distance is a quadratic in tau while moving and constant once the position has arrived.
+    :param center: Transmitter position of shape (3,), or (P, 3) with one transmitter per entry of segments.
+    :param segments: Optional segment of every row of center, for (segment, transmitter) pairs.
+        The intervals are then those within radius of any of the transmitters.
+    :return: Array of shape (K, 2) with absolute start and end times, sorted and merged.
+    """
+    if segments is not None:
+        origins, deltas = origins[segments], deltas[segments]
+        move_times, durations, starts = move_times[segments], durations[segments], starts[segments]
+    offset = origins - center
+    a = np.einsum("ij,ij->i", deltas, deltas)
+    b = 2 * np.einsum("ij,ij->i", offset, deltas)
+    c = np.einsum("ij,ij->i", offset, offset) - radius ** 2
+
+    # Roots of a s^2 + b s + c = 0 for the segment fraction s in [0, 1]
+    moving = a > 0
+    discriminant = b * b - 4 * a * c
+    root = np.sqrt(np.maximum(discriminant, 0.0))
+    safe_a = np.where(moving, a, 1.0)
+    s_in = np.where(moving, (-b - root) / (2 * safe_a), 0.0)
+    s_out = np.where(moving, (-b + root) / (2 * safe_a), 1.0)
+    hit = np.where(moving, discriminant >= 0, c <= 0)
+    s_in, s_out = np.clip(s_in, 0.0, 1.0), np.clip(s_out, 0.0, 1.0)
+    hit &= s_out >= s_in
+    hit &= np.where(moving, (s_out > s_in) | (c <= 0) | (a + b + c <= 0), True)
+
+    # Fractions to times. After arriving the position holds until the rotation is done, so an
+    # interval that reaches the end of the motion extends to the end of the segment.
+    t_in = starts + s_in * move_times
+    t_out = starts + s_out * move_times
+    t_out = np.where(s_out >= 1.0, starts + durations, t_out)
+    intervals = np.column_stack([t_in[hit], t_out[hit]])
+    if not len(intervals):
+        return intervals
+    if segments is not None:
+        intervals = intervals[np.argsort(intervals[:, 0], kind="stable")]
+
+    # Merge intervals that continue across segment boundaries, or overlap between transmitters
+    merged = [intervals[0].tolist()]
+    for start, end in intervals[1:].tolist():
+        if start <= merged[-1][1] + _TIME_EPS:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return np.array(merged)
+
+
+def _grid_times(intervals: np.ndarray, period: float) -> np.ndarray:
+    """All multiples of period inside any of the intervals, vectorized over intervals."""
+    if not len(intervals):
+        return np.empty(0)
+    first = np.ceil(intervals[:, 0] / period - _TIME_EPS).astype(np.int64)
+    last = np.floor(intervals[:, 1] / period + _TIME_EPS).astype(np.int64)
+    counts = np.maximum(last - first + 1, 0)
+    owner = np.repeat(np.arange(len(intervals)), counts)
+    offsets = np.cumsum(counts) - counts
+    n = first[owner] + np.arange(counts.sum()) - offsets[owner]
+    return n * period
+
+
+def compute_event_trajectory(start: Position, waypoints: List[Position], speed_limit: float, rot_speed_limit: float,
+                             center: Union[np.ndarray, BeaconIndex], radius: float, sample_period: float, t0: float = 0.0,
+                             was_in_range: bool = False, refine_period: Optional[float] = None,
+                             refine_window: float = 0.0) -> Tuple[np.ndarray, np.ndarray, bool]:
+    """
+    Event-driven flight along piecewise-linear waypoints.
+
+    Instead of advancing in fixed ticks, the drone jumps straight to the times where something
+    happens: waypoint arrivals, entering and leaving the receiver range of the transmitters (found
+    by solving the distance quadratic of each leg), and measurement samples on a clock of its own.
+    Samples are only taken while in range, at every multiple of sample_period, and at the finer
+    refine_period during the first refine_window seconds after each range entry. The cost grows
+    with the number of events, not with the flight time.
+
+    Each leg moves at speed_limit and rotates at rot_speed_limit, both continuously, so a leg
+    takes max(length / speed_limit, rotation / rot_speed_limit) seconds. Unlike compute_trajectory
+    the arrival times are exact instead of rounded up to whole steps.
+    :param start: Pose of the drone at t0.
+    :param waypoints: Waypoints to visit in order.
+    :param speed_limit: Speed in units per second.
+    :param rot_speed_limit: Rotational speed in degrees per second.
+    :param center: Transmitter position (x, y, z), or a BeaconIndex of several transmitters. With an
+        index only the transmitters that can come within radius of a leg are solved for, and the
+        drone is in range while it is within radius of any of them.
+    :param radius: Receiver range.
+    :param sample_period: Seconds between measurement samples while in range.
+    :param t0: Time at the start pose. Samples stay on the global grid of multiples of the period.
+    :param was_in_range: The drone was already in range before t0, so being in range at t0 is not an entry.
+    :param refine_period: Seconds between samples right after a range entry, None for no refinement.
+    :param refine_window: Length of the refined stretch after each entry, in seconds.
+    :return: Tuple (events, kinds, in_range) with events of shape (N, 7) with columns t, x, y, z,
+        pitch, yaw, roll in time order (not including the start pose), their kinds (WAYPOINT,
+        RANGE_ENTRY, RANGE_EXIT or SAMPLE) and whether the drone ends in range.
+    """
+    poses = np.array([start.getStep()] + [p.getStep() for p in waypoints], dtype=float).reshape(-1, 6)
+    origins = poses[:-1]
+    deltas = poses[1:] - origins
+    lengths = np.linalg.norm(deltas[:, :3], axis=1)
+    rot_lengths = np.linalg.norm(deltas[:, 3:], axis=1)
+    move_times = lengths / speed_limit
+    rot_times = rot_lengths / rot_speed_limit
+    durations = np.maximum(move_times, rot_times)
+    ends = t0 + np.cumsum(durations)
+    starts = ends - durations
+    if isinstance(center, BeaconIndex):
+        segments, beacon_ids = center.segment_candidates(origins[:, :3], poses[1:, :3], radius)
+        intervals = _range_intervals(origins[:, :3], deltas[:, :3], move_times, durations, starts,
+                                     center.positions[beacon_ids], radius, segments)
+    else:
+        intervals = _range_intervals(origins[:, :3], deltas[:, :3], move_times, durations, starts,
+                                     np.asarray(center, dtype=float), radius)
+    entries = intervals[:, 0] if len(intervals) else np.empty(0)
+    exits = intervals[:, 1] if len(intervals) else np.empty(0)
+    if len(intervals) and was_in_range and entries[0] <= t0 + _TIME_EPS:
+        entries = entries[1:]
+        refined_intervals = intervals[1:]
+    else:
+        refined_intervals = intervals
+    # A flight that ends in range has not exited
+    in_range = bool(len(exits)) and exits[-1] >= ends[-1] - _TIME_EPS
+    if in_range:
+        exits = exits[:-1]
+
+    samples = _grid_times(intervals, sample_period)
+    if refine_period is not None and refine_window > 0 and len(refined_intervals):
+        windows = np.column_stack([refined_intervals[:, 0], np.minimum(refined_intervals[:, 0] + refine_window, refined_intervals[:, 1])])
+        samples = np.union1d(samples, _grid_times(windows, refine_period))
+    samples = samples[samples > t0 + _TIME_EPS]
+    # A sample that falls on a range crossing is already measured there
+    crossings = np.sort(np.concatenate([entries, exits]))
+    if len(crossings) and len(samples):
+        nearest = np.clip(np.searchsorted(crossings, samples), 1, len(crossings)) - 1
+        right = np.minimum(nearest + 1, len(crossings) - 1)
+        gap = np.minimum(np.abs(samples - crossings[nearest]), np.abs(samples - crossings[right]))
+        samples = samples[gap > _TIME_EPS * 1e3]
+
+    times = np.concatenate([ends, entries, exits, samples])
+    kinds = np.concatenate([np.full(len(ends), WAYPOINT), np.full(len(entries), RANGE_ENTRY),
+                            np.full(len(exits), RANGE_EXIT), np.full(len(samples), SAMPLE)])
+    order = np.argsort(times, kind="stable")
+    times, kinds = times[order], kinds[order]
+
+    # Pose at every event time, interpolated on its leg
+    segment = np.minimum(np.searchsorted(ends, times - _TIME_EPS), len(ends) - 1)
+    tau = times - starts[segment]
+    fraction = np.clip(tau / np.where(move_times > 0, move_times, 1.0)[segment], 0.0, 1.0)
+    rot_fraction = np.clip(tau / np.where(rot_times > 0, rot_times, 1.0)[segment], 0.0, 1.0)
+    events = np.empty((len(times), 7))
+    events[:, 0] = times
+    events[:, 1:4] = origins[segment, :3] + deltas[segment, :3] * fraction[:, None]
+    events[:, 4:] = origins[segment, 3:] + deltas[segment, 3:] * rot_fraction[:, None]
+    return events, kinds, in_range
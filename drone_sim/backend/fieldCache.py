@@ -0,0 +1,270 @@
+"""
+On-disk cache of dipole field-magnitude volumes, for the MagneticField view.
+
+A volume is |H| of the superposed dipole fields of a set of transmitters (see field_model),
+evaluated on a regular 3D grid. It is computed once, a block of x planes at a time straight into
+a .npy file, and then served memory-mapped, so a repeated view of the same transmitters only
+reads the pages it needs. A view of a single plane of the grid computes and caches just that
+plane, unless the whole volume is cached already. Files are named by a hash of the antenna parameters and grid spec,
+and the least recently used ones are deleted when the directory grows past max_bytes.
+The cache lives in DRONE_SIM_FIELD_CACHE, by default a directory in the system temp dir.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+import field_model
+from metrics import timed
+from transmittAntenna import TransmittAntenna
+
+# Bump when the field model changes, so volumes computed by the old model are never served
+FIELD_VERSION = 1
+
+DEFAULT_DIRECTORY = os.environ.get("DRONE_SIM_FIELD_CACHE", os.path.join(tempfile.gettempdir(), "drone_sim_field_cache"))
+
+# Largest volume computed on request, 256^3 float32 is 64 MB
+MAX_POINTS = 256 ** 3
+
+# Grid points evaluated at once while computing a volume
+_BLOCK_POINTS = 1 << 20
+
+AXES = ("x", "y", "z")
+
+
+class FieldGridSpec:
+    """
+    A regular grid of shape (nx, ny, nz) whose node (i, j, k) lies at origin + (i, j, k) * resolution.
+    """
+    def __init__(self, origin: Tuple[float, float, float], shape: Tuple[int, int, int], resolution: float):
+        if resolution <= 0:
+            raise ValueError(f"Resolution must be positive, got {resolution}")
+        if len(shape) != 3 or min(shape) < 1:
+            raise ValueError(f"Grid shape must be three positive sizes, got {shape}")
+        self.origin = tuple(float(v) for v in origin)
+        self.shape = tuple(int(n) for n in shape)
+        self.resolution = float(resolution)
+
+    @classmethod
+    def around(cls, center: Tuple[float, float, float], extent: float, resolution: float) -> "FieldGridSpec":
+        """The cube of half side `extent` centered on `center`, like field_model.FieldGrid."""
+        if not resolution > 0:
+            raise ValueError(f"Resolution must be positive, got {resolution}")
+        if not np.isfinite(extent):
+            raise ValueError(f"Extent must be finite, got {extent}")
+        n = int(round(2 * extent / resolution)) + 1
+        return cls(tuple(c - extent for c in center), (n, n, n), resolution)
+
+    @property
+    def points(self) -> int:
+        return self.shape[0] * self.shape[1] * self.shape[2]
+
+    def ticks(self, axis: int) -> np.ndarray:
+        return self.origin[axis] + np.arange(self.shape[axis]) * self.resolution
+
+    def index(self, axis: int, coordinate: float) -> int:
+        """
+        Index of the grid plane closest to a coordinate along an axis.
+        :raises ValueError: If the coordinate is outside the grid.
+        """
+        index = int(round((coordinate - self.origin[axis]) / self.resolution))
+        if not 0 <= index < self.shape[axis]:
+            raise ValueError(f"{AXES[axis]} = {coordinate} is outside the grid, "
+                             f"{self.origin[axis]} to {self.origin[axis] + (self.shape[axis] - 1) * self.resolution}")
+        return index
+
+    def plane(self, axis: int, index: int) -> "FieldGridSpec":
+        """The grid of a single plane, one node thick along the axis."""
+        origin = list(self.origin)
+        origin[axis] = float(self.origin[axis] + index * self.resolution)
+        shape = list(self.shape)
+        shape[axis] = 1
+        return FieldGridSpec(tuple(origin), tuple(shape), self.resolution)
+
+    def to_dict(self) -> dict:
+        return {"origin": list(self.origin), "shape": list(self.shape), "resolution": self.resolution}
+
+
+def antenna_parameters(antennas: Sequence[TransmittAntenna]) -> list:
+    """The parameters the field depends on, (x, y, z, pitch, yaw, roll, moment) of every antenna, sorted."""
+    return sorted([float(a.position.x), float(a.position.y), float(a.position.z), float(a.position.pitch),
+                   float(a.position.yaw), float(a.position.roll), float(a.moment)] for a in antennas)
+
+
+def volume_key(antennas: Sequence[TransmittAntenna], spec: FieldGridSpec) -> str:
+    """Hash of the antenna parameters and grid spec naming the cached volume."""
+    description = json.dumps({"version": FIELD_VERSION, "antennas": antenna_parameters(antennas), "grid": spec.to_dict()},
+                             sort_keys=True)
+    return hashlib.sha1(description.encode()).hexdigest()
+
+
+def compute_volume(antennas: Sequence[TransmittAntenna], spec: FieldGridSpec, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    |H| of the superposed dipole fields on the grid, computed a block of x planes at a time.
+    :param out: float32 array of the grid's shape to write into, e.g. a memory-mapped file.
+    :return: Array of shape spec.shape.
+    """
+    if out is None:
+        out = np.empty(spec.shape, dtype=np.float32)
+    sources = [(np.array([a.position.x, a.position.y, a.position.z]),
+                field_model.dipole_axis(a.position.pitch, a.position.yaw, a.position.roll), a.moment) for a in antennas]
+    _, ny, nz = spec.shape
+    plane = np.stack(np.meshgrid(spec.ticks(1), spec.ticks(2), indexing="ij"), axis=-1).reshape(-1, 2)
+    x = spec.ticks(0)
+    planes_per_block = max(1, _BLOCK_POINTS // (ny * nz))
+    for first in range(0, len(x), planes_per_block):
+        block_x = x[first:first + planes_per_block]
+        points = np.column_stack([np.repeat(block_x, len(plane)), np.tile(plane, (len(block_x), 1))])
+        field = np.zeros_like(points)
+        for center, axis, moment in sources:
+            field += field_model.dipole_field(points - center, axis, moment)
+        out[first:first + len(block_x)] = np.sqrt(np.einsum("ij,ij->i", field, field)).reshape(len(block_x), ny, nz)
+    return out
+
+
+class FieldVolumeCache:
+    """
+    Directory of field-magnitude volumes as .npy files, bounded by their total size.
+
+    Serving a volume touches its modification time, and after storing one the least recently
+    served files are deleted until the directory fits in max_bytes again. Files are written under
+    a temporary name and renamed when complete, so other threads and processes sharing the
+    directory never map a partial volume. Volumes already mapped stay readable after eviction.
+    """
+    def __init__(self, directory: str = DEFAULT_DIRECTORY, max_bytes: int = 1024 * 1024 * 1024):
+        """
+        :param directory: Directory of the cached volumes, created when missing.
+        :param max_bytes: Maximum total size of the cached files. A larger volume is still
+            returned, but evicted by the next store.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # Key -> lock, so concurrent requests for the same volume compute it once
+        self._computing = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def volume(self, antennas: Sequence[TransmittAntenna], spec: FieldGridSpec) -> Tuple[np.ndarray, bool]:
+        """
+        The field-magnitude volume of the antennas on the grid, computed on first use.
+        :return: Tuple (volume, hit), the volume a read-only memory map of shape spec.shape.
+        """
+        key = volume_key(antennas, spec)
+        volume = self._load(key)
+        if volume is not None:
+            with self._lock:
+                self.hits += 1
+            return volume, True
+
+        with self._lock:
+            key_lock = self._computing.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another thread may have stored it while this one waited
+            volume = self._load(key)
+            hit = volume is not None
+            if not hit:
+                self._store(key, antennas, spec)
+                volume = self._load(key)
+        with self._lock:
+            self._computing.pop(key, None)
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return volume, hit
+
+    def plane(self, antennas: Sequence[TransmittAntenna], spec: FieldGridSpec, axis: int, index: int) -> Tuple[np.ndarray, bool]:
+        """
+        One plane of the field-magnitude volume, cut from the volume when that is cached, otherwise
+        computed and cached on its own as the grid spec.plane(axis, index).
+        :return: Tuple (plane, hit), the plane a 2D array of spec.shape without the axis.
+        """
+        volume = self._load(volume_key(antennas, spec))
+        if volume is not None:
+            with self._lock:
+                self.hits += 1
+            return np.take(volume, index, axis=axis), True
+        plane, hit = self.volume(antennas, spec.plane(axis, index))
+        return np.take(plane, 0, axis=axis), hit
+
+    def _load(self, key: str) -> Optional[np.ndarray]:
+        try:
+            volume = np.load(self.path(key), mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return None
+        try:
+            os.utime(self.path(key))
+        except OSError:
+            pass
+        return volume
+
+    def _store(self, key: str, antennas: Sequence[TransmittAntenna], spec: FieldGridSpec):
+        temporary = os.path.join(self.directory, f".{key}.{os.getpid()}.{threading.get_ident()}.npy")
+        with timed(phase="field_volume"):
+            out = np.lib.format.open_memmap(temporary, mode="w+", dtype=np.float32, shape=spec.shape)
+            compute_volume(antennas, spec, out)
+            out.flush()
+            del out
+        os.replace(temporary, self.path(key))
+        self._evict(keep=key)
+
+    def _files(self) -> list:
+        """(mtime, size, name) of every complete volume in the directory."""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npy") and not entry.name.startswith("."):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.name))
+        return files
+
+    def _evict(self, keep: Optional[str] = None):
+        """Delete the least recently served volumes until the directory fits in max_bytes."""
+        files = self._files()
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if name == f"{keep}.npy":
+                continue
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def clear(self):
+        """Delete every cached volume."""
+        for _, _, name in self._files():
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        files = self._files()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(files),
+                "bytes": sum(size for _, size, _ in files),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,163 @@
+import math
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Tuple
+
+# Avalanche transceivers transmit at 457 kHz. The wavelength is ~656 m, so within the search
+# ranges used here (tens of meters) the field is well described by the quasi-static near field
+# of a magnetic dipole, H = (3 r_hat (m . r_hat) - m) / (4 pi r^3).
+FREQUENCY = 457e3
+WAVELENGTH = 299792458.0 / FREQUENCY
+
+# Points closer to the antenna than this are clamped, the dipole field is singular at r = 0
+MIN_DISTANCE = 1e-3
+
+# Total size of the FieldGrids kept by field_grid, a default grid is about 12 MB
+FIELD_GRID_CACHE_BYTES = 128 * 1024 * 1024
+
+
+def dipole_axis(pitch: float, yaw: float, roll: float) -> np.ndarray:
+    """
+    Unit vector of the transmitter coil axis for an antenna orientation in degrees.
+    The unrotated axis points along x. Yaw turns about the vertical y axis, pitch about z and
+    roll about x, applied as R = R_yaw @ R_pitch @ R_roll. Roll spins the coil about its own
+    axis, so it does not change the dipole direction.
+    """
+    pitch, yaw, roll = np.radians([pitch, yaw, roll])
+    r_roll = np.array([[1, 0, 0], [0, np.cos(roll), -np.sin(roll)], [0, np.sin(roll), np.cos(roll)]])
+    r_pitch = np.array([[np.cos(pitch), -np.sin(pitch), 0], [np.sin(pitch), np.cos(pitch), 0], [0, 0, 1]])
+    r_yaw = np.array([[np.cos(yaw), 0, np.sin(yaw)], [0, 1, 0], [-np.sin(yaw), 0, np.cos(yaw)]])
+    return r_yaw @ r_pitch @ r_roll @ np.array([1.0, 0.0, 0.0])
+
+
+def dipole_field(points: np.ndarray, axis: np.ndarray, moment: float = 1.0) -> np.ndarray:
+    """
+    Near-field H-vector of a magnetic dipole at the origin.
+    :param points: Array of shape (N, 3), positions relative to the antenna.
+    :param axis: Unit vector of the dipole axis, see dipole_axis.
+    :param moment: Magnetic moment in A*m^2.
+    :return: Array of shape (N, 3) with the H-field in A/m.
+    """
+    points = np.asarray(points, dtype=float)
+    r = np.maximum(np.sqrt(np.einsum("ij,ij->i", points, points)), MIN_DISTANCE)
+    r_hat = points / r[:, None]
+    m = moment * np.asarray(axis, dtype=float)
+    m_dot_r = r_hat @ m
+    return (3 * r_hat * m_dot_r[:, None] - m) / (4 * np.pi * r[:, None] ** 3)
+
+
+def dipole_field_at(x: float, y: float, z: float, axis: Tuple[float, float, float], moment: float = 1.0) -> Tuple[float, float, float]:
+    """
+    Scalar version of dipole_field for a single point, without NumPy overhead.
+    """
+    r = max(math.sqrt(x * x + y * y + z * z), MIN_DISTANCE)
+    rx, ry, rz = x / r, y / r, z / r
+    mx, my, mz = moment * axis[0], moment * axis[1], moment * axis[2]
+    m_dot_r = rx * mx + ry * my + rz * mz
+    scale = 1.0 / (4 * math.pi * r ** 3)
+    return ((3 * rx * m_dot_r - mx) * scale, (3 * ry * m_dot_r - my) * scale, (3 * rz * m_dot_r - mz) * scale)
+
+
+class FieldGrid:
+    """
+    Dipole field precomputed on a regular 3D grid around the antenna, answering queries by
+    trilinear interpolation. Coordinates are relative to the antenna, so one grid serves every
+    antenna position with the same orientation and moment.
+
+    Points outside the grid, and points within `exact_radius` of the antenna where the 1/r^3
+    field changes too fast to interpolate, are evaluated exactly.
+    """
+    def __init__(self, axis: np.ndarray, moment: float = 1.0, extent: float = 50.0, resolution: float = 1.0, exact_radius: float = 5.0):
+        """
+        :param axis: Unit vector of the dipole axis.
+        :param moment: Magnetic moment in A*m^2.
+        :param extent: Half the side length of the cubic grid, in meters.
+        :param resolution: Grid spacing in meters.
+        :param exact_radius: Radius around the antenna that is always evaluated exactly.
+        """
+        self.axis = np.asarray(axis, dtype=float)
+        self.moment = moment
+        self.extent = extent
+        self.resolution = resolution
+        self.exact_radius = exact_radius
+        self.n = int(round(2 * extent / resolution)) + 1
+        ticks = np.linspace(-extent, extent, self.n)
+        gx, gy, gz = np.meshgrid(ticks, ticks, ticks, indexing="ij")
+        nodes = np.stack([gx.ravel(), gy.ravel(), gz.ravel()], axis=1)
+        self.values = dipole_field(nodes, self.axis, moment).astype(np.float32).reshape(self.n, self.n, self.n, 3)
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes
+
+    def __call__(self, points: np.ndarray) -> np.ndarray:
+        """
+        Interpolated H-field at points relative to the antenna.
+        :param points: Array of shape (N, 3).
+        :return: Array of shape (N, 3).
+        """
+        points = np.asarray(points, dtype=float)
+        u = (points + self.extent) / self.resolution
+        inside = np.all((u >= 0) & (u <= self.n - 1), axis=1)
+        inside &= np.einsum("ij,ij->i", points, points) > self.exact_radius ** 2
+
+        field = np.empty_like(points)
+        if not inside.all():
+            field[~inside] = dipole_field(points[~inside], self.axis, self.moment)
+
+        u = u[inside]
+        i0 = np.minimum(np.floor(u).astype(np.int64), self.n - 2)
+        f = u - i0
+        base = (i0[:, 0] * self.n + i0[:, 1]) * self.n + i0[:, 2]
+        flat = self.values.reshape(-1, 3)
+        result = np.zeros((len(u), 3))
+        # Accumulate the eight corner values of each cell with their trilinear weights
+        for dx in (0, 1):
+            wx = f[:, 0] if dx else 1 - f[:, 0]
+            for dy in (0, 1):
+                wxy = wx * (f[:, 1] if dy else 1 - f[:, 1])
+                for dz in (0, 1):
+                    w = wxy * (f[:, 2] if dz else 1 - f[:, 2])
+                    result += flat[base + (dx * self.n + dy) * self.n + dz] * w[:, None]
+        field[inside] = result
+        return field
+
+
+# Key -> FieldGrid in least recently used order, bounded by FIELD_GRID_CACHE_BYTES
+_grids = OrderedDict()
+_grids_bytes = 0
+_grids_lock = threading.Lock()
+
+
+def field_grid(moment: float, pitch: float, yaw: float, roll: float, extent: float = 50.0, resolution: float = 1.0) -> FieldGrid:
+    """
+    Return the FieldGrid for an antenna configuration, computing it on first use.
+    Grids are kept in an LRU cache keyed by the antenna parameters and grid spec. The least
+    recently used are dropped once the grids take more than FIELD_GRID_CACHE_BYTES, though the
+    grid just returned is always kept.
+    """
+    global _grids_bytes
+    key = (moment, pitch, yaw, roll, extent, resolution)
+    with _grids_lock:
+        grid = _grids.get(key)
+        if grid is not None:
+            _grids.move_to_end(key)
+            return grid
+    grid = FieldGrid(dipole_axis(pitch, yaw, roll), moment, extent, resolution)
+    with _grids_lock:
+        if key not in _grids:
+            _grids[key] = grid
+            _grids_bytes += grid.nbytes
+        while _grids_bytes > FIELD_GRID_CACHE_BYTES and len(_grids) > 1:
+            _, evicted = _grids.popitem(last=False)
+            _grids_bytes -= evicted.nbytes
+        return _grids.get(key, grid)
+
+
+def clear_field_grids():
+    """Drop every cached FieldGrid."""
+    global _grids_bytes
+    with _grids_lock:
+        _grids.clear()
+        _grids_bytes = 0
@@ -0,0 +1,213 @@
+import logging
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict, deque
+from typing import Callable, Hashable, Optional
+
+from metrics import log_event
+
+# Job states. A job moves from queued to running to one of the three final states, or from
+# queued straight to cancelled.
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINAL_STATES = (DONE, FAILED, CANCELLED)
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit when max_pending jobs are already waiting."""
+
+
+class Job:
+    """
+    One queued call of a job function. The function gets the Job as its only argument and
+    reports through update_progress, which returns False once cancellation was requested.
+    """
+    def __init__(self, function: Callable[["Job"], object], client: Hashable, description: str = ""):
+        self.id = uuid.uuid4().hex
+        self.function = function
+        self.client = client
+        self.description = description
+        self.status = QUEUED
+        self.steps_done = 0
+        self.total_steps = None
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def update_progress(self, steps_done: int, total_steps: Optional[int] = None) -> bool:
+        """
+        Record progress.
+        :return: False if the job should stop because it was cancelled.
+        """
+        self.steps_done = steps_done
+        if total_steps is not None:
+            self.total_steps = total_steps
+        return not self._cancel.is_set()
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "description": self.description,
+            "status": self.status,
+            "steps_done": self.steps_done,
+            "total_steps": self.total_steps,
+            "progress": self.steps_done / self.total_steps if self.total_steps else None,
+            "result": self.result,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """
+    Bounded pool of worker threads running submitted jobs in the background.
+
+    Pending jobs are kept in one FIFO per client and the workers take from the clients in
+    round-robin order, so a client that submits many jobs at once cannot starve the others.
+    Finished jobs stay queryable until `max_finished` newer jobs have finished.
+    """
+    def __init__(self, workers: int = 2, max_pending: int = 100, max_finished: int = 1000):
+        """
+        :param workers: Number of worker threads, the most jobs that run at the same time.
+        :param max_pending: Most jobs that can wait for a worker, submit raises QueueFull beyond that.
+        :param max_finished: Number of finished jobs kept for status queries.
+        """
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self._jobs = {}
+        self._finished = OrderedDict()
+        self._pending = OrderedDict()  # client -> deque of jobs, in round-robin order
+        self._pending_count = 0
+        self._condition = threading.Condition()
+        self._threads = []
+        self._stopped = False
+
+    def _start_workers(self):
+        # Started on first submit, so importing the Flask app does not spawn threads
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"job-worker-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, function: Callable[[Job], object], client: Hashable = None, description: str = "") -> Job:
+        """
+        Queue function(job) to run on a worker.
+        :param client: Key used for fair scheduling, e.g. the remote address of the request.
+        :return: The queued Job.
+        """
+        job = Job(function, client, description)
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("JobQueue is shut down")
+            if self._pending_count >= self.max_pending:
+                raise QueueFull(f"{self._pending_count} jobs are already waiting")
+            self._jobs[job.id] = job
+            self._pending.setdefault(client, deque()).append(job)
+            self._pending_count += 1
+            self._start_workers()
+            self._condition.notify()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a job. A queued job is dropped at once, a running job stops at its next progress update.
+        :return: The job, or None if the ID is unknown.
+        """
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINAL_STATES:
+                return job
+            job._cancel.set()
+            if job.status == QUEUED:
+                queue = self._pending[job.client]
+                queue.remove(job)
+                self._pending_count -= 1
+                if not queue:
+                    del self._pending[job.client]
+                self._finish(job, CANCELLED)
+        return job
+
+    def stats(self) -> dict:
+        with self._condition:
+            counts = {state: 0 for state in (QUEUED, RUNNING, DONE, FAILED, CANCELLED)}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return dict(counts, workers=self.workers, max_pending=self.max_pending)
+
+    def shutdown(self, wait: bool = True):
+        """
+        Cancel the pending jobs and stop the workers after their current job.
+        """
+        with self._condition:
+            self._stopped = True
+            for queue in self._pending.values():
+                for job in queue:
+                    job._cancel.set()
+                    self._finish(job, CANCELLED)
+            self._pending.clear()
+            self._pending_count = 0
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _next_job(self) -> Optional[Job]:
+        with self._condition:
+            while not self._pending and not self._stopped:
+                self._condition.wait()
+            if self._stopped:
+                return None
+            # Take the oldest job of the first client and move that client to the back
+            client, queue = next(iter(self._pending.items()))
+            job = queue.popleft()
+            del self._pending[client]
+            if queue:
+                self._pending[client] = queue
+            self._pending_count -= 1
+            job.status = RUNNING
+            job.started_at = time.time()
+            return job
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                result = job.function(job)
+            except Exception as exc:
+                # The error is served to the client, so it gets the message and the log the traceback
+                job.error = str(exc) or type(exc).__name__
+                log_event("job_failed", logging.ERROR, job_id=job.id, description=job.description,
+                          traceback=traceback.format_exc())
+                status = FAILED
+            else:
+                job.result = result
+                # A function that still finished its work after a late cancel counts as done
+                status = CANCELLED if job.cancel_requested and result is None else DONE
+            with self._condition:
+                self._finish(job, status)
+
+    def _finish(self, job: Job, status: str):
+        # Called with the condition held
+        job.status = status
+        job.finished_at = time.time()
+        self._finished[job.id] = job
+        while len(self._finished) > self.max_finished:
+            old_id, _ = self._finished.popitem(last=False)
+            del self._jobs[old_id]
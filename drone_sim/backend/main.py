@@ -1,9 +1,7 @@
 from db import (
     initialize_database,
     create_simulation,
-    log_position,
-    log_simulation_result,
-    log_measurement,
+    SimulationRecorder,
     add_slope,
     add_transmitt_antenna,
 )
@@ -12,6 +10,8 @@ from drone import Drone
 from position import Position
 from preDefPath import PreDefPath
 from transmittAntenna import TransmittAntenna
+from beaconEstimator import BeaconEstimator
+from metrics import configure_logging
 
 def run_simulation():
     """
@@ -41,6 +41,8 @@ def run_simulation():
         slope=slope,
         simulation_id=simulation_id,
         antenna_range=100,
+        trajectory_mode="vectorized",
+        beacon_estimator=BeaconEstimator(),
     )
 
     # Step 4: Simulate drone movements
@@ -71,27 +73,25 @@ def run_simulation():
 
     if drone.followPath(d_time=time_step):
         print("Successe! Drone reached the end of the path.")
+    print(f"Estimated transmitter position (x, y): {drone.beaconEstimate}")
 
 
     # Step 5: Log everythoing to the database
 
-    for position, timestamp in drone.positionHist:
-        log_position(simulation_id, timestamp, position)
-
-    for measurement in drone.measurements:
-        log_measurement(simulation_id, measurement)
-
-    log_simulation_result(
-        simulation_id,
-        start_position,
-        slope.transmittAntenna.position,
-        drone.position,
-        len(drone.positionHist),
-    )
+    with SimulationRecorder(simulation_id) as recorder:
+        recorder.log_samples(drone.samples)
+        recorder.log_beacon_estimates(drone.beacon_estimator.history)
+        recorder.log_simulation_result(
+            start_position,
+            slope.transmittAntenna.position,
+            drone.position,
+            len(drone.positionHist),
+        )
 
     print("\nSimulation complete. Results stored in the database.")
 
 if __name__ == "__main__":
+    configure_logging()
     print('\n\n**************************\nStarting simulation...\n**************************\n\n')
     run_simulation()
     print('\n\n**************************\nSimulation complete.\n**************************\n\n')
@@ -0,0 +1,306 @@
+"""
+Lightweight instrumentation of the simulation, storage and API hot paths.
+
+- logger: the "drone_sim" logger. Per-step events are logged at DEBUG through log_event, which
+  returns before building anything when DEBUG is off, so disabled logging costs one level check.
+- Counters, histograms and gauges in REGISTRY, rendered in the Prometheus text format by
+  render_prometheus for /api/metrics. timed() observes the duration of a block. Set the
+  environment variable DRONE_SIM_METRICS=0 to turn the timers and counters into no-ops.
+- profile(): cProfile (or pyinstrument, when installed) capture of one block, e.g. one simulation run.
+"""
+import bisect
+import cProfile
+import io
+import json
+import logging
+import math
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+logger = logging.getLogger("drone_sim")
+
+ENABLED = os.environ.get("DRONE_SIM_METRICS", "1") != "0"
+
+# Latency buckets in seconds, from 50 microseconds to 10 seconds
+DEFAULT_BUCKETS = (5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROFILERS = ("cprofile", "pyinstrument")
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, with the fields passed to log_event."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"time": round(record.created, 6), "level": record.levelname, "logger": record.name,
+                 "event": record.getMessage()}
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: Optional[str] = None):
+    """
+    Send the drone_sim logger to stderr as JSON lines.
+    :param level: Level name, defaults to the DRONE_SIM_LOG_LEVEL environment variable or WARNING.
+    """
+    level = level or os.environ.get("DRONE_SIM_LOG_LEVEL", "WARNING")
+    if not any(isinstance(handler.formatter, StructuredFormatter) for handler in logger.handlers):
+        handler = logging.StreamHandler()
+        handler.setFormatter(StructuredFormatter())
+        logger.addHandler(handler)
+    logger.setLevel(level.upper())
+
+
+def log_event(event: str, level: int = logging.DEBUG, **fields):
+    """
+    Log a structured event. Nothing is formatted unless the level is enabled.
+    :param event: Short event name, e.g. "drone_moved".
+    :param fields: Values attached to the event.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, per label combination."""
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in values]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets, with their sum and count."""
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label combination: [counts per bucket plus one for +Inf, sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return sum(entry[0]) if entry else 0
+
+    def total(self, **labels) -> float:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return entry[1] if entry else 0.0
+
+    def _samples(self):
+        with self._lock:
+            values = sorted((key, list(counts), total) for key, (counts, total) in self._values.items())
+        samples = []
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", _format_labels(self.labelnames, key, (("le", _format_value(bound)),)), cumulative))
+            labels = _format_labels(self.labelnames, key)
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class Gauge(_Metric):
+    """Current values read from a callback when the metrics are rendered."""
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, function: Callable[[], Dict[Tuple[str, ...], float]], labelnames: Sequence[str] = ()):
+        """
+        :param function: Returns the current value per tuple of label values, {(): value} without labels.
+        """
+        super().__init__(name, help, labelnames)
+        self.function = function
+
+    def _samples(self):
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in sorted(self.function().items())]
+
+
+class Registry:
+    """Named metrics, each created once and rendered together."""
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, function: Callable[[], Dict[Tuple[str, ...], float]], labelnames: Sequence[str] = ()) -> Gauge:
+        """Register a gauge, replacing the callback of an existing one."""
+        gauge = self._register(Gauge(name, help, function, labelnames))
+        gauge.function = function
+        return gauge
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+# Time per phase of a simulation and its storage, labelled phase = motion, read_signal,
+# estimator, db_flush or json_serialize
+PHASE_SECONDS = REGISTRY.histogram("drone_sim_phase_seconds", "Time spent in each hot-path phase.", ("phase",))
+POSES = REGISTRY.counter("drone_sim_poses_total", "Simulated drone poses.", ("mode",))
+SIGNAL_READS = REGISTRY.counter("drone_sim_signal_reads_total", "Signal readings evaluated.")
+DB_ROWS = REGISTRY.counter("drone_sim_db_rows_total", "Rows written by SimulationRecorder.", ("table",))
+REQUEST_SECONDS = REGISTRY.histogram("drone_sim_request_seconds", "Latency of HTTP requests.", ("method", "endpoint", "status"))
+
+
+@contextmanager
+def timed(histogram: Histogram = PHASE_SECONDS, **labels):
+    """Observe the wall time of the block in the histogram, e.g. with timed(phase="db_flush")."""
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start, **labels)
+
+
+def render_prometheus() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    return REGISTRY.render()
+
+
+class ProfileResult:
+    """Report of a profile() block, filled in when the block exits."""
+    def __init__(self, profiler: str):
+        self.profiler = profiler
+        self.seconds = None
+        self.report = None
+
+    def to_dict(self) -> dict:
+        return {"profiler": self.profiler, "seconds": self.seconds, "report": self.report}
+
+
+@contextmanager
+def profile(profiler: str = "cprofile", limit: int = 30, output_file: Optional[str] = None):
+    """
+    Profile the block with cProfile or pyinstrument.
+    :param profiler: "cprofile" or "pyinstrument". pyinstrument is optional and must be installed.
+    :param limit: Number of functions in the cProfile report, sorted by cumulative time.
+    :param output_file: Optional path to also save the raw profile (pstats file or pyinstrument HTML).
+    :return: ProfileResult whose report is the text summary after the block.
+    """
+    if profiler not in PROFILERS:
+        raise ValueError(f"Unknown profiler {profiler!r}, expected one of {PROFILERS}")
+    result = ProfileResult(profiler)
+    start = time.perf_counter()
+    if profiler == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise ValueError("pyinstrument is not installed, use profiler='cprofile'") from None
+        sampler = Profiler()
+        sampler.start()
+        try:
+            yield result
+        finally:
+            sampler.stop()
+            result.seconds = time.perf_counter() - start
+            result.report = sampler.output_text()
+            if output_file:
+                with open(output_file, "w") as f:
+                    f.write(sampler.output_html())
+        return
+
+    tracer = cProfile.Profile()
+    tracer.enable()
+    try:
+        yield result
+    finally:
+        tracer.disable()
+        result.seconds = time.perf_counter() - start
+        stream = io.StringIO()
+        pstats.Stats(tracer, stream=stream).sort_stats("cumulative").print_stats(limit)
+        result.report = stream.getvalue()
+        if output_file:
+            tracer.dump_stats(output_file)
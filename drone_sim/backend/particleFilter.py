@@ -0,0 +1,178 @@
+import numpy as np
+from position import Measurement
+from slope import Slope
+from typing import Optional, Sequence, Tuple
+
+# Particles x measurements evaluated at once in a weight update. Bounds the temporary arrays to
+# about 64 MB per float64 array, whatever the particle count.
+_CHUNK_ELEMENTS = 8 * 1024 * 1024
+
+
+class ParticleFilter:
+    """
+    Particle-filter localization of the transmitter on the slope surface, or in a search region.
+
+    By default the transmitter lies on the slope, so a particle is a point (x, z) of the slope
+    rectangle and its height is Slope.surface_height(x, z) - depth. Given a search region, a
+    particle is a point (x, y, z) of that box instead, for a transmitter that may not be on the
+    slope surface. Particles live in NumPy arrays and every weight
+    update evaluates all particles against a whole batch of measurements at once, in log space.
+    Unlike the least-squares estimators, the particle cloud can hold several hypotheses, e.g. the
+    two mirror images a few early bearings cannot tell apart.
+
+    Measurements are read as TransmittAntenna.read_signal reports them: signal_direction is the
+    bearing atan2(dy, dx) of the receiver seen from the transmitter, and signal_strength the
+    distance, which only holds for the "distance" model. Either can be ignored by setting its
+    noise to None, e.g. distance_std for the dipole models.
+    """
+    def __init__(self, slope: Slope, particles: int = 100000, bearing_std: Optional[float] = 0.05,
+                 distance_std: Optional[float] = None, depth: float = 0.0, resample_threshold: float = 0.5,
+                 roughening: float = 0.2, seed: Optional[int] = None,
+                 region: Optional[Tuple[float, float, float, float, float, float]] = None):
+        """
+        :param slope: The slope the transmitter is on.
+        :param particles: Number of particles, 10k to 1M are practical.
+        :param bearing_std: Standard deviation of the bearing noise in radians, None to ignore bearings.
+        :param distance_std: Standard deviation of the distance noise in meters, None to ignore distances.
+        :param depth: Depth of the transmitter below the surface, along y.
+        :param resample_threshold: Resample when the effective sample size drops below this fraction of the particles.
+        :param roughening: Jitter added after resampling, as a fraction of the cloud's spread
+            scaled by particles^(-1/2), so resampled duplicates spread out again.
+        :param seed: Seed of the random generator.
+        :param region: Search region (x_min, x_max, y_min, y_max, z_min, z_max) of the transmitter,
+            with a uniform prior over it. Defaults to the slope rectangle, with particles at depth
+            below the surface.
+        """
+        if bearing_std is None and distance_std is None:
+            raise ValueError("At least one of bearing_std and distance_std must be given")
+        self.slope = slope
+        self.bearing_std = bearing_std
+        self.distance_std = distance_std
+        self.depth = depth
+        self.resample_threshold = resample_threshold
+        self.roughening = roughening
+        self.rng = np.random.default_rng(seed)
+        self.resamples = 0
+        if region is None:
+            x_min, x_max, z_top, z_bottom = slope.footprint()
+            self._x_bounds, self._y_bounds, self._z_bounds = (x_min, x_max), None, (min(z_top, z_bottom), max(z_top, z_bottom))
+        else:
+            if len(region) != 6 or region[0] > region[1] or region[2] > region[3] or region[4] > region[5]:
+                raise ValueError(f"Region must be (x_min, x_max, y_min, y_max, z_min, z_max), got {region}")
+            self._x_bounds, self._y_bounds, self._z_bounds = tuple(region[0:2]), tuple(region[2:4]), tuple(region[4:6])
+
+        # Uniform prior over the slope rectangle or the region
+        count = int(particles)
+        self.x = self.rng.uniform(self._x_bounds[0], self._x_bounds[1], count)
+        self.z = self.rng.uniform(self._z_bounds[0], self._z_bounds[1], count)
+        self._y = None if self._y_bounds is None else self.rng.uniform(self._y_bounds[0], self._y_bounds[1], count)
+        self.log_weights = np.full(count, -np.log(count))
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    @property
+    def y(self) -> np.ndarray:
+        if self._y is not None:
+            return self._y
+        return self.slope.surface_height(self.x, self.z) - self.depth
+
+    @property
+    def weights(self) -> np.ndarray:
+        """Normalized particle weights."""
+        weights = np.exp(self.log_weights - self.log_weights.max())
+        return weights / weights.sum()
+
+    @property
+    def effective_sample_size(self) -> float:
+        weights = self.weights
+        return float(1.0 / np.dot(weights, weights))
+
+    def estimate(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Weighted mean of the particles and its covariance.
+        :return: Tuple (mean, covariance) of shapes (3,) with x, y, z and (3, 3).
+        """
+        weights = self.weights
+        points = np.column_stack([self.x, self.y, self.z])
+        mean = weights @ points
+        centered = points - mean
+        return mean, (centered * weights[:, None]).T @ centered
+
+    def update(self, measurements: Sequence[Measurement]):
+        """
+        Weight the particles by a batch of Measurement objects, see update_arrays.
+        """
+        positions = np.array([[m.position.x, m.position.y, m.position.z] for m in measurements], dtype=float).reshape(-1, 3)
+        strength = np.array([m.signal_strength for m in measurements], dtype=float)
+        direction = np.array([m.signal_direction for m in measurements], dtype=float)
+        self.update_arrays(positions, strength, direction)
+
+    def update_arrays(self, positions: np.ndarray, signal_strength: np.ndarray, signal_direction: np.ndarray):
+        """
+        Weight the particles by a batch of measurements and resample if the weights degenerate.
+        :param positions: Receiver positions, shape (M, 3) with x, y, z.
+        :param signal_strength: M distances, NaN where not measured.
+        :param signal_direction: M bearings in radians, NaN where not measured.
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        signal_strength = np.asarray(signal_strength, dtype=float)
+        signal_direction = np.asarray(signal_direction, dtype=float)
+        y = self.y
+        chunk = max(1, _CHUNK_ELEMENTS // max(len(self), 1))
+        for start in range(0, len(positions), chunk):
+            stop = start + chunk
+            self.log_weights += self._log_likelihood(y, positions[start:stop], signal_strength[start:stop],
+                                                     signal_direction[start:stop])
+        self.log_weights -= self.log_weights.max()
+        if self.effective_sample_size < self.resample_threshold * len(self):
+            self.resample()
+
+    def _log_likelihood(self, y: np.ndarray, positions: np.ndarray, signal_strength: np.ndarray,
+                        signal_direction: np.ndarray) -> np.ndarray:
+        # (particles, measurements) offsets from each particle to each receiver position
+        dx = positions[None, :, 0] - self.x[:, None]
+        dy = positions[None, :, 1] - y[:, None]
+        log_likelihood = np.zeros(len(self))
+        if self.bearing_std is not None:
+            measured = ~np.isnan(signal_direction)
+            if measured.any():
+                error = signal_direction[measured][None, :] - np.arctan2(dy[:, measured], dx[:, measured])
+                error = (error + np.pi) % (2 * np.pi) - np.pi
+                log_likelihood -= np.einsum("ij,ij->i", error, error) / (2 * self.bearing_std ** 2)
+        if self.distance_std is not None:
+            measured = ~np.isnan(signal_strength)
+            if measured.any():
+                dz = positions[None, measured, 2] - self.z[:, None]
+                distance = np.sqrt(dx[:, measured] ** 2 + dy[:, measured] ** 2 + dz ** 2)
+                error = distance - signal_strength[measured][None, :]
+                log_likelihood -= np.einsum("ij,ij->i", error, error) / (2 * self.distance_std ** 2)
+        return log_likelihood
+
+    def resample(self):
+        """
+        Systematic resampling: one uniform offset and N evenly spaced pointers into the cumulative
+        weights, which is O(N) and has lower variance than drawing N independent samples.
+        Resampled particles are roughened and kept on the slope rectangle or in the region.
+        """
+        count = len(self)
+        cumulative = np.cumsum(self.weights)
+        cumulative[-1] = 1.0
+        pointers = (self.rng.random() + np.arange(count)) / count
+        index = np.searchsorted(cumulative, pointers)
+        x, z = self.x[index], self.z[index]
+        y = None if self._y is None else self._y[index]
+
+        if self.roughening > 0:
+            scale = self.roughening * count ** -0.5
+            x += self.rng.normal(0.0, scale * max(np.ptp(x), 1e-6), count)
+            z += self.rng.normal(0.0, scale * max(np.ptp(z), 1e-6), count)
+            np.clip(x, self._x_bounds[0], self._x_bounds[1], out=x)
+            np.clip(z, self._z_bounds[0], self._z_bounds[1], out=z)
+            if y is not None:
+                y += self.rng.normal(0.0, scale * max(np.ptp(y), 1e-6), count)
+                np.clip(y, self._y_bounds[0], self._y_bounds[1], out=y)
+
+        self.x, self._y, self.z = x, y, z
+        self.log_weights = np.full(count, -np.log(count))
+        self.resamples += 1
@@ -0,0 +1,262 @@
+"""
+Validation of a whole planned path against the ground before it is flown.
+
+Every segment of the path is checked in one vectorized pass. Over a planar Slope the clearance
+along a segment is linear, so its clipped ends are exact. Over a TerrainSlope short segments are
+sampled whole, and longer ones are pruned with a bounding-volume hierarchy of the terrain,
+TerrainBVH, a pyramid of the highest ground above the slope's fitted plane over blocks of grid
+cells: a segment is only sampled inside the leaf blocks whose highest cell it does not clear.
+Segments are sampled at half the cell size.
+"""
+import weakref
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from metrics import timed
+from position import Position
+from preDefPath import PreDefPath
+from slope import Slope
+
+
+class PathValidation:
+    """Result of validate_path."""
+    def __init__(self, valid: bool, first_violation: Optional[int], violation_point: Optional[Tuple[float, float, float]],
+                 segment_clearance: np.ndarray, samples: int, required_clearance: float):
+        """
+        :param valid: No point of the path is closer to the ground than required_clearance.
+        :param first_violation: Index of the first violating segment, None if valid. Segment i
+            ends at waypoint i, and starts at the start position for i = 0.
+        :param violation_point: First point (x, y, z) of that segment found below the required clearance.
+        :param segment_clearance: Lowest clearance found on every segment, NaN for segments
+            that never pass over the ground.
+        :param samples: Number of ground heights looked up.
+        """
+        self.valid = valid
+        self.first_violation = first_violation
+        self.violation_point = violation_point
+        self.segment_clearance = segment_clearance
+        self.samples = samples
+        self.required_clearance = required_clearance
+
+    @property
+    def min_clearance(self) -> float:
+        return float(np.nanmin(self.segment_clearance)) if np.isfinite(self.segment_clearance).any() else float("nan")
+
+    @property
+    def mean_clearance(self) -> float:
+        """Mean over the segments of their lowest clearance."""
+        return float(np.nanmean(self.segment_clearance)) if np.isfinite(self.segment_clearance).any() else float("nan")
+
+    def to_dict(self) -> dict:
+        return {
+            "valid": self.valid,
+            "first_violation": self.first_violation,
+            "violation_point": self.violation_point,
+            "min_clearance": self.min_clearance,
+            "mean_clearance": self.mean_clearance,
+            "segments": len(self.segment_clearance),
+            "samples": self.samples,
+            "required_clearance": self.required_clearance,
+        }
+
+
+def _clip_to_box(origins: np.ndarray, deltas: np.ndarray, box_min: np.ndarray, box_max: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Parameter interval [t_in, t_out] of every segment origin + t * delta, t in [0, 1], inside its
+    axis-aligned box (slab method), in the horizontal x, z plane. Empty where t_in > t_out.
+    :param origins: Segment starts, shape (N, 2) with x, z.
+    :param deltas: Segment vectors, shape (N, 2).
+    :param box_min: Box corners, shape (N, 2).
+    :param box_max: Box corners, shape (N, 2).
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t0 = (box_min - origins) / deltas
+        t1 = (box_max - origins) / deltas
+    still = deltas == 0
+    inside = (origins >= box_min) & (origins <= box_max)
+    low = np.where(still, np.where(inside, -np.inf, np.inf), np.minimum(t0, t1))
+    high = np.where(still, np.where(inside, np.inf, -np.inf), np.maximum(t0, t1))
+    return np.maximum(low.max(axis=1), 0.0), np.minimum(high.min(axis=1), 1.0)
+
+
+class TerrainBVH:
+    """
+    Bounding-volume hierarchy of a TerrainSlope: the highest ground of square blocks of
+    leaf_cells x leaf_cells grid cells, and of 2 x 2 blocks of those up to a single root.
+
+    Heights are stored above the plane of the slope's fitted angle, through z = origin_z, so the
+    bounds of an inclined DEM are as tight as those of a level one. Height above the plane is
+    linear along a segment like y, so a segment still clears a block if both its clipped ends do.
+
+    Building it reads the DEM once, one band of leaf_cells rows at a time, so it never holds
+    more than one band in memory. The pyramid itself is small, leaf_cells^2 times smaller than the DEM.
+    """
+    def __init__(self, slope, leaf_cells: int = 16):
+        self.slope = slope
+        self.leaf_cells = leaf_cells
+        grid = slope.grid
+        rows, cols = grid.shape
+        # Ground rises towards -z, see TerrainSlope
+        self.gradient = -np.tan(np.radians(slope.angle))
+        # A block covers the cells between its grid lines, so it shares its last row and column with the next one
+        block_rows, block_cols = -(-(rows - 1) // leaf_cells), -(-(cols - 1) // leaf_cells)
+        leaves = np.full((block_rows, block_cols), -np.inf)
+        col_index = np.arange(cols)
+        col_block = np.minimum(col_index // leaf_cells, block_cols - 1)
+        edge = col_index[leaf_cells::leaf_cells]
+        for block_row in range(block_rows):
+            first = block_row * leaf_cells
+            band_rows = np.arange(first, min(first + leaf_cells + 1, rows))
+            band = grid.gather(band_rows[:, None], col_index[None, :]) - (self.gradient * slope.cell_size * band_rows)[:, None]
+            band = np.where(np.isnan(band), -np.inf, band).max(axis=0)
+            np.maximum.at(leaves[block_row], col_block, band)
+            # Cells on a block edge belong to the block left of it too
+            np.maximum.at(leaves[block_row], edge // leaf_cells - 1, band[edge])
+        self.levels = [leaves]
+        while self.levels[-1].shape != (1, 1):
+            level = self.levels[-1]
+            padded = np.full((-(-level.shape[0] // 2) * 2, -(-level.shape[1] // 2) * 2), -np.inf)
+            padded[:level.shape[0], :level.shape[1]] = level
+            self.levels.append(padded.reshape(padded.shape[0] // 2, 2, padded.shape[1] // 2, 2).max(axis=(1, 3)))
+
+    def candidates(self, origins: np.ndarray, deltas: np.ndarray, clearance: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Stretches of segments that may come within clearance of the ground.
+        :param origins: Segment starts, shape (N, 3) with x, y, z.
+        :param deltas: Segment vectors, shape (N, 3).
+        :return: Tuple (segments, t_in, t_out), one entry per segment and leaf block it is not
+            clear of, with the parameter interval of the segment inside that block.
+        """
+        x0, z0 = self.slope.origin
+        flat_origins, flat_deltas = origins[:, [0, 2]], deltas[:, [0, 2]]
+        # Height of the segments above the plane
+        heights = origins[:, 1] - self.gradient * (origins[:, 2] - z0)
+        rises = deltas[:, 1] - self.gradient * deltas[:, 2]
+        # A segment enters the tree at the lowest level whose nodes are at least as large as it, where
+        # it overlaps at most 2 x 2 nodes, instead of descending from the root
+        leaf_size = self.leaf_cells * self.slope.cell_size
+        corner = np.minimum(flat_origins, flat_origins + flat_deltas) - (x0, z0)
+        extent = np.abs(flat_deltas).max(axis=1)
+        with np.errstate(divide="ignore"):
+            entry = np.clip(np.ceil(np.log2(extent / leaf_size)), 0, len(self.levels) - 1).astype(np.int64)
+
+        segments = np.zeros(0, dtype=np.int64)
+        node_rows = np.zeros(0, dtype=np.int64)
+        node_cols = np.zeros(0, dtype=np.int64)
+        for depth in range(len(self.levels) - 1, -1, -1):
+            level = self.levels[depth]
+            size = leaf_size * 2 ** depth
+            # Expand every surviving node into its 2 x 2 children, and add the segments entering here
+            entering = np.flatnonzero(entry == depth)
+            if depth == len(self.levels) - 1:
+                segments = entering
+                node_rows = np.zeros(len(entering), dtype=np.int64)
+                node_cols = np.zeros(len(entering), dtype=np.int64)
+            else:
+                first_nodes = np.floor(corner[entering] / size).astype(np.int64)
+                segments = np.concatenate([np.repeat(segments, 4), np.repeat(entering, 4)])
+                node_rows = np.concatenate([np.repeat(node_rows * 2, 4), np.repeat(first_nodes[:, 1], 4)])
+                node_cols = np.concatenate([np.repeat(node_cols * 2, 4), np.repeat(first_nodes[:, 0], 4)])
+                node_rows += np.tile([0, 0, 1, 1], len(segments) // 4)
+                node_cols += np.tile([0, 1, 0, 1], len(segments) // 4)
+                exists = (node_rows >= 0) & (node_rows < level.shape[0]) & (node_cols >= 0) & (node_cols < level.shape[1])
+                segments, node_rows, node_cols = segments[exists], node_rows[exists], node_cols[exists]
+            box_min = np.column_stack([x0 + node_cols * size, z0 + node_rows * size])
+            t_in, t_out = _clip_to_box(flat_origins[segments], flat_deltas[segments], box_min, box_min + size)
+            # The segment is straight, so its lowest point in the box is one of the clipped ends
+            lowest = heights[segments] + rises[segments] * np.where(rises[segments] > 0, t_in, t_out)
+            keep = (t_in <= t_out) & (lowest < level[node_rows, node_cols] + clearance)
+            segments, node_rows, node_cols = segments[keep], node_rows[keep], node_cols[keep]
+        return segments, t_in[keep], t_out[keep]
+
+
+# TerrainBVH per TerrainSlope, built on first validation
+_bvh_cache = weakref.WeakKeyDictionary()
+
+
+def terrain_bvh(slope, leaf_cells: int = 16) -> TerrainBVH:
+    """The cached TerrainBVH of a TerrainSlope."""
+    bvh = _bvh_cache.get(slope)
+    if bvh is None or bvh.leaf_cells != leaf_cells:
+        with timed(phase="bvh_build"):
+            bvh = _bvh_cache[slope] = TerrainBVH(slope, leaf_cells)
+    return bvh
+
+
+def _waypoint_array(path: Union[PreDefPath, Sequence[Position], np.ndarray], start: Optional[Position]) -> np.ndarray:
+    if isinstance(path, PreDefPath):
+        path = path.path[path.currentStep:]
+    if isinstance(path, np.ndarray):
+        points = np.asarray(path, dtype=float)[:, :3]
+    else:
+        points = np.array([[p.x, p.y, p.z] for p in path], dtype=float).reshape(-1, 3)
+    if start is not None:
+        points = np.vstack([[start.x, start.y, start.z], points])
+    return points
+
+
+def validate_path(slope: Slope, path: Union[PreDefPath, Sequence[Position], np.ndarray], start: Optional[Position] = None,
+                  clearance: float = 0.0, leaf_cells: int = 16) -> PathValidation:
+    """
+    Check every segment of a planned path against the ground of the slope, before flying it.
+    Like Slope.is_above_batch, points outside the slope's footprint are not checked.
+    :param slope: A Slope or TerrainSlope.
+    :param path: The remaining waypoints of a PreDefPath, a list of Positions, or an array whose
+        first three columns are x, y, z.
+    :param start: Position the path is flown from, adding a first segment to the first waypoint.
+    :param clearance: Minimum height above the ground.
+    :param leaf_cells: Grid cells per side of a TerrainBVH leaf block.
+    :return: PathValidation with the first violating segment and the clearance of every segment.
+    """
+    points = _waypoint_array(path, start)
+    if len(points) < 2:
+        return PathValidation(bool(slope.is_above_batch(points, clearance).all()), None, None,
+                              np.full(0, np.nan), 0, clearance)
+    origins, deltas = points[:-1], np.diff(points, axis=0)
+    x_min, x_max, z_top, z_bottom = slope.footprint()
+    footprint_min = np.array([x_min, min(z_top, z_bottom)])
+    footprint_max = np.array([x_max, max(z_top, z_bottom)])
+
+    with timed(phase="path_validation"):
+        # Stretch of every segment over the footprint
+        inside_in, inside_out = _clip_to_box(origins[:, [0, 2]], deltas[:, [0, 2]],
+                                             np.broadcast_to(footprint_min, (len(origins), 2)),
+                                             np.broadcast_to(footprint_max, (len(origins), 2)))
+        over = np.flatnonzero(inside_in <= inside_out)
+        if hasattr(slope, "grid"):
+            # Segments covered by a few samples are sampled whole, that is cheaper than walking the BVH
+            lengths = np.linalg.norm(deltas[over][:, [0, 2]], axis=1) * (inside_out - inside_in)[over]
+            short = lengths <= leaf_cells * slope.cell_size / 2
+            pruned = over[~short]
+            candidates, t_in, t_out = terrain_bvh(slope, leaf_cells).candidates(origins[pruned], deltas[pruned], clearance)
+            candidates = np.concatenate([over[short], pruned[candidates]])
+            t_in = np.maximum(np.concatenate([inside_in[over[short]], t_in]), inside_in[candidates])
+            t_out = np.minimum(np.concatenate([inside_out[over[short]], t_out]), inside_out[candidates])
+            # Sample the stretches no farther apart than half a cell, ends included
+            lengths = np.linalg.norm(deltas[candidates][:, [0, 2]], axis=1) * np.maximum(t_out - t_in, 0.0)
+            counts = np.where(t_in <= t_out, np.ceil(lengths / (slope.cell_size / 2)).astype(np.int64) + 1, 0)
+            owner = np.repeat(np.arange(len(candidates)), counts)
+            step = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            # The clipped ends of the pruned segments are looked up too, for the clearance statistics
+            segments = np.concatenate([pruned, pruned, candidates[owner]])
+            t = np.concatenate([inside_in[pruned], inside_out[pruned],
+                                t_in[owner] + (t_out - t_in)[owner] * step / np.maximum(counts[owner] - 1, 1)])
+        else:
+            # The planar ground is linear along a segment, so its clipped ends are enough
+            segments = np.concatenate([over, over])
+            t = np.concatenate([inside_in[over], inside_out[over]])
+
+        samples = origins[segments] + deltas[segments] * t[:, None]
+        heights = slope.clearance(samples)
+
+    segment_clearance = np.full(len(origins), np.nan)
+    measured = ~np.isnan(heights)
+    np.fmin.at(segment_clearance, segments[measured], heights[measured])
+
+    violating = np.flatnonzero(measured & (heights < clearance))
+    if not len(violating):
+        return PathValidation(True, None, None, segment_clearance, len(samples), clearance)
+    # First violation in flight order: lowest segment, then lowest t on it
+    first = violating[np.lexsort((t[violating], segments[violating]))[0]]
+    return PathValidation(False, int(segments[first]), tuple(samples[first].tolist()), segment_clearance, len(samples), clearance)
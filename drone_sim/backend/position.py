@@ -1,5 +1,7 @@
 class Position:
     """A class to represent a physical position and rotation in space."""
+    __slots__ = ("x", "y", "z", "pitch", "yaw", "roll")
+
     def __init__(self, x: float, y: float, z: float, pitch: float, yaw: float, roll: float):
         self.x = x
         self.y = y
@@ -38,6 +40,8 @@ class Position:
     
 
 class Measurement:
+    __slots__ = ("position", "signal_strength", "signal_direction", "timestamp")
+
     def __init__(self, position: Position, signal_strength: float, signal_direction: float, timestamp: float):
         self.position = position
         self.signal_strength = signal_strength
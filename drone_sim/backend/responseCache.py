@@ -0,0 +1,122 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class CachedResponse:
+    """
+    A serialized response body with the headers needed to replay it.
+    """
+    __slots__ = ("body", "mimetype", "headers", "etag", "simulation_id", "version")
+
+    def __init__(self, body: bytes, mimetype: str, headers: dict, simulation_id: Optional[int] = None,
+                 version: Optional[int] = None):
+        """
+        :param version: Version of the data the body was computed from, e.g. db.database_version().
+        """
+        self.body = body
+        self.mimetype = mimetype
+        self.headers = headers
+        # Strong ETag: the body is served byte for byte, so a digest of it identifies the representation
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.simulation_id = simulation_id
+        self.version = version
+
+
+class ResponseCache:
+    """
+    In-process LRU cache of serialized API responses, bounded by entry count and total body bytes.
+
+    Entries belong to one simulation, or to none for listings. Invalidating a simulation drops its
+    own entries and every listing. A response computed while an invalidation ran is not stored,
+    so a read racing a write can never leave stale data in the cache. Writes that never call
+    invalidate, e.g. from another process, are caught by the data version: an entry stored with
+    one version is not served when a lookup passes another.
+    """
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        """
+        :param max_entries: Maximum number of cached responses.
+        :param max_bytes: Maximum total size of the cached bodies. Larger bodies are never cached.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self) -> int:
+        """Counter bumped by every invalidation, pass it to put to detect a racing write."""
+        return self._generation
+
+    def get(self, key: Hashable, version: Optional[int] = None) -> Optional[CachedResponse]:
+        """
+        The cached response, None if there is none.
+        :param version: Current version of the data, entries stored with another one are dropped.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version != version:
+                self._bytes -= len(self._entries.pop(key).body)
+                self.invalidations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, entry: CachedResponse, generation: Optional[int] = None) -> CachedResponse:
+        """
+        Store a response, evicting the least recently used ones to stay within the bounds.
+        :param generation: Value of `generation` read before the response was computed. If an
+            invalidation happened since, the entry is returned without being stored.
+        :return: The entry.
+        """
+        size = len(entry.body)
+        with self._lock:
+            if size > self.max_bytes or (generation is not None and generation != self._generation):
+                return entry
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous.body)
+            self._entries[key] = entry
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+                self.evictions += 1
+        return entry
+
+    def invalidate(self, simulation_id: Optional[int] = None):
+        """
+        Drop the responses of a simulation and all listings, or everything without a simulation ID.
+        """
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            for key in [key for key, entry in self._entries.items()
+                        if simulation_id is None or entry.simulation_id in (None, simulation_id)]:
+                self._bytes -= len(self._entries.pop(key).body)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
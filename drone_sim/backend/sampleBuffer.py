@@ -0,0 +1,151 @@
+import numpy as np
+from collections.abc import Sequence
+from position import Measurement, Position
+
+# Column layout of SampleBuffer.array
+COLUMNS = ("t", "x", "y", "z", "pitch", "yaw", "roll", "signal_strength", "signal_direction")
+T, X, Y, Z, PITCH, YAW, ROLL, SIGNAL_STRENGTH, SIGNAL_DIRECTION = range(len(COLUMNS))
+
+
+class SampleBuffer:
+    """
+    Growable columnar store for the samples of a flight: one row of COLUMNS per pose.
+
+    Rows live in one preallocated float64 array that doubles its capacity when full, so appending
+    is amortized O(1) and a sample costs 72 bytes instead of a Position object per pose. A pose
+    without a measurement has NaN in the signal columns. The index of the beacon in the slope's
+    transmitter list that every measurement was read from is kept alongside in beacon_ids, -1
+    for rows without a measurement.
+    """
+    def __init__(self, capacity: int = 1024):
+        self._data = np.empty((max(capacity, 1), len(COLUMNS)))
+        self._beacons = np.empty(max(capacity, 1), dtype=np.int64)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def array(self) -> np.ndarray:
+        """View (no copy) of the filled rows, shape (len, len(COLUMNS))."""
+        return self._data[:self._size]
+
+    @property
+    def beacon_ids(self) -> np.ndarray:
+        """View (no copy) of the beacon index of every filled row, -1 where nothing was measured."""
+        return self._beacons[:self._size]
+
+    def column(self, name: str) -> np.ndarray:
+        """View (no copy) of one column of the filled rows."""
+        return self._data[:self._size, COLUMNS.index(name)]
+
+    def _reserve(self, size: int):
+        if size > self._data.shape[0]:
+            capacity = self._data.shape[0]
+            while capacity < size:
+                capacity *= 2
+            data = np.empty((capacity, len(COLUMNS)))
+            data[:self._size] = self._data[:self._size]
+            self._data = data
+            beacons = np.empty(capacity, dtype=np.int64)
+            beacons[:self._size] = self._beacons[:self._size]
+            self._beacons = beacons
+
+    def append(self, t: float, position: Position, signal_strength: float = np.nan, signal_direction: float = np.nan,
+               beacon_id: int = -1):
+        """
+        Append one pose, optionally with its measurement.
+        """
+        self._reserve(self._size + 1)
+        self._data[self._size] = (t, position.x, position.y, position.z, position.pitch, position.yaw, position.roll,
+                                  signal_strength, signal_direction)
+        self._beacons[self._size] = beacon_id
+        self._size += 1
+
+    def extend(self, poses: np.ndarray, signal_strength: np.ndarray = None, signal_direction: np.ndarray = None,
+               beacon_ids: np.ndarray = None):
+        """
+        Append many poses at once.
+        :param poses: Array of shape (N, 7) with columns t, x, y, z, pitch, yaw, roll.
+        :param signal_strength: Optional array of N signal strengths, NaN where nothing was measured.
+        :param signal_direction: Optional array of N signal directions, NaN where nothing was measured.
+        :param beacon_ids: Optional array of N beacon indices, -1 where nothing was measured. Defaults
+            to beacon 0 for every row with a signal strength.
+        """
+        n = len(poses)
+        self._reserve(self._size + n)
+        rows = self._data[self._size:self._size + n]
+        rows[:, :SIGNAL_STRENGTH] = poses
+        rows[:, SIGNAL_STRENGTH] = np.nan if signal_strength is None else signal_strength
+        rows[:, SIGNAL_DIRECTION] = np.nan if signal_direction is None else signal_direction
+        if beacon_ids is None:
+            # Measurements without a beacon index come from the first (or only) beacon
+            beacon_ids = -1 if signal_strength is None else np.where(np.isnan(rows[:, SIGNAL_STRENGTH]), -1, 0)
+        self._beacons[self._size:self._size + n] = beacon_ids
+        self._size += n
+
+    def set_signal(self, signal_strength: float, signal_direction: float, index: int = -1, beacon_id: int = 0):
+        """
+        Attach a measurement to an already appended pose, the last one by default.
+        """
+        row = self._data[:self._size][index]
+        row[SIGNAL_STRENGTH] = signal_strength
+        row[SIGNAL_DIRECTION] = signal_direction
+        self._beacons[:self._size][index] = beacon_id
+
+    def measured(self) -> np.ndarray:
+        """Indices of the rows that carry a measurement."""
+        return np.flatnonzero(~np.isnan(self._data[:self._size, SIGNAL_STRENGTH]))
+
+    def position(self, index: int) -> Position:
+        """Build a Position from one row."""
+        return Position(*self._data[:self._size][index, X:SIGNAL_STRENGTH].tolist())
+
+    def timestamp(self, index: int) -> float:
+        return float(self._data[:self._size][index, T])
+
+
+class PositionHistView(Sequence):
+    """
+    Read-only list of (Position, timestamp) tuples backed by a SampleBuffer.
+    Position objects are only built for the rows that are accessed.
+    """
+    def __init__(self, buffer: SampleBuffer):
+        self._buffer = buffer
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        row = self._buffer.array[index].tolist()
+        return (Position(*row[X:SIGNAL_STRENGTH]), row[T])
+
+    def __iter__(self):
+        for row in self._buffer.array.tolist():
+            yield (Position(*row[X:SIGNAL_STRENGTH]), row[T])
+
+
+class MeasurementView(Sequence):
+    """
+    Read-only list of Measurement objects for the rows of a SampleBuffer that carry a measurement.
+    """
+    def __init__(self, buffer: SampleBuffer):
+        self._buffer = buffer
+        self._rows = buffer.measured()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _measurement(self, row) -> Measurement:
+        return Measurement(Position(*row[X:SIGNAL_STRENGTH]), row[SIGNAL_STRENGTH], row[SIGNAL_DIRECTION], timestamp=row[T])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self._measurement(self._buffer.array[self._rows[index]].tolist())
+
+    def __iter__(self):
+        for row in self._buffer.array[self._rows].tolist():
+            yield self._measurement(row)
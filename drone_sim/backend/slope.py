@@ -1,23 +1,71 @@
 import numpy as np
 
+from beaconIndex import BeaconIndex
 from position import Position
 from transmittAntenna import TransmittAntenna
+from typing import List, Optional, Sequence, Tuple, Union
+
+# z of the slope's center line, see Slope.z_bounds. The center of the slope surface is the origin,
+# where main.py and sweep.DEFAULTS bury the transmitter and AvalancheBeacon.tsx draws it
+CENTER_Z = 0.0
 
 class Slope:
-    def __init__(self, width: float, height: float, angle: float, transmittAntenna: TransmittAntenna):
+    def __init__(self, width: float, height: float, angle: float,
+                 transmittAntenna: Union[TransmittAntenna, Sequence[TransmittAntenna], None]):
         """
         Represents a slope with given width, height, and angle of inclination.
         The slope is centered at the origin and inclined along the X-Z plane.
+        :param transmittAntenna: The buried transmitter, or a sequence of several.
         """
         self.width = width
         self.height = height
         self.angle = angle  # Degrees
         self.normal_vector = self._calculate_normal()
-        self._transmittAntenna = transmittAntenna
+        if transmittAntenna is None:
+            self._transmittAntennas = []
+        elif isinstance(transmittAntenna, TransmittAntenna):
+            self._transmittAntennas = [transmittAntenna]
+        else:
+            self._transmittAntennas = list(transmittAntenna)
+        self._beacons = None
+
+    @property
+    def transmittAntenna(self) -> Optional[TransmittAntenna]:
+        """The first transmitter."""
+        return self._transmittAntennas[0] if self._transmittAntennas else None
+
+    @property
+    def transmittAntennas(self) -> List[TransmittAntenna]:
+        return list(self._transmittAntennas)
 
     @property
-    def transmittAntenna(self) -> TransmittAntenna:
-        return self._transmittAntenna
+    def beacons(self) -> BeaconIndex:
+        """Spatial index over the transmitters, built on first use."""
+        if self._beacons is None:
+            self._beacons = BeaconIndex(self._transmittAntennas)
+        return self._beacons
+
+    def addTransmittAntenna(self, transmittAntenna: TransmittAntenna) -> int:
+        """Bury one more transmitter. Returns its beacon index."""
+        self._transmittAntennas.append(transmittAntenna)
+        self._beacons = None
+        return len(self._transmittAntennas) - 1
+
+    def signal_range(self, antenna_range: float) -> Optional[float]:
+        """
+        Range within which a receiver reads the transmitters. A single transmitter is read
+        everywhere, as it always has been; with several, a sample only considers the ones within
+        antenna_range and reads the nearest of them.
+        """
+        return antenna_range if len(self._transmittAntennas) > 1 else None
+
+    def read_signal(self, position: Position, antenna_range: float) -> Tuple[Optional[float], Optional[float], int]:
+        """Signal strength, direction and beacon index at one position, see BeaconIndex.read_signal."""
+        return self.beacons.read_signal(position, self.signal_range(antenna_range))
+
+    def read_signal_batch(self, positions: np.ndarray, antenna_range: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Signal strength, direction and beacon index at many positions, see BeaconIndex.read_signal_batch."""
+        return self.beacons.read_signal_batch(positions, self.signal_range(antenna_range))
 
     def _calculate_normal(self):
         """Calculate the normal vector of the inclined plane."""
@@ -25,19 +73,66 @@ class Slope:
         # Normal vector for a plane inclined in X-Z (no tilt in Y axis)
         return np.array([np.sin(radians), 0, np.cos(radians)])
 
-    def is_above(self, position: Position) -> bool:
+    def z_bounds(self) -> Tuple[float, float]:
+        """
+        Horizontal extent of the slope along z, (upper edge, lower edge). The incline runs along z
+        with the ground rising towards -z, as the rotated plane in Slope.tsx: the horizontal run
+        height * cos(angle) is centered on z = CENTER_Z, and x spans -width/2 to width/2.
+        """
+        run = self.height * np.cos(np.radians(self.angle))
+        return CENTER_Z - run / 2, CENTER_Z + run / 2
+
+    def ground_height(self, z):
+        """
+        Height y of the slope surface at z (scalar or array), 0 on the center line z = CENTER_Z.
         """
-        Check if a point is above the slope.
-        :param position: (x, y, z) tuple representing the point's position.
-        :return: True if the point is above the slope, False otherwise.
+        return (CENTER_Z - np.asarray(z, dtype=float)) * np.tan(np.radians(self.angle))
+
+    def surface_height(self, x, z) -> np.ndarray:
+        """
+        Height y of the ground at (x, z), arrays broadcast. The planar slope does not vary along x.
+        """
+        x, z = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(z, dtype=float))
+        return self.ground_height(z)
+
+    def footprint(self) -> Tuple[float, float, float, float]:
+        """Horizontal extent of the slope, (x_min, x_max, z_top, z_bottom)."""
+        return (-self.width / 2, self.width / 2) + tuple(self.z_bounds())
+
+    @property
+    def terrain_spacing(self) -> Optional[float]:
+        """
+        Longest leg of a path that follows the ground at a constant altitude. None for the planar
+        slope, where straight legs already keep their altitude.
+        """
+        return None
+
+    def clearance(self, positions: np.ndarray) -> np.ndarray:
+        """
+        Height above the ground of many positions, negative below it and NaN where there is no ground.
+        :param positions: Array of shape (N, 3+) whose first three columns are x, y, z.
+        """
+        positions = np.atleast_2d(np.asarray(positions, dtype=float))
+        return positions[:, 1] - self.surface_height(positions[:, 0], positions[:, 2])
+
+    def is_above_batch(self, positions: np.ndarray, clearance: float = 0.0) -> np.ndarray:
         """
-        x= position.x
-        y= position.y
-        z= position.z
+        Check many positions against the ground in one pass. Positions outside the footprint, or
+        where there is no ground, are not invalid and count as above.
+        :param positions: Array of shape (N, 3+) whose first three columns are x, y, z.
+        :param clearance: Minimum height above the ground.
+        :return: Boolean array of shape (N,).
+        """
+        positions = np.atleast_2d(np.asarray(positions, dtype=float))
+        x_min, x_max, z_top, z_bottom = self.footprint()
+        inside = ((positions[:, 0] >= x_min) & (positions[:, 0] <= x_max)
+                  & (positions[:, 2] >= min(z_top, z_bottom)) & (positions[:, 2] <= max(z_top, z_bottom)))
+        return ~(inside & (self.clearance(positions) < clearance))
 
-        if abs(x) > self.width / 2 or abs(z) > self.height / 2:
-            return False  # Outside slope bounds, but not invalid
-        # Check height relative to the slope plane
-        slope_y = (x * np.tan(np.radians(self.angle)))
-        return y >= slope_y
-    
+    def is_above(self, position: Position) -> bool:
+        """
+        Check if a point is above the slope, see is_above_batch for arrays of positions.
+        :param position: Position of the point.
+        :return: True if the point is above the slope or outside it, False otherwise.
+        """
+        return bool(self.is_above_batch(np.array([[position.x, position.y, position.z]]))[0])
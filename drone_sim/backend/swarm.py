@@ -0,0 +1,198 @@
+"""
+Several drones searching one slope together.
+
+    python ./swarm.py --drones 8
+    python ./swarm.py --drones 100 --time-step 0.05 --description "Swarm of 100"
+"""
+import argparse
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+from coveragePath import boustrophedon_waypoints
+from position import Position
+from preDefPath import PreDefPath
+from sampleBuffer import COLUMNS, SIGNAL_DIRECTION, SIGNAL_STRENGTH
+from slope import Slope
+from trajectory import compute_swarm_trajectory
+
+
+class Swarm:
+    """
+    N drones flown together, each along its own PreDefPath.
+
+    The state of the swarm is one [N, 6] pose array per time step, computed for all drones in one
+    vectorized pass by trajectory.compute_swarm_trajectory, and the signal at every new pose is
+    read with one read_signal_batch call. Like the "vectorized" Drone mode, every pose carries a
+    measurement. The samples of all drones are kept as one array in the columns of
+    sampleBuffer.COLUMNS, with the drone of every row in drone_ids and the beacon it measured in beacon_ids.
+    """
+    def __init__(self, start_positions: Sequence[Position], speed_limit: float, rot_speed_limit: float, slope: Slope,
+                 antenna_range: int, paths: Optional[Sequence[PreDefPath]] = None):
+        """
+        :param start_positions: Start position of every drone.
+        :param speed_limit: Maximum speed of every drone (units per second).
+        :param rot_speed_limit: Maximum rotational speed of every drone (degrees per second).
+        :param slope: The slope searched.
+        :param antenna_range: Receiver range of every drone.
+        :param paths: Optional path of every drone, see addPath.
+        """
+        self.speed_limit = speed_limit
+        self.rot_speed_limit = rot_speed_limit
+        self.slope = slope
+        self.antenna_range = antenna_range
+        self._poses = np.array([p.getStep() for p in start_positions], dtype=float).reshape(-1, 6)
+        self._paths = [PreDefPath() for _ in range(len(self._poses))]
+        self._time = 0.0
+        self._chunks = [np.column_stack([np.zeros(len(self._poses)), self._poses,
+                                         np.full((len(self._poses), 2), np.nan)])]
+        self._chunk_ids = [np.arange(len(self._poses))]
+        self._chunk_beacons = [np.full(len(self._poses), -1, dtype=np.int64)]
+        if paths is not None:
+            for drone_id, path in enumerate(paths):
+                self.addPath(drone_id, path)
+
+    @classmethod
+    def partition(cls, slope: Slope, drones: int, speed_limit: float, rot_speed_limit: float, antenna_range: int,
+                  altitude: float = 10.0, overlap: float = 0.1, direction: str = "auto") -> "Swarm":
+        """
+        Split the slope into `drones` strips of equal width along x and give every drone a
+        boustrophedon coverage path of its own strip, see coveragePath. Each drone starts at the
+        first waypoint of its path. Over terrain the paths follow the ground of the whole slope.
+        """
+        width = slope.width / drones
+        x_min = slope.footprint()[0]
+        paths = []
+        for drone_id in range(drones):
+            strip = Slope(width=width, height=slope.height, angle=slope.angle, transmittAntenna=slope.transmittAntennas)
+            waypoints = boustrophedon_waypoints(strip, antenna_range, altitude, overlap, direction,
+                                                follow_spacing=slope.terrain_spacing)
+            waypoints[:, 0] += x_min + (drone_id + 0.5) * width
+            waypoints[:, 2] += slope.z_bounds()[0] - strip.z_bounds()[0]
+            waypoints[:, 1] = slope.surface_height(waypoints[:, 0], waypoints[:, 2]) + altitude
+            paths.append(PreDefPath([Position(x, y, z, 0, 0, 0) for x, y, z in waypoints.tolist()]))
+        return cls([path.path[0] for path in paths], speed_limit, rot_speed_limit, slope, antenna_range, paths)
+
+    def __len__(self) -> int:
+        return len(self._poses)
+
+    @property
+    def poses(self) -> np.ndarray:
+        """Current [N, 6] pose array, x, y, z, pitch, yaw, roll of every drone."""
+        return self._poses.copy()
+
+    @property
+    def positions(self) -> List[Position]:
+        return [Position(*pose) for pose in self._poses.tolist()]
+
+    @property
+    def paths(self) -> List[PreDefPath]:
+        return self._paths
+
+    @property
+    def samples(self) -> np.ndarray:
+        """Samples of all drones, shape (rows, len(COLUMNS)), in time order and by drone within a time step."""
+        self._merge()
+        return self._chunks[0]
+
+    @property
+    def drone_ids(self) -> np.ndarray:
+        """Drone of every row of samples."""
+        self._merge()
+        return self._chunk_ids[0]
+
+    @property
+    def beacon_ids(self) -> np.ndarray:
+        """Index of the slope transmitter measured in every row of samples, -1 for none."""
+        self._merge()
+        return self._chunk_beacons[0]
+
+    def drone_samples(self, drone_id: int) -> np.ndarray:
+        """Samples of one drone, as Drone.samples.array would hold them."""
+        return self.samples[self.drone_ids == drone_id]
+
+    def _merge(self):
+        if len(self._chunks) > 1:
+            self._chunks = [np.concatenate(self._chunks)]
+            self._chunk_ids = [np.concatenate(self._chunk_ids)]
+            self._chunk_beacons = [np.concatenate(self._chunk_beacons)]
+
+    def addPath(self, drone_id: int, path: PreDefPath):
+        self._paths[drone_id].addPath(path.path)
+
+    def isComplete(self) -> bool:
+        return all(path.isComplete() or path.getNext() is None for path in self._paths)
+
+    def followPaths(self, d_time: float = 0.1, progress: Optional[Callable[[int, int], Optional[bool]]] = None,
+                    progress_steps: int = 100) -> bool:
+        """
+        Fly every drone along the rest of its path.
+        :param d_time: Length of one time step.
+        :param progress: Optional progress(steps_done, total_steps) called every progress_steps
+            time steps. Returning False stops the flight, and followPaths returns False.
+        :param progress_steps: Time steps between progress calls.
+        """
+        remaining = [np.array([p.getStep() for p in path.path[path.currentStep:]], dtype=float).reshape(-1, 6)
+                     for path in self._paths]
+        trajectory, steps = compute_swarm_trajectory(self._poses, remaining, self.speed_limit, self.rot_speed_limit, d_time)
+        total = len(trajectory) - 1
+        chunk = total if progress is None else max(1, progress_steps)
+        for start in range(1, total + 1, chunk):
+            stop = min(start + chunk, total + 1)
+            self._record(trajectory[start:stop], start, steps, d_time)
+            if progress is not None and progress(stop - 1, total) is False:
+                return False
+
+        for path in self._paths:
+            while not path.isComplete() and path.getNext() is not None:
+                path.completeStep()
+        return True
+
+    def _record(self, poses: np.ndarray, first_step: int, steps: np.ndarray, d_time: float):
+        """Append the active drones of time steps first_step.. and move the swarm to the last of them."""
+        step_index = np.arange(first_step, first_step + len(poses))
+        active = step_index[:, None] <= steps[None, :]
+        rows_step, drone_ids = np.nonzero(active)
+        rows = np.empty((len(drone_ids), len(COLUMNS)))
+        rows[:, 0] = self._time + (rows_step + 1) * d_time
+        rows[:, 1:SIGNAL_STRENGTH] = poses[rows_step, drone_ids]
+        signal_strength, signal_direction, beacon_ids = self.slope.read_signal_batch(rows[:, 1:4], self.antenna_range)
+        rows[:, SIGNAL_STRENGTH] = signal_strength
+        rows[:, SIGNAL_DIRECTION] = signal_direction
+        self._chunks.append(rows)
+        self._chunk_ids.append(drone_ids)
+        self._chunk_beacons.append(beacon_ids)
+        self._poses = poses[-1].copy()
+        self._time += len(poses) * d_time
+
+
+def main():
+    from db import SimulationRecorder, add_slope, add_transmitt_antenna, create_simulation, initialize_database
+    from transmittAntenna import TransmittAntenna
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drones", type=int, default=8, help="Number of drones, each covering one strip of the slope.")
+    parser.add_argument("--time-step", type=float, default=0.05, help="Simulation time step.")
+    parser.add_argument("--altitude", type=float, default=10.0, help="Flight height above the slope.")
+    parser.add_argument("--description", default=None, help="Simulation description.")
+    args = parser.parse_args()
+
+    initialize_database()
+    transmittAntenna = TransmittAntenna(1, Position(0, 0, 0, 0, 0, 0), "Transmitter", "Omni", 10, 2.4, 5, 0, 360, "Vertical", "Pattern")
+    slope = Slope(width=100, height=200, angle=35, transmittAntenna=transmittAntenna)
+    swarm = Swarm.partition(slope, args.drones, speed_limit=10.0, rot_speed_limit=30.0, antenna_range=100, altitude=args.altitude)
+    start_positions = swarm.positions
+    swarm.followPaths(d_time=args.time_step)
+
+    antenna_id = add_transmitt_antenna(transmittAntenna)
+    slope_id = add_slope(slope, antenna_id)
+    simulation_id = create_simulation(args.description or f"Swarm of {args.drones}", slope_id, antenna_id)
+    with SimulationRecorder(simulation_id) as recorder:
+        recorder.log_samples_array(swarm.samples, drone_ids=swarm.drone_ids, beacon_ids=swarm.beacon_ids)
+        recorder.log_simulation_result(start_positions[0], transmittAntenna.position, swarm.positions[0], len(swarm.samples))
+    print(f"Stored simulation {simulation_id}: {args.drones} drones, {len(swarm.samples)} samples, "
+          f"flight time {swarm.samples[-1, 0]:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+Parameter sweeps and Monte Carlo runs of the drone search scenario.
+
+Scenarios run in a ProcessPoolExecutor across all cores. Workers only simulate; every result is
+sent back to the parent process, which is the single writer to the database, so workers never
+wait on SQLite locks.
+
+    python ./sweep.py --runs 1000
+    python ./sweep.py --runs 200 --workers 4 --store-paths
+"""
+import argparse
+import itertools
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from db import (
+    initialize_database,
+    create_simulation,
+    SimulationRecorder,
+    add_slope,
+    add_transmitt_antenna,
+    link_simulation_antennas,
+    log_sweep_run,
+)
+from coveragePath import strip_spacing
+from drone import Drone
+from position import Position
+from preDefPath import PreDefPath
+from slope import Slope
+from trajectory import trajectory_steps
+from transmittAntenna import SIGNAL_MODELS, TransmittAntenna
+
+# The main.py scenario. Every run starts from these and overrides the parameters it varies.
+DEFAULTS = {
+    "start_x": -40.0, "start_y": 10.0, "start_z": 170.0,
+    "slope_width": 100.0, "slope_height": 200.0, "slope_angle": 35.0,
+    "antenna_x": 0.0, "antenna_y": 0.0, "antenna_z": 0.0,
+    "antenna_pitch": 0.0, "antenna_yaw": 0.0, "antenna_roll": 0.0,
+    "signal_model": "distance",
+    # [x, y, z] of further transmitters buried on the slope, each read only within antenna_range
+    "extra_antennas": [],
+    "speed_limit": 10.0, "rot_speed_limit": 30.0, "antenna_range": 100,
+    "time_step": 0.05,
+    "path_spacing": 20.0, "path_end_z": 10.0, "leg_half_width": 40.0,
+    # "zigzag" for zigzag_path, "coverage" for the Drone.calculatePath planner at path_altitude
+    "path": "zigzag", "path_altitude": 10.0,
+    # Reject the scenario before flying when the path comes closer to the ground than this, None to fly any path
+    "min_clearance": None,
+}
+
+
+# Scenario parameters that must be above zero, on top of being finite like every number
+POSITIVE_PARAMETERS = ("speed_limit", "rot_speed_limit", "antenna_range", "time_step", "path_spacing",
+                       "slope_width", "slope_height")
+PATHS = ("zigzag", "coverage")
+
+
+def parameter_grid(**axes: Iterable) -> List[Dict]:
+    """
+    Every combination of the given parameter values, e.g. parameter_grid(slope_angle=[25, 35], time_step=[0.05, 0.1]).
+    """
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*(list(axes[name]) for name in names))]
+
+
+def random_sampler(runs: int, ranges: Dict[str, tuple], seed: Optional[int] = None) -> List[Dict]:
+    """
+    Draw `runs` scenarios with each parameter uniform in its (low, high) range.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {name: rng.uniform(low, high, runs).tolist() for name, (low, high) in ranges.items()}
+    return [{name: columns[name][i] for name in ranges} for i in range(runs)]
+
+
+def zigzag_path(params: Dict) -> PreDefPath:
+    """
+    Zigzag legs along x, stepping down the slope by path_spacing in z and following the
+    incline in y, like the hand-written path in main.py.
+    """
+    rise = np.tan(np.radians(params["slope_angle"]))
+    half = params["leg_half_width"]
+    z_levels = np.arange(params["start_z"], params["path_end_z"] - 1e-9, -params["path_spacing"])
+    positions = []
+    for i, z in enumerate(z_levels.tolist()):
+        y = params["start_y"] + (params["start_z"] - z) * rise
+        first, second = (-half, half) if i % 2 == 0 else (half, -half)
+        positions.append(Position(first, y, z, 0, 0, 0))
+        positions.append(Position(second, y, z, 0, 0, 0))
+    return PreDefPath(positions)
+
+
+def build_scenario(params: Dict):
+    """
+    Build the antenna, slope and drone of a scenario.
+    :return: Tuple (transmittAntenna, slope, drone). The slope holds transmittAntenna followed by the extra_antennas.
+    """
+    antenna_position = Position(params["antenna_x"], params["antenna_y"], params["antenna_z"],
+                                params["antenna_pitch"], params["antenna_yaw"], params["antenna_roll"])
+    transmittAntenna = TransmittAntenna(1, antenna_position, "Transmitter", "Omni", 10, 2.4, 5, 0, 360, "Vertical", "Pattern",
+                                        signal_model=params["signal_model"])
+    extra = [TransmittAntenna(i + 2, Position(x, y, z, 0, 0, 0), f"Transmitter {i + 2}", "Omni", 10, 2.4, 5, 0, 360,
+                              "Vertical", "Pattern", signal_model=params["signal_model"])
+             for i, (x, y, z) in enumerate(params["extra_antennas"])]
+    slope = Slope(width=params["slope_width"], height=params["slope_height"], angle=params["slope_angle"],
+                  transmittAntenna=[transmittAntenna] + extra)
+    drone = Drone(
+        start_position=Position(params["start_x"], params["start_y"], params["start_z"], 0, 0, 0),
+        speed_limit=params["speed_limit"],
+        rot_speed_limit=params["rot_speed_limit"],
+        slope=slope,
+        simulation_id=None,
+        antenna_range=params["antenna_range"],
+        trajectory_mode="vectorized",
+    )
+    if params["path"] == "coverage":
+        drone.calculatePath(altitude=params["path_altitude"])
+    else:
+        drone.addPath(zigzag_path(params))
+    return transmittAntenna, slope, drone
+
+
+def check_path(params: Dict, drone: Drone):
+    """
+    Validate the drone's path against min_clearance, see pathValidator.validate_path.
+    :raises ValueError: If the path comes closer to the ground than min_clearance.
+    """
+    if params["min_clearance"] is None:
+        return
+    validation = drone.validatePath(params["min_clearance"])
+    if not validation.valid:
+        raise ValueError(f"Path segment {validation.first_violation} comes within {params['min_clearance']} of the ground "
+                         f"at {validation.violation_point}, lowest clearance {validation.min_clearance:.2f}")
+
+
+def _number(name: str, value) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{name} must be a number, got {value!r}")
+    if not math.isfinite(value):
+        raise ValueError(f"{name} must be finite, got {value!r}")
+    return value
+
+
+def check_parameters(params: Dict):
+    """
+    Validate scenario parameters from outside, like the /api/simulate overrides, before building
+    the scenario. Every parameter must have the type of its DEFAULTS value, numbers must be
+    finite and POSITIVE_PARAMETERS above zero.
+    :raises ValueError: On an unknown parameter or a value of the wrong type or out of range.
+    """
+    unknown = sorted(set(params) - set(DEFAULTS))
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(unknown)}")
+    for name, value in params.items():
+        default = DEFAULTS[name]
+        if name == "min_clearance":
+            if value is not None:
+                _number(name, value)
+        elif name == "signal_model":
+            if value not in SIGNAL_MODELS:
+                raise ValueError(f"signal_model must be one of {', '.join(SIGNAL_MODELS)}, got {value!r}")
+        elif name == "path":
+            if value not in PATHS:
+                raise ValueError(f"path must be one of {', '.join(PATHS)}, got {value!r}")
+        elif isinstance(default, list):
+            if not isinstance(value, list) or not all(isinstance(p, (list, tuple)) and len(p) == 3 for p in value):
+                raise ValueError(f"{name} must be a list of [x, y, z] positions")
+            for position in value:
+                for v in position:
+                    _number(name, v)
+        elif _number(name, value) <= 0 and name in POSITIVE_PARAMETERS:
+            raise ValueError(f"{name} must be positive, got {value!r}")
+
+
+def path_waypoints(params: Dict) -> int:
+    """
+    Number of waypoints build_scenario plans for the parameters, without planning them.
+    """
+    if params["path"] == "coverage":
+        spacing = strip_spacing(params["antenna_range"], params["path_altitude"], 0.1, params["slope_angle"])
+        return 2 * max(1, math.ceil(min(params["slope_width"], params["slope_height"]) / spacing - 1e-9))
+    levels = (params["start_z"] - params["path_end_z"]) // params["path_spacing"] + 1
+    return 2 * max(0, int(levels))
+
+
+def check_steps(params: Dict, drone: Drone, max_steps: int):
+    """
+    Reject a scenario whose flight takes more than max_steps time steps, before flying it.
+    :raises ValueError: If the drone's path takes more than max_steps steps of time_step.
+    """
+    steps = trajectory_steps(drone.position, drone.path.path, params["speed_limit"], params["rot_speed_limit"],
+                             params["time_step"])
+    if steps > max_steps:
+        raise ValueError(f"The path takes {steps} steps of time_step {params['time_step']}, more than the limit of {max_steps}")
+
+
+def run_scenario(overrides: Dict, store_paths: bool = False) -> Dict:
+    """
+    Run one scenario and compute its metrics. Runs in a worker process, so it never touches the database.
+    :param overrides: Parameters that differ from DEFAULTS.
+    :param store_paths: Also return the drone's sample array for storage.
+    :return: Dictionary with params, metrics and optionally samples.
+    """
+    params = dict(DEFAULTS, **overrides)
+    start = time.perf_counter()
+    transmittAntenna, _, drone = build_scenario(params)
+    check_path(params, drone)
+    drone.followPath(d_time=params["time_step"])
+
+    samples = drone.samples.array
+    antenna = np.array([transmittAntenna.position.x, transmittAntenna.position.y, transmittAntenna.position.z])
+    distance = np.linalg.norm(samples[:, 1:4] - antenna, axis=1)
+    metrics = {
+        "steps": len(samples),
+        "flight_time": float(samples[-1, 0]),
+        "closest_approach": float(distance.min()),
+        "detections": int(len(drone.samples.measured())),
+        "runtime": time.perf_counter() - start,
+    }
+    return {
+        "params": params,
+        "metrics": metrics,
+        "final_position": drone.position.getStep(),
+        "samples": samples.copy() if store_paths else None,
+        "beacon_ids": drone.samples.beacon_ids.copy() if store_paths else None,
+    }
+
+
+def _run_batch(batch: List[Dict], store_paths: bool) -> List[Dict]:
+    return [run_scenario(overrides, store_paths) for overrides in batch]
+
+
+def store_run(sweep_name: str, run: Dict) -> int:
+    """
+    Write one finished run to the database. Only called from the parent process.
+    :return: The simulation ID of the run.
+    """
+    params = run["params"]
+    transmittAntenna, slope, _ = build_scenario(params)
+    antenna_ids = [add_transmitt_antenna(antenna) for antenna in slope.transmittAntennas]
+    slope_id = add_slope(slope, antenna_ids[0])
+    simulation_id = create_simulation(sweep_name, slope_id, antenna_ids[0])
+    link_simulation_antennas(simulation_id, antenna_ids)
+
+    with SimulationRecorder(simulation_id) as recorder:
+        if run["samples"] is not None:
+            recorder.log_samples_array(run["samples"], beacon_ids=run["beacon_ids"])
+        recorder.log_simulation_result(
+            Position(params["start_x"], params["start_y"], params["start_z"], 0, 0, 0),
+            transmittAntenna.position,
+            Position(*run["final_position"]),
+            run["metrics"]["steps"],
+        )
+    log_sweep_run(sweep_name, simulation_id, params, run["metrics"])
+    return simulation_id
+
+
+def _format_seconds(seconds: float) -> str:
+    seconds = int(round(seconds))
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def run_sweep(scenarios: List[Dict], sweep_name: str = "sweep", workers: Optional[int] = None, batch_size: Optional[int] = None,
+              store_paths: bool = False, progress_every: float = 1.0) -> List[Dict]:
+    """
+    Run scenarios across a process pool and store each result as it arrives.
+    :param scenarios: Parameter overrides, one dict per run, e.g. from parameter_grid or random_sampler.
+    :param sweep_name: Name stored with every run, also used as the simulation description.
+    :param workers: Number of worker processes, defaults to all cores.
+    :param batch_size: Runs sent to a worker at a time. Defaults to a size that gives each worker ~4 batches.
+    :param store_paths: Also store the full trajectory and measurements of every run.
+    :param progress_every: Seconds between progress reports on stderr.
+    :return: The runs with their metrics and simulation IDs, in completion order.
+    """
+    initialize_database()
+    workers = workers or os.cpu_count() or 1
+    batch_size = batch_size or max(1, len(scenarios) // (workers * 4))
+    batches = [scenarios[i:i + batch_size] for i in range(0, len(scenarios), batch_size)]
+
+    results = []
+    start = last_report = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_run_batch, batch, store_paths) for batch in batches]
+        for future in as_completed(futures):
+            for run in future.result():
+                run["simulation_id"] = store_run(sweep_name, run)
+                run["samples"] = None
+                results.append(run)
+
+            now = time.perf_counter()
+            if now - last_report >= progress_every or len(results) == len(scenarios):
+                last_report = now
+                rate = len(results) / (now - start)
+                eta = (len(scenarios) - len(results)) / rate if rate > 0 else 0.0
+                print(f"[{len(results)}/{len(scenarios)}] {rate:.1f} runs/s, elapsed {_format_seconds(now - start)}, ETA {_format_seconds(eta)}",
+                      file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=100, help="Number of random scenarios.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, defaults to all cores.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the random sampler.")
+    parser.add_argument("--name", default="Monte Carlo sweep", help="Sweep name stored with every run.")
+    parser.add_argument("--store-paths", action="store_true", help="Store the full trajectory of every run.")
+    args = parser.parse_args()
+
+    scenarios = random_sampler(args.runs, {
+        "antenna_x": (-40, 40), "antenna_z": (10, 170),
+        "antenna_pitch": (-90, 90), "antenna_yaw": (0, 360),
+        "slope_angle": (20, 45), "path_spacing": (10, 30),
+    }, seed=args.seed)
+    results = run_sweep(scenarios, args.name, workers=args.workers, store_paths=args.store_paths)
+
+    closest = np.array([run["metrics"]["closest_approach"] for run in results])
+    flight_time = np.array([run["metrics"]["flight_time"] for run in results])
+    print(f"runs: {len(results)}, mean flight time: {flight_time.mean():.1f} s, "
+          f"closest approach median: {np.median(closest):.2f} m, max: {closest.max():.2f} m")
+
+
+if __name__ == "__main__":
+    main()
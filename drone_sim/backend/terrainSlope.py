@@ -0,0 +1,247 @@
+"""
+Terrain models (DEMs) as slopes.
+
+Heights are read from memory-mapped elevation grids, so a DEM of hundreds of MB is never loaded
+into RAM: a lookup only pages in the cells it touches. A grid is either one file, ElevationGrid
+(.npy or raw float32), or a directory of tiles, TiledElevationGrid, whose tiles are opened lazily
+on first use.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from slope import CENTER_Z, Slope
+from transmittAntenna import TransmittAntenna
+
+TILE_MANIFEST = "tiles.json"
+TILE_FORMATS = ("npy", "raw")
+
+# Cells per side of the coarse grid sampled to fit the mean incline of a DEM. Every sampled row
+# pages in a stretch of the file, so it is kept small.
+_FIT_SAMPLES = 9
+
+
+class ElevationGrid:
+    """
+    Heights y of a regular grid, rows along z and columns along x, in one array or memory map.
+    """
+    def __init__(self, heights: np.ndarray):
+        if np.ndim(heights) != 2:
+            raise ValueError(f"Elevation grid must be 2D, got shape {np.shape(heights)}")
+        self._heights = heights
+
+    @classmethod
+    def open(cls, path: str, shape: Optional[Tuple[int, int]] = None, dtype: str = "float32") -> "ElevationGrid":
+        """
+        Memory-map a DEM file read-only.
+        :param path: A .npy file, or a raw file of row-major values.
+        :param shape: (rows, columns) of a raw file.
+        :param dtype: Value type of a raw file.
+        """
+        if path.endswith(".npy"):
+            return cls(np.load(path, mmap_mode="r"))
+        if shape is None:
+            raise ValueError("The shape of a raw elevation file must be given")
+        return cls(np.memmap(path, dtype=dtype, mode="r", shape=tuple(shape)))
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return tuple(self._heights.shape)
+
+    def gather(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """Heights of the cells (rows[i], cols[i]) as float64, index arrays broadcast. Indices must be inside the grid."""
+        return np.asarray(self._heights[rows, cols], dtype=float)
+
+
+class TiledElevationGrid:
+    """
+    A grid split into square tiles of tile_size cells, one file per tile, in one directory.
+
+    The directory holds a tiles.json manifest with the grid shape, tile size, value type and file
+    format, and the tiles tile_<row>_<column>.npy (or .raw). Tiles are memory-mapped when a lookup
+    first touches them, and at most max_open_tiles stay mapped, least recently used first out.
+    Missing tiles read as NaN, i.e. no ground.
+    """
+    def __init__(self, directory: str, max_open_tiles: int = 64):
+        with open(os.path.join(directory, TILE_MANIFEST)) as f:
+            manifest = json.load(f)
+        self.directory = directory
+        self.tile_size = int(manifest["tile_size"])
+        self.dtype = manifest.get("dtype", "float32")
+        self.format = manifest.get("format", "npy")
+        if self.format not in TILE_FORMATS:
+            raise ValueError(f"Unknown tile format {self.format!r}, expected one of {TILE_FORMATS}")
+        self._shape = (int(manifest["shape"][0]), int(manifest["shape"][1]))
+        self._tile_columns = -(-self._shape[1] // self.tile_size)
+        self.max_open_tiles = max_open_tiles
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self._shape
+
+    @property
+    def open_tiles(self) -> int:
+        return len(self._tiles)
+
+    def _tile_shape(self, tile_row: int, tile_col: int) -> Tuple[int, int]:
+        return (min(self.tile_size, self._shape[0] - tile_row * self.tile_size),
+                min(self.tile_size, self._shape[1] - tile_col * self.tile_size))
+
+    def _tile(self, tile_row: int, tile_col: int) -> Optional[np.ndarray]:
+        key = (tile_row, tile_col)
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None or key in self._tiles:
+                self._tiles.move_to_end(key)
+                return tile
+        path = os.path.join(self.directory, f"tile_{tile_row}_{tile_col}.{self.format}")
+        if not os.path.exists(path):
+            tile = None
+        elif self.format == "npy":
+            tile = np.load(path, mmap_mode="r")
+        else:
+            tile = np.memmap(path, dtype=self.dtype, mode="r", shape=self._tile_shape(tile_row, tile_col))
+        with self._lock:
+            self._tiles[key] = tile
+            while len(self._tiles) > self.max_open_tiles:
+                self._tiles.popitem(last=False)
+        return tile
+
+    def gather(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """Heights of the cells (rows[i], cols[i]) as float64, index arrays broadcast, reading each touched tile once."""
+        rows, cols = np.broadcast_arrays(np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64))
+        heights = np.full(rows.shape, np.nan)
+        tile_ids = (rows // self.tile_size) * self._tile_columns + cols // self.tile_size
+        order = np.argsort(tile_ids, axis=None, kind="stable")
+        sorted_ids = tile_ids.ravel()[order]
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(sorted_ids)) + 1])
+        flat_rows, flat_cols, flat_heights = rows.ravel(), cols.ravel(), heights.reshape(-1)
+        for tile_id, cells in zip(sorted_ids[starts].tolist(), np.split(order, starts[1:])):
+            if not len(cells):
+                continue
+            tile_row, tile_col = divmod(tile_id, self._tile_columns)
+            tile = self._tile(tile_row, tile_col)
+            if tile is not None:
+                flat_heights[cells] = tile[flat_rows[cells] - tile_row * self.tile_size,
+                                           flat_cols[cells] - tile_col * self.tile_size]
+        return heights
+
+
+def write_tiles(heights: np.ndarray, directory: str, tile_size: int = 1024, format: str = "npy", dtype: str = "float32"):
+    """
+    Split a DEM into the tile directory read by TiledElevationGrid.
+    :param heights: 2D array of heights, may itself be a memory map.
+    :param tile_size: Cells per tile side.
+    :param format: "npy" or "raw".
+    """
+    if format not in TILE_FORMATS:
+        raise ValueError(f"Unknown tile format {format!r}, expected one of {TILE_FORMATS}")
+    os.makedirs(directory, exist_ok=True)
+    rows, cols = np.shape(heights)
+    for tile_row in range(-(-rows // tile_size)):
+        for tile_col in range(-(-cols // tile_size)):
+            tile = np.ascontiguousarray(heights[tile_row * tile_size:(tile_row + 1) * tile_size,
+                                                tile_col * tile_size:(tile_col + 1) * tile_size], dtype=dtype)
+            path = os.path.join(directory, f"tile_{tile_row}_{tile_col}.{format}")
+            if format == "npy":
+                np.save(path, tile)
+            else:
+                tile.tofile(path)
+    with open(os.path.join(directory, TILE_MANIFEST), "w") as f:
+        json.dump({"shape": [rows, cols], "tile_size": tile_size, "dtype": dtype, "format": format}, f)
+
+
+class TerrainSlope(Slope):
+    """
+    A slope whose ground is a DEM instead of an inclined plane.
+
+    Grid cell (row, col) lies at x = origin_x + col * cell_size, z = origin_z + row * cell_size,
+    so rows run down the slope along z like Slope.z_bounds. By default the grid is centered on
+    x = 0 and z = slope.CENTER_Z like a planar Slope. Heights between cells are interpolated
+    bilinearly, and positions outside the grid take the height of the nearest edge cell.
+    width, height and angle describe the plane fitted to the DEM, so code written for a planar
+    Slope (strip spacing, the database) keeps working.
+    """
+    def __init__(self, grid: Union[ElevationGrid, TiledElevationGrid], cell_size: float,
+                 transmittAntenna: Union[TransmittAntenna, Sequence[TransmittAntenna], None],
+                 origin: Optional[Tuple[float, float]] = None, follow_spacing: Optional[float] = None):
+        """
+        :param grid: The elevation grid.
+        :param cell_size: Distance between neighbouring cells along x and z.
+        :param transmittAntenna: The buried transmitter, or a sequence of several.
+        :param origin: (x, z) of cell (0, 0), defaults to centering the grid.
+        :param follow_spacing: Longest leg of terrain-following paths, see terrain_spacing. Defaults to two cells.
+        """
+        self.grid = grid
+        self.cell_size = float(cell_size)
+        rows, cols = grid.shape
+        if rows < 2 or cols < 2:
+            raise ValueError(f"Elevation grid needs at least 2 x 2 cells, got {rows} x {cols}")
+        width = (cols - 1) * self.cell_size
+        run = (rows - 1) * self.cell_size
+        self.origin = origin if origin is not None else (-width / 2, CENTER_Z - run / 2)
+        self._follow_spacing = follow_spacing if follow_spacing is not None else 2 * self.cell_size
+
+        # Plane fitted on a coarse sample of the grid, ground rising towards -z as for Slope
+        sample_rows = np.unique(np.linspace(0, rows - 1, _FIT_SAMPLES).astype(np.int64))
+        sample_cols = np.unique(np.linspace(0, cols - 1, _FIT_SAMPLES).astype(np.int64))
+        sample = grid.gather(sample_rows[:, None], sample_cols[None, :])
+        z = self.origin[1] + sample_rows * self.cell_size
+        valid = ~np.isnan(sample)
+        gradient = 0.0
+        if valid.sum() > 1:
+            z_cells = np.broadcast_to(z[:, None], sample.shape)[valid]
+            gradient = np.polyfit(z_cells, sample[valid], 1)[0] if np.ptp(z_cells) > 0 else 0.0
+        angle = float(np.degrees(np.arctan(-gradient)))
+        super().__init__(width=width, height=run / np.cos(np.radians(angle)), angle=angle, transmittAntenna=transmittAntenna)
+        self._run = run
+
+    @classmethod
+    def from_file(cls, path: str, cell_size: float, transmittAntenna, shape: Optional[Tuple[int, int]] = None,
+                  dtype: str = "float32", **kwargs) -> "TerrainSlope":
+        """TerrainSlope over a .npy or raw DEM file, see ElevationGrid.open."""
+        return cls(ElevationGrid.open(path, shape, dtype), cell_size, transmittAntenna, **kwargs)
+
+    @classmethod
+    def from_tiles(cls, directory: str, cell_size: float, transmittAntenna, max_open_tiles: int = 64, **kwargs) -> "TerrainSlope":
+        """TerrainSlope over a tile directory, see TiledElevationGrid."""
+        return cls(TiledElevationGrid(directory, max_open_tiles), cell_size, transmittAntenna, **kwargs)
+
+    @property
+    def terrain_spacing(self) -> Optional[float]:
+        return self._follow_spacing
+
+    def footprint(self) -> Tuple[float, float, float, float]:
+        return (self.origin[0], self.origin[0] + self.width, self.origin[1], self.origin[1] + self._run)
+
+    def z_bounds(self) -> Tuple[float, float]:
+        return self.origin[1], self.origin[1] + self._run
+
+    def surface_height(self, x, z) -> np.ndarray:
+        """
+        Bilinearly interpolated ground height y at (x, z), arrays broadcast. Only the four cells
+        around every point are read from the grid.
+        """
+        x, z = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(z, dtype=float))
+        rows, cols = self.grid.shape
+        col = np.clip((x - self.origin[0]) / self.cell_size, 0, cols - 1)
+        row = np.clip((z - self.origin[1]) / self.cell_size, 0, rows - 1)
+        col0 = np.minimum(col.astype(np.int64), cols - 2)
+        row0 = np.minimum(row.astype(np.int64), rows - 2)
+        fc, fr = col - col0, row - row0
+        # The four corners in one gather, so a tiled grid groups them by tile once
+        corner_rows = np.stack([row0, row0, row0 + 1, row0 + 1])
+        corner_cols = np.stack([col0, col0 + 1, col0, col0 + 1])
+        h00, h01, h10, h11 = self.grid.gather(corner_rows, corner_cols)
+        return (h00 * (1 - fc) + h01 * fc) * (1 - fr) + (h10 * (1 - fc) + h11 * fc) * fr
+
+    def ground_height(self, z):
+        """Height y of the ground at z along the center line of the grid."""
+        x0, x1 = self.footprint()[:2]
+        return self.surface_height((x0 + x1) / 2, z)
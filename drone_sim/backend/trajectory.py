@@ -0,0 +1,135 @@
+import numpy as np
+from position import Position
+from typing import List, Sequence, Tuple
+
+# Column layout of the pose arrays returned by compute_trajectory
+POSE_COLUMNS = ("t", "x", "y", "z", "pitch", "yaw", "roll")
+
+# Slack when counting steps, so a segment that is an exact multiple of the step length
+# does not get an extra step from floating point noise
+_STEP_EPS = 1e-9
+
+
+def _segment_steps(lengths: np.ndarray, rot_lengths: np.ndarray, step_length: float, rot_step_length: float) -> np.ndarray:
+    # Every waypoint takes at least one step, even when the drone is already there
+    steps = np.maximum(np.ceil(lengths / step_length - _STEP_EPS), np.ceil(rot_lengths / rot_step_length - _STEP_EPS))
+    return np.maximum(steps, 1).astype(np.int64)
+
+
+def trajectory_steps(start: Position, waypoints: List[Position], speed_limit: float, rot_speed_limit: float, dt: float) -> int:
+    """
+    Number of steps compute_trajectory takes for the same path, without computing the poses.
+    """
+    poses = np.array([start.getStep()] + [p.getStep() for p in waypoints], dtype=float).reshape(-1, 6)
+    deltas = np.diff(poses, axis=0)
+    return int(_segment_steps(np.linalg.norm(deltas[:, :3], axis=1), np.linalg.norm(deltas[:, 3:], axis=1),
+                              speed_limit * dt, rot_speed_limit * dt).sum())
+
+
+def compute_trajectory(start: Position, waypoints: List[Position], speed_limit: float, rot_speed_limit: float, dt: float) -> np.ndarray:
+    """
+    Compute the timestamped poses of a drone following piecewise-linear waypoints, in closed form.
+
+    Gives the same poses as stepping Drone.flyTowards with a fixed dt: every step moves at most
+    speed_limit * dt along the straight line to the next waypoint and rotates at most
+    rot_speed_limit * dt towards its orientation. A waypoint is finished when both the position
+    and the orientation have arrived, and the next waypoint starts on the following step.
+    :param start: Pose of the drone before the first step.
+    :param waypoints: Waypoints to visit in order.
+    :param speed_limit: Maximum speed (units per second).
+    :param rot_speed_limit: Maximum rotational speed (degrees per second).
+    :param dt: Length of one step.
+    :return: Array of shape (steps + 1, 7) with columns POSE_COLUMNS, starting with the start pose at t=0.
+    """
+    poses = np.array([start.getStep()] + [p.getStep() for p in waypoints], dtype=float).reshape(-1, 6)
+    origins = poses[:-1]
+    deltas = poses[1:] - origins
+
+    lengths = np.linalg.norm(deltas[:, :3], axis=1)
+    rot_lengths = np.linalg.norm(deltas[:, 3:], axis=1)
+    step_length = speed_limit * dt
+    rot_step_length = rot_speed_limit * dt
+    steps = _segment_steps(lengths, rot_lengths, step_length, rot_step_length)
+
+    segment = np.repeat(np.arange(len(steps)), steps)
+    offsets = np.cumsum(steps) - steps
+    local_step = np.arange(1, segment.size + 1) - offsets[segment]
+
+    # Fraction of each segment covered after local_step steps. Zero-length segments have a zero
+    # delta, so dividing by 1 instead of 0 leaves them at the waypoint.
+    fraction = np.minimum(local_step * step_length / np.where(lengths > 0, lengths, 1.0)[segment], 1.0)
+    rot_fraction = np.minimum(local_step * rot_step_length / np.where(rot_lengths > 0, rot_lengths, 1.0)[segment], 1.0)
+
+    trajectory = np.empty((segment.size + 1, 7))
+    trajectory[0, 0] = 0.0
+    trajectory[0, 1:] = poses[0]
+    trajectory[1:, 0] = np.arange(1, segment.size + 1) * dt
+    trajectory[1:, 1:4] = origins[segment, :3] + deltas[segment, :3] * fraction[:, None]
+    trajectory[1:, 4:] = origins[segment, 3:] + deltas[segment, 3:] * rot_fraction[:, None]
+    return trajectory
+
+
+def compute_swarm_trajectory(starts: np.ndarray, waypoints: Sequence[np.ndarray], speed_limit: float, rot_speed_limit: float,
+                             dt: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    compute_trajectory for N drones at once, as one [N, 6] pose array per time step.
+
+    The segments of all drones are laid out in one flat array and solved in a single vectorized
+    pass, so the cost grows with the total number of poses and not with a Python loop per drone
+    or per step. Each drone follows its own waypoints with the same step rules as compute_trajectory.
+    A drone that has finished its path holds its last pose.
+    :param starts: Array of shape (N, 6) with the start pose of every drone.
+    :param waypoints: N arrays of shape (W_n, 6), the waypoints of each drone. W_n may be 0.
+    :param speed_limit: Maximum speed (units per second).
+    :param rot_speed_limit: Maximum rotational speed (degrees per second).
+    :param dt: Length of one step.
+    :return: Tuple (poses, steps): poses of shape (T + 1, N, 6), starting with the start poses
+        at t=0, and the number of steps each drone flies, so drone n is active at steps 1..steps[n].
+    """
+    starts = np.asarray(starts, dtype=float).reshape(-1, 6)
+    count = len(starts)
+    waypoints = [np.asarray(w, dtype=float).reshape(-1, 6) for w in waypoints]
+    if len(waypoints) != count:
+        raise ValueError(f"Expected waypoints for {count} drones, got {len(waypoints)}")
+
+    # One flat array of segments, with the drone each belongs to
+    counts = np.array([len(w) for w in waypoints], dtype=np.int64)
+    targets = np.concatenate(waypoints) if counts.sum() else np.empty((0, 6))
+    drone = np.repeat(np.arange(count), counts)
+    first = np.cumsum(counts) - counts
+    origins = np.empty_like(targets)
+    origins[1:] = targets[:-1]
+    has_segments = counts > 0
+    origins[first[has_segments]] = starts[has_segments]
+    deltas = targets - origins
+
+    lengths = np.linalg.norm(deltas[:, :3], axis=1)
+    rot_lengths = np.linalg.norm(deltas[:, 3:], axis=1)
+    step_length = speed_limit * dt
+    rot_step_length = rot_speed_limit * dt
+    steps = _segment_steps(lengths, rot_lengths, step_length, rot_step_length)
+    drone_steps = np.bincount(drone, weights=steps, minlength=count).astype(np.int64)
+
+    # Per pose: its segment, the step within the segment and the step within the drone's flight
+    segment = np.repeat(np.arange(len(steps)), steps)
+    offsets = np.cumsum(steps) - steps
+    local_step = np.arange(1, segment.size + 1) - offsets[segment]
+    drone_offsets = np.cumsum(drone_steps) - drone_steps
+    flight_step = np.arange(1, segment.size + 1) - drone_offsets[drone[segment]]
+
+    fraction = np.minimum(local_step * step_length / np.where(lengths > 0, lengths, 1.0)[segment], 1.0)
+    rot_fraction = np.minimum(local_step * rot_step_length / np.where(rot_lengths > 0, rot_lengths, 1.0)[segment], 1.0)
+
+    # Every drone holds its final pose after its last step
+    final = starts.copy()
+    final[has_segments] = targets[first[has_segments] + counts[has_segments] - 1]
+    poses = np.empty((int(drone_steps.max(initial=0)) + 1, count, 6))
+    poses[:] = final
+    poses[0] = starts
+    scale = np.empty((segment.size, 6))
+    scale[:, :3] = fraction[:, None]
+    scale[:, 3:] = rot_fraction[:, None]
+    moved = origins.take(segment, axis=0) + deltas.take(segment, axis=0) * scale
+    # Scatter through the flat (step * N + drone) row index, cheaper than 2-D fancy indexing
+    poses.reshape(-1, 6)[flight_step * count + drone[segment]] = moved
+    return poses, drone_steps
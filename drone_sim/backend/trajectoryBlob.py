@@ -0,0 +1,69 @@
+import zlib
+import numpy as np
+from typing import Sequence, Tuple
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # lz4 is optional, zlib is always available
+    lz4_frame = None
+
+DTYPES = ("float32", "float64")
+COMPRESSIONS = ("none", "zlib", "lz4")
+
+
+def encode_columns(array: np.ndarray, columns: Sequence[str], dtype: str = "float64", delta: bool = False,
+                   compression: str = "zlib") -> Tuple[dict, bytes]:
+    """
+    Encode a 2D array as a column-major binary blob.
+    :param array: Array of shape (rows, len(columns)).
+    :param columns: Column names, stored in the metadata.
+    :param dtype: "float32" or "float64".
+    :param delta: Store the difference to the previous row instead of the value. Smooth columns
+        such as timestamps and positions compress much better this way.
+    :param compression: "none", "zlib" or "lz4" (needs the lz4 package).
+    :return: Tuple (metadata, data) to pass to decode_columns.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown dtype {dtype!r}, expected one of {DTYPES}")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression {compression!r}, expected one of {COMPRESSIONS}")
+    if compression == "lz4" and lz4_frame is None:
+        raise ValueError("lz4 compression needs the lz4 package")
+
+    values = np.asarray(array, dtype=float).reshape(-1, len(columns))
+    if delta and len(values):
+        values = np.diff(values, axis=0, prepend=0.0)
+    data = np.ascontiguousarray(values.T, dtype=np.dtype(dtype).newbyteorder("<")).tobytes()
+    if compression == "zlib":
+        data = zlib.compress(data, 6)
+    elif compression == "lz4":
+        data = lz4_frame.compress(data)
+
+    metadata = {
+        "rows": len(values),
+        "columns": list(columns),
+        "dtype": dtype,
+        "delta": delta,
+        "compression": compression,
+    }
+    return metadata, data
+
+
+def decode_columns(metadata: dict, data: bytes) -> np.ndarray:
+    """
+    Decode a blob written by encode_columns.
+    :return: Array of shape (rows, len(columns)). Without delta encoding and compression it is a
+        read-only view of `data`, otherwise a new float64 array.
+    """
+    if metadata["compression"] == "zlib":
+        data = zlib.decompress(data)
+    elif metadata["compression"] == "lz4":
+        if lz4_frame is None:
+            raise ValueError("Decoding this trajectory needs the lz4 package")
+        data = lz4_frame.decompress(data)
+
+    columns = np.frombuffer(data, dtype=np.dtype(metadata["dtype"]).newbyteorder("<"))
+    columns = columns.reshape(len(metadata["columns"]), metadata["rows"])
+    if metadata["delta"]:
+        columns = np.cumsum(columns, axis=1, dtype=float)
+    return columns.T
@@ -1,9 +1,22 @@
+import math
 import numpy as np
+import field_model
 from position import Position
-from typing import Tuple
+from typing import Optional, Tuple
+
+# "distance": signal strength is the distance to the transmitter.
+# "dipole": signal strength is the magnitude of the 457 kHz dipole near field, see field_model.
+# "dipole_grid": as "dipole", interpolated from a cached precomputed field_model.FieldGrid.
+# Whatever the model, signal direction is the bearing atan2(dy, dx) of the receiver seen from the
+# transmitter, which BeaconEstimator, ParticleFilter and triangulation expect. The angle of the
+# dipole field itself is field_direction.
+SIGNAL_MODELS = ("distance", "dipole", "dipole_grid")
 
 class TransmittAntenna:
-    def __init__(self, id, position: Position, name, type, power, frequency, gain, azimuth, beamwidth, polarization, pattern):
+    def __init__(self, id, position: Position, name, type, power, frequency, gain, azimuth, beamwidth, polarization, pattern,
+                 signal_model: str = "distance", moment: float = 1.0):
+        if signal_model not in SIGNAL_MODELS:
+            raise ValueError(f"Unknown signal model {signal_model!r}, expected one of {SIGNAL_MODELS}")
         self.id = id
         self.position = position
         self.name = name
@@ -15,6 +28,10 @@ class TransmittAntenna:
         self.beamwidth = beamwidth
         self.polarization = polarization
         self.pattern = pattern
+        self.signal_model = signal_model
+        self.moment = moment
+        self._axis = None
+        self._axis_orientation = None
         self.antenna = {
             "id": self.id,
             "name": self.name,
@@ -34,16 +51,78 @@ class TransmittAntenna:
     def getPosition(self):
         return self.position
     
-    def read_signal(self, position: Position, range: int = 40) -> Tuple[float, float]:
-        """Return the signal strength at the drone's current position."""
-        d_dist = np.linalg.norm(np.array([self.position.x, self.position.y, self.position.z]) - np.array([position.x, position.y, position.z]))
-        signal_strength = d_dist
-        direction_vector = np.array([position.x, position.y, position.z]) - np.array([self.position.x, self.position.y, self.position.z])
-        signal_direction = np.arctan2(direction_vector[1], direction_vector[0])
+    def _dipole_axis(self) -> Tuple[float, float, float]:
+        orientation = (self.position.pitch, self.position.yaw, self.position.roll)
+        if self._axis_orientation != orientation:
+            self._axis = tuple(field_model.dipole_axis(*orientation).tolist())
+            self._axis_orientation = orientation
+        return self._axis
+
+    def field(self, positions: np.ndarray) -> np.ndarray:
+        """
+        Return the dipole H-field vectors at many positions.
+        :param positions: Array of shape (N, 3+) whose first three columns are x, y, z.
+        :return: Array of shape (N, 3).
+        """
+        relative = np.asarray(positions, dtype=float)[:, :3] - np.array([self.position.x, self.position.y, self.position.z])
+        if self.signal_model == "dipole_grid":
+            grid = field_model.field_grid(self.moment, self.position.pitch, self.position.yaw, self.position.roll)
+            return grid(relative)
+        return field_model.dipole_field(relative, self._dipole_axis(), self.moment)
 
+    def field_direction(self, positions: np.ndarray) -> np.ndarray:
+        """
+        Angle atan2(hy, hx) of the dipole field in the x-y plane at many positions, whatever the signal model.
+        :param positions: Array of shape (N, 3+) whose first three columns are x, y, z.
+        :return: Array of shape (N,).
+        """
+        field = self.field(positions)
+        return np.arctan2(field[:, 1], field[:, 0])
+
+    def read_signal(self, position: Position, range: Optional[float] = None) -> Tuple[Optional[float], Optional[float]]:
+        """
+        Return the signal strength and direction at the drone's current position.
+        :param position: Position of the receiver.
+        :param range: Optional receiver range, as in read_signal_batch.
+        :return: Tuple of (signal_strength, signal_direction), (None, None) when the receiver is farther away than range.
+        """
+        dx = position.x - self.position.x
+        dy = position.y - self.position.y
+        dz = position.z - self.position.z
+        d_dist = math.sqrt(dx * dx + dy * dy + dz * dz)
         # Check if the reading antenna is to far away from transmitter
-        # if d_dist > range:
-        #     signal_strength = None
-        #     signal_direction = None
+        if range is not None and d_dist > range:
+            return (None, None)
+
+        if self.signal_model == "dipole":
+            hx, hy, hz = field_model.dipole_field_at(dx, dy, dz, self._dipole_axis(), self.moment)
+            return (math.sqrt(hx * hx + hy * hy + hz * hz), math.atan2(dy, dx))
+        if self.signal_model == "dipole_grid":
+            signal_strength, signal_direction = self.read_signal_batch(np.array([[position.x, position.y, position.z]]))
+            return (float(signal_strength[0]), float(signal_direction[0]))
+
+        return (d_dist, math.atan2(dy, dx))
+
+    def read_signal_batch(self, positions: np.ndarray, range: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the signal strength and direction at many positions in one vectorized pass.
+        :param positions: Array of shape (N, 3) with x, y, z, or (N, 6+) whose first three columns are x, y, z.
+        :param range: Optional receiver range. Samples farther away than this are masked out with NaN.
+        :return: Tuple of (signal_strength, signal_direction) arrays of shape (N,).
+        """
+        positions = np.asarray(positions, dtype=float)
+        delta = positions[:, :3] - np.array([self.position.x, self.position.y, self.position.z])
+        distance = np.sqrt(np.einsum("ij,ij->i", delta, delta))
+        if self.signal_model == "distance":
+            signal_strength = distance
+        else:
+            field = self.field(positions)
+            signal_strength = np.sqrt(np.einsum("ij,ij->i", field, field))
+        signal_direction = np.arctan2(delta[:, 1], delta[:, 0])
+
+        if range is not None:
+            out_of_range = distance > range
+            signal_strength[out_of_range] = np.nan
+            signal_direction[out_of_range] = np.nan
 
-        return (signal_strength, signal_direction)
\ No newline at end of file
+        return (signal_strength, signal_direction)
@@ -1,5 +1,10 @@
 import * as THREE from 'three';
 import { useEffect, useRef, useState } from 'react';
+import { fetchFieldVolume } from '../utils/api';
+
+// Half the side of the field slice behind the field lines, and its grid spacing, in meters
+const FIELD_EXTENT = 150;
+const FIELD_RESOLUTION = 2;
 
 interface MagneticField2DProps {
   orientation: number;  // Angle to rotate the beacon
@@ -65,6 +70,48 @@ const MagneticField2D = ({ orientation }: MagneticField2DProps) => {
     };
   }, [orientation, scene]);
 
+  // Field magnitude of the beacon in the z = 0 plane, from the backend's field cache, drawn as
+  // a log-scaled heatmap behind the field lines
+  useEffect(() => {
+    let heatmap: THREE.Mesh | null = null;
+    let cancelled = false;
+    fetchFieldVolume({
+      // Pitch turns the dipole axis about z, within the plane shown
+      antennas: [[0, 0, 0, (orientation * 180) / Math.PI, 0, 0]],
+      extent: FIELD_EXTENT,
+      resolution: FIELD_RESOLUTION,
+      axis: 'z',
+      at: 0,
+    }).then((field) => {
+      if (cancelled || field === null) return;
+      const [nx, ny] = field.shape;
+      const logs = Array.from(field.data, (value) => Math.log10(Math.max(value, 1e-12)));
+      const low = Math.min(...logs);
+      const high = Math.max(...logs);
+      // The slice is [x][y], the texture is rows of y with x running along each row
+      const pixels = new Uint8Array(nx * ny * 4);
+      for (let i = 0; i < nx; i++) {
+        for (let j = 0; j < ny; j++) {
+          const shade = Math.round((255 * (logs[i * ny + j] - low)) / (high - low || 1));
+          pixels.set([shade, Math.round(shade * 0.6), 255 - shade, 255], (j * nx + i) * 4);
+        }
+      }
+      const texture = new THREE.DataTexture(pixels, nx, ny, THREE.RGBAFormat);
+      texture.needsUpdate = true;
+      heatmap = new THREE.Mesh(
+        new THREE.PlaneGeometry((nx - 1) * field.resolution, (ny - 1) * field.resolution),
+        new THREE.MeshBasicMaterial({ map: texture }),
+      );
+      heatmap.position.set(field.origin[0] + ((nx - 1) * field.resolution) / 2,
+                           field.origin[1] + ((ny - 1) * field.resolution) / 2, -1);
+      scene.add(heatmap);
+    });
+    return () => {
+      cancelled = true;
+      if (heatmap !== null) scene.remove(heatmap);
+    };
+  }, [orientation, scene]);
+
   return <div ref={mountRef} style={{ width: '100%', height: '100%' }}></div>;
 };
 
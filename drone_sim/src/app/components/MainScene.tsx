@@ -63,6 +63,7 @@ const MainScene = () => {
     const groundMaterial = new THREE.MeshStandardMaterial({ color: config.ground.color, side: THREE.DoubleSide });
     const ground = new THREE.Mesh(groundGeometry, groundMaterial);
     ground.rotation.x = -Math.PI / 2; // Make it flat
+    ground.position.y = config.ground.y;
     scene.add(ground);
 
     // Animation loop
@@ -20,7 +20,7 @@ const Slope = ({ width, height, angle, color, scene }: SlopeProps) => {
 
     // Rotate and position slope
     slopeMesh.rotation.x = THREE.MathUtils.degToRad(angle);
-    slopeMesh.position.set(0, 50, 100); // Adjust position so it's visible in the camera's view
+    slopeMesh.position.set(0, 0, 0); // Centered on the buried transmitter, like Slope in the backend (slope.py)
 
     // Add the slope mesh directly to the scene
     scene.add(slopeMesh);
@@ -1,4 +1,4 @@
-import { SimulationDetails } from './interfaces';
+import { SimulationDetails, SimulationJob, SimulationStreamRow } from './interfaces';
 
 
 export async function fetchSimulations() {
@@ -14,7 +14,9 @@ export async function fetchSimulations() {
     }
 }
 
-export async function runSimulation(startPosition: string, antennaCenter: string) {
+// Queues a simulation on the backend. The response only carries the job ID, poll fetchJob
+// until its status is "done" to get the simulation ID.
+export async function runSimulation(startPosition: string, antennaCenter: string, description?: string) {
     try {
         const res = await fetch('http://localhost:5000/api/simulate', {
             method: 'POST',
@@ -22,6 +24,7 @@ export async function runSimulation(startPosition: string, antennaCenter: string
                 'Content-Type': 'application/json',
             },
             body: JSON.stringify({
+                description,
                 start_position: startPosition,
                 antenna_center: antennaCenter,
             }),
@@ -38,6 +41,32 @@ export async function runSimulation(startPosition: string, antennaCenter: string
     }
 }
 
+export async function fetchJob(jobId: string): Promise<SimulationJob | null> {
+    try {
+        const res = await fetch(`http://localhost:5000/api/jobs/${jobId}`);
+        if (!res.ok) {
+            throw new Error(`Error fetching job ${jobId}: ${res.statusText}`);
+        }
+        return await res.json() as SimulationJob;
+    } catch (error) {
+        console.error(error);
+        return null;
+    }
+}
+
+export async function cancelJob(jobId: string): Promise<SimulationJob | null> {
+    try {
+        const res = await fetch(`http://localhost:5000/api/jobs/${jobId}`, { method: 'DELETE' });
+        if (!res.ok) {
+            throw new Error(`Error cancelling job ${jobId}: ${res.statusText}`);
+        }
+        return await res.json() as SimulationJob;
+    } catch (error) {
+        console.error(error);
+        return null;
+    }
+}
+
 export async function testBackend() {
     try {
         console.log('testBackend');
@@ -66,9 +95,16 @@ export async function fetchAvailableSimulations() {
 }
 
 
-export async function fetchSimulationById(simulationId: number): Promise<SimulationDetails | null> {
+// With maxPoints or tolerance the server returns a decimated path (Ramer-Douglas-Peucker)
+// and measurement series (LTTB) instead of every sample.
+export async function fetchSimulationById(simulationId: number, lod: { maxPoints?: number; tolerance?: number; droneId?: number } = {}): Promise<SimulationDetails | null> {
     try {
-        const res = await fetch(`http://localhost:5000/api/simulations/${simulationId}`);
+        const params = new URLSearchParams();
+        if (lod.maxPoints !== undefined) params.set('max_points', String(lod.maxPoints));
+        if (lod.tolerance !== undefined) params.set('tolerance', String(lod.tolerance));
+        if (lod.droneId !== undefined) params.set('drone_id', String(lod.droneId));
+        const query = params.toString() ? `?${params}` : '';
+        const res = await fetch(`http://localhost:5000/api/simulations/${simulationId}${query}`);
         if (!res.ok) {
             throw new Error(`Error fetching simulation ${simulationId}: ${res.statusText}`);
         }
@@ -78,3 +114,132 @@ export async function fetchSimulationById(simulationId: number): Promise<Simulat
         return null;
     }
 }
+
+export interface StreamOptions {
+    fromT?: number;
+    toT?: number;
+    afterT?: number;
+    afterDroneId?: number;      // With afterT and afterId, the cursor of a 'page' line
+    afterId?: number;
+    limit?: number;
+    droneId?: number;
+}
+
+// Reads the NDJSON stream of a simulation and calls onRow for every line as soon as it arrives,
+// so the scene can start animating before the whole trajectory is loaded.
+export async function streamSimulationById(
+    simulationId: number,
+    onRow: (row: SimulationStreamRow) => void,
+    options: StreamOptions = {},
+): Promise<boolean> {
+    const params = new URLSearchParams();
+    if (options.fromT !== undefined) params.set('from_t', String(options.fromT));
+    if (options.toT !== undefined) params.set('to_t', String(options.toT));
+    if (options.afterT !== undefined) params.set('after_t', String(options.afterT));
+    if (options.afterDroneId !== undefined) params.set('after_drone_id', String(options.afterDroneId));
+    if (options.afterId !== undefined) params.set('after_id', String(options.afterId));
+    if (options.limit !== undefined) params.set('limit', String(options.limit));
+    if (options.droneId !== undefined) params.set('drone_id', String(options.droneId));
+
+    try {
+        const res = await fetch(`http://localhost:5000/api/simulations/${simulationId}/stream?${params}`);
+        if (!res.ok || !res.body) {
+            throw new Error(`Error streaming simulation ${simulationId}: ${res.statusText}`);
+        }
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffered = '';
+        for (;;) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffered += decoder.decode(value, { stream: true });
+            const lines = buffered.split('\n');
+            buffered = lines.pop() ?? '';
+            for (const line of lines) {
+                if (line) onRow(JSON.parse(line) as SimulationStreamRow);
+            }
+        }
+        if (buffered) onRow(JSON.parse(buffered) as SimulationStreamRow);
+        return true;
+    } catch (error) {
+        console.error(error);
+        return false;
+    }
+}
+
+export interface SimulationArrays {
+    rows: number;
+    columns: string[];
+    data: Float32Array;
+    column: (name: string) => Float32Array;
+}
+
+// Loads the path or measurements of a simulation as one column-major Float32Array,
+// straight from the binary endpoint without JSON parsing.
+export async function fetchSimulationArrays(simulationId: number, kind: 'path' | 'measurements' = 'path'): Promise<SimulationArrays | null> {
+    try {
+        const res = await fetch(`http://localhost:5000/api/simulations/${simulationId}/binary?kind=${kind}`);
+        if (!res.ok) {
+            throw new Error(`Error fetching simulation ${simulationId} arrays: ${res.statusText}`);
+        }
+        const rows = Number(res.headers.get('X-Rows'));
+        const columns = (res.headers.get('X-Columns') ?? '').split(',');
+        const data = new Float32Array(await res.arrayBuffer());
+        return {
+            rows,
+            columns,
+            data,
+            column: (name: string) => {
+                const index = columns.indexOf(name);
+                return data.subarray(index * rows, (index + 1) * rows);
+            },
+        };
+    } catch (error) {
+        console.error(error);
+        return null;
+    }
+}
+
+export interface FieldVolume {
+    shape: number[];
+    origin: [number, number, number];
+    resolution: number;
+    // |H| in C order: element [i, j, k] is data[(i * shape[1] + j) * shape[2] + k]
+    data: Float32Array;
+}
+
+export interface FieldQuery {
+    antennas?: [number, number, number, number, number, number][];  // x, y, z, pitch, yaw, roll
+    moment?: number;
+    center?: [number, number, number];
+    extent?: number;
+    resolution?: number;
+    axis?: 'x' | 'y' | 'z';
+    at?: number;
+}
+
+// Loads the dipole field magnitude of a set of transmitters, the whole volume or the plane
+// closest to `at` along `axis`. The backend caches volumes on disk, so repeated views are cheap.
+export async function fetchFieldVolume(query: FieldQuery = {}): Promise<FieldVolume | null> {
+    try {
+        const params = new URLSearchParams();
+        if (query.antennas) params.set('antennas', JSON.stringify(query.antennas));
+        if (query.center) params.set('center', query.center.join(','));
+        for (const name of ['moment', 'extent', 'resolution', 'axis', 'at'] as const) {
+            if (query[name] !== undefined) params.set(name, String(query[name]));
+        }
+        const res = await fetch(`http://localhost:5000/api/field?${params}`);
+        if (!res.ok) {
+            throw new Error(`Error fetching field volume: ${res.statusText}`);
+        }
+        return {
+            shape: (res.headers.get('X-Shape') ?? '').split(',').map(Number),
+            origin: (res.headers.get('X-Origin') ?? '0,0,0').split(',').map(Number) as [number, number, number],
+            resolution: Number(res.headers.get('X-Resolution')),
+            data: new Float32Array(await res.arrayBuffer()),
+        };
+    } catch (error) {
+        console.error(error);
+        return null;
+    }
+}
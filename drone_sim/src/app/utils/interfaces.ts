@@ -44,10 +44,63 @@ export interface SimulationDetails {
       final_position: [number, number, number]; // Final position of the drone
       steps: number;                           // Number of steps in the simulation
     };
+    beacon_estimate: {                         // Last online transmitter estimate, null if none was logged
+      timestamp: number;
+      x: number;
+      y: number;
+      var_x: number;
+      cov_xy: number;
+      var_y: number;
+    } | null;
+    drone_ids: number[];                       // Drones of the simulation, [0] unless it is a swarm
+    antennas: Array<SimulationDetails['antenna'] & {
+      id: number;                              // transmitt_antennas ID, named by every measurement's transmitt_antenna_id
+      beacon_index: number;                    // Position of the transmitter in the simulated slope
+    }>;
   }
   
 
 
+  export interface PathRow {
+    position: {
+      x: number,
+      y: number,
+      z: number,
+      pitch: number,
+      yaw: number,
+      roll: number,
+    },
+    timestamp: number,
+  }
+
+  export interface MeasurementRow extends PathRow {
+    signal_strength: number;
+    signal_direction: number;
+  }
+
+  // One line of the /api/simulations/<id>/stream NDJSON response
+  export type SimulationStreamRow =
+    | ({ type: 'simulation' } & Pick<SimulationDetails, 'simulation' | 'slope' | 'antenna' | 'result'>)
+    | ({ type: 'path'; drone_id: number; id: number } & PathRow)
+    | ({ type: 'measurement'; drone_id: number } & MeasurementRow)
+    | { type: 'page'; next_after_t: number; next_after_drone_id: number; next_after_id: number };  // Cursor of the next page
+
+  // Status of a simulation queued with POST /api/simulate
+  export interface SimulationJob {
+    id: string;
+    description: string;
+    status: 'queued' | 'running' | 'done' | 'failed' | 'cancelled';
+    steps_done: number;            // Waypoints flown so far
+    total_steps: number | null;    // Waypoints in the path, known once the job runs
+    progress: number | null;
+    result: { simulation_id: number } | null;
+    error: string | null;
+    submitted_at: number;
+    started_at: number | null;
+    finished_at: number | null;
+  }
+
+
   export interface SceneConfig {
     camera: {
       position: [number, number, number];
@@ -67,6 +120,7 @@ export interface SimulationDetails {
     ground: {
       size: number;
       color: number;
+      y: number;  // Height of the flat ground, at the lower edge of the slope
     };
     drone: {
       startPosition: [number, number, number];